@@ -1,23 +1,33 @@
 """管理后台API"""
+import os
 from datetime import date
-from fastapi import APIRouter, Depends, HTTPException, Header, UploadFile, File
-from fastapi.responses import Response
+from pathlib import Path
+from fastapi import APIRouter, Depends, HTTPException, Header, UploadFile, File, Query
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, delete
 from sqlalchemy.orm import selectinload
-from typing import Optional, List
+from typing import Optional, List, Literal
 import logging
 
 from ..database import get_db
-from ..models import Tool, User, Category, UserFavorite, UserLike, ClickLog
+from ..models import Tool, User, Category, UserFavorite, UserLike, ClickLog, ToolCounter, ToolRelated
 from ..schemas import (
-    ToolCreate, ToolUpdate, ToolResponse, ToolList,
+    ToolCreate, ToolUpdate, ToolAdminResponse, ToolList,
     StatsOverview, ToolStats, UserStats,
     CategoryCreate, CategoryUpdate, CategoryResponse,
 )
 from ..services.stats_service import StatsService
 from ..services.import_service import import_tools, generate_template
-from ..services.export_service import ExportService
+from ..services.click_backfill import backfill_clicks, detect_format
+from ..services.export_service import XLSX_MEDIA_TYPE, iter_file
+from ..services.export_jobs import ExportType, submit_export, get_export_job
+from ..services.click_export import ClickExportFormat, MEDIA_TYPES as CLICK_MEDIA_TYPES, export_clicks
+from ..services.catalog_events import publish_catalog_change
+from ..services.executor import run_in_process, executor_stats
+from ..services.job_runner import job_stats
+from ..services.counter_service import get_counter
+from ..services.pagination import encode_cursor, decode_cursor, keyset_order, keyset_after, estimate_count
 from ..config import get_settings
 from .auth import verify_token
 
@@ -80,6 +90,7 @@ async def create_category(
     db.add(category)
     await db.commit()
     await db.refresh(category)
+    await publish_catalog_change(db)
 
     logger.info(f"创建分类: {category.name}")
     return CategoryResponse.model_validate(category)
@@ -114,6 +125,7 @@ async def update_category(
 
     await db.commit()
     await db.refresh(category)
+    await publish_catalog_change(db)
 
     logger.info(f"更新分类: {category.name}")
     return CategoryResponse.model_validate(category)
@@ -144,6 +156,7 @@ async def delete_category(
 
     await db.delete(category)
     await db.commit()
+    await publish_catalog_change(db)
 
     logger.info(f"删除分类: {category.name}")
     return {"success": True}
@@ -156,10 +169,12 @@ async def list_tools(
     page: int = 1,
     size: int = 20,
     category_id: Optional[int] = None,
+    cursor: Optional[str] = Query(None, description="分页游标，传入时忽略 page"),
+    count: Literal["exact", "approximate"] = Query("exact", description="总数计算方式"),
     db: AsyncSession = Depends(get_db),
     _: str = Depends(verify_admin),
 ):
-    """获取工具列表（分页）"""
+    """获取工具列表（分页，支持 page 或游标；返回 next_cursor 供继续翻页）"""
     # 构建查询
     base_query = select(Tool).options(selectinload(Tool.category), selectinload(Tool.tags))
     count_query = select(func.count(Tool.id))
@@ -168,22 +183,36 @@ async def list_tools(
         base_query = base_query.where(Tool.category_id == category_id)
         count_query = count_query.where(Tool.category_id == category_id)
 
-    # 总数
-    total = (await db.execute(count_query)).scalar() or 0
-
-    # 分页查询
-    offset = (page - 1) * size
-    query = base_query.order_by(Tool.sort_order, Tool.id).offset(offset).limit(size)
-    result = await db.execute(query)
+    # 总数（approximate 在无筛选时读取统计信息，避免大表 COUNT(*)）
+    total = None
+    if count == "approximate" and category_id is None:
+        total = await estimate_count(db, "tools")
+    if total is None:
+        total = (await db.execute(count_query)).scalar() or 0
+
+    # 分页查询：游标按 (sort_order, id) 定位，深翻页不再扫描前面的行
+    keys = [(Tool.sort_order, False), (Tool.id, False)]
+    query = base_query.order_by(*keyset_order(keys))
+    if cursor:
+        query = query.where(keyset_after(keys, decode_cursor(cursor, "admin", len(keys))))
+    else:
+        query = query.offset((page - 1) * size)
+    result = await db.execute(query.limit(size + 1))
     tools = result.scalars().all()
 
+    next_cursor = None
+    if len(tools) > size:
+        tools = tools[:size]
+        next_cursor = encode_cursor("admin", [tools[-1].sort_order, tools[-1].id])
+
     return ToolList(
         total=total,
-        items=[ToolResponse.model_validate(t) for t in tools],
+        items=[ToolAdminResponse.model_validate(t) for t in tools],
+        next_cursor=next_cursor,
     )
 
 
-@router.post("/tools", response_model=ToolResponse)
+@router.post("/tools", response_model=ToolAdminResponse)
 async def create_tool(
     data: ToolCreate,
     db: AsyncSession = Depends(get_db),
@@ -202,6 +231,7 @@ async def create_tool(
     )
     db.add(tool)
     await db.commit()
+    await publish_catalog_change(db, [tool.id])
 
     # 重新查询以获取完整对象（避免延迟加载问题）
     result = await db.execute(
@@ -210,10 +240,10 @@ async def create_tool(
     tool = result.scalar_one()
 
     logger.info(f"创建工具: {tool.name} by {admin_id}")
-    return ToolResponse.model_validate(tool)
+    return ToolAdminResponse.model_validate(tool)
 
 
-@router.put("/tools/{tool_id}", response_model=ToolResponse)
+@router.put("/tools/{tool_id}", response_model=ToolAdminResponse)
 async def update_tool(
     tool_id: int,
     data: ToolUpdate,
@@ -241,6 +271,7 @@ async def update_tool(
         setattr(tool, key, value)
 
     await db.commit()
+    await publish_catalog_change(db, [tool_id])
 
     # 重新查询以获取完整对象（避免延迟加载问题）
     result = await db.execute(
@@ -249,7 +280,7 @@ async def update_tool(
     tool = result.scalar_one()
 
     logger.info(f"更新工具: {tool.name}")
-    return ToolResponse.model_validate(tool)
+    return ToolAdminResponse.model_validate(tool)
 
 
 @router.get("/tools/{tool_id}/delete-preview")
@@ -265,16 +296,11 @@ async def preview_delete_tool(
     if not tool:
         raise HTTPException(status_code=404, detail="工具不存在")
 
-    # 统计关联数据
-    fav_count = (await db.execute(
-        select(func.count()).where(UserFavorite.tool_id == tool_id)
-    )).scalar() or 0
-    like_count = (await db.execute(
-        select(func.count()).where(UserLike.tool_id == tool_id)
-    )).scalar() or 0
-    click_count = (await db.execute(
-        select(func.count()).where(ClickLog.tool_id == tool_id)
-    )).scalar() or 0
+    # 统计关联数据（读取计数器表）
+    counters = await get_counter(db, tool_id)
+    fav_count = counters["favorite_count"]
+    like_count = counters["like_count"]
+    click_count = counters["click_total"]
 
     return {
         "tool_name": tool.name,
@@ -302,9 +328,14 @@ async def delete_tool(
     fav_result = await db.execute(delete(UserFavorite).where(UserFavorite.tool_id == tool_id))
     like_result = await db.execute(delete(UserLike).where(UserLike.tool_id == tool_id))
     click_result = await db.execute(delete(ClickLog).where(ClickLog.tool_id == tool_id))
+    await db.execute(delete(ToolCounter).where(ToolCounter.tool_id == tool_id))
+    await db.execute(delete(ToolRelated).where(
+        (ToolRelated.tool_id == tool_id) | (ToolRelated.related_tool_id == tool_id)
+    ))
 
     await db.delete(tool)
     await db.commit()
+    await publish_catalog_change(db, [tool_id])
 
     logger.info(
         f"删除工具: {tool.name} (ID={tool_id}), "
@@ -429,117 +460,173 @@ async def get_want_list(
 
 # ============ 数据导出 ============
 
+def _xlsx_response(path: Path, filename: str) -> StreamingResponse:
+    """
+    按块流式返回缓存中的导出文件
+
+    返回响应前先打开文件：之后缓存淘汰删除该文件，已打开的句柄仍可读完
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        raise HTTPException(status_code=410, detail="导出结果已从缓存淘汰，请重新提交")
+    return StreamingResponse(
+        iter_file(f),
+        media_type=XLSX_MEDIA_TYPE,
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "Content-Length": str(os.fstat(f.fileno()).st_size),
+        },
+    )
+
+
+async def _export_now(export_type: str, days: Optional[int] = None) -> StreamingResponse:
+    """提交导出任务并等待完成（命中缓存时立即返回）"""
+    job = await submit_export(export_type, days)
+    await job.done.wait()
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=f"导出失败: {job.error}")
+    return _xlsx_response(job.path, job.filename)
+
+
 @router.get("/export/tools")
 async def export_tools_stats(
     days: int = 30,
-    db: AsyncSession = Depends(get_db),
     _: str = Depends(verify_admin),
 ):
     """导出工具统计报表"""
-    service = ExportService(db)
-    content = await service.export_tools_stats(days=days)
-
-    filename = f"tools_stats_{date.today().isoformat()}.xlsx"
-    return Response(
-        content=content,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={filename}"},
-    )
+    return await _export_now("tools", days)
 
 
 @router.get("/export/users")
 async def export_users_stats(
     days: int = 30,
-    db: AsyncSession = Depends(get_db),
     _: str = Depends(verify_admin),
 ):
     """导出用户统计报表"""
-    service = ExportService(db)
-    content = await service.export_users_stats(days=days)
-
-    filename = f"users_stats_{date.today().isoformat()}.xlsx"
-    return Response(
-        content=content,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={filename}"},
-    )
+    return await _export_now("users", days)
 
 
 @router.get("/export/trend")
 async def export_trend_stats(
     days: int = 30,
-    db: AsyncSession = Depends(get_db),
     _: str = Depends(verify_admin),
 ):
     """导出趋势统计报表"""
-    service = ExportService(db)
-    content = await service.export_trend_stats(days=days)
-
-    filename = f"trend_stats_{date.today().isoformat()}.xlsx"
-    return Response(
-        content=content,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={filename}"},
-    )
+    return await _export_now("trend", days)
 
 
 @router.get("/export/interactions")
 async def export_interactions_stats(
-    db: AsyncSession = Depends(get_db),
     _: str = Depends(verify_admin),
 ):
     """导出工具互动统计报表"""
-    service = ExportService(db)
-    content = await service.export_interactions_stats()
-
-    filename = f"interactions_stats_{date.today().isoformat()}.xlsx"
-    return Response(
-        content=content,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={filename}"},
-    )
+    return await _export_now("interactions")
 
 
 @router.get("/export/providers")
 async def export_providers_stats(
-    db: AsyncSession = Depends(get_db),
     _: str = Depends(verify_admin),
 ):
     """导出提供者统计报表"""
-    service = ExportService(db)
-    content = await service.export_providers_stats()
-
-    filename = f"providers_stats_{date.today().isoformat()}.xlsx"
-    return Response(
-        content=content,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={filename}"},
-    )
+    return await _export_now("providers")
 
 
 @router.get("/export/wants")
 async def export_wants_stats(
-    db: AsyncSession = Depends(get_db),
     _: str = Depends(verify_admin),
 ):
     """导出用户想要统计报表"""
-    service = ExportService(db)
-    content = await service.export_wants_stats()
+    return await _export_now("wants")
 
-    filename = f"wants_stats_{date.today().isoformat()}.xlsx"
-    return Response(
-        content=content,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+
+@router.post("/export-jobs")
+async def create_export_job(
+    type: ExportType = Query(..., description="报表类型"),
+    days: int = Query(30, ge=1, le=365, description="统计天数（tools/users/trend）"),
+    _: str = Depends(verify_admin),
+):
+    """提交后台导出任务，返回任务ID；相同数据已导出过时直接返回已完成的任务"""
+    job = await submit_export(type, days)
+    return job.to_dict()
+
+
+@router.get("/export-jobs/{job_id}")
+async def get_export_job_status(
+    job_id: str,
+    _: str = Depends(verify_admin),
+):
+    """查询导出任务状态与进度（已写入行数）"""
+    job = get_export_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="导出任务不存在或已过期")
+    return job.to_dict()
+
+
+@router.get("/export-jobs/{job_id}/download")
+async def download_export_job(
+    job_id: str,
+    _: str = Depends(verify_admin),
+):
+    """下载已完成的导出结果"""
+    job = get_export_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="导出任务不存在或已过期")
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"导出任务尚未完成: {job.status}")
+    return _xlsx_response(job.path, job.filename)
+
+
+@router.get("/export/clicks")
+async def export_clicks_raw(
+    format: ClickExportFormat = Query("csv", description="输出格式"),
+    gzip: bool = Query(False, description="是否 gzip 压缩"),
+    start: Optional[date] = Query(None, description="开始日期（含）"),
+    end: Optional[date] = Query(None, description="结束日期（含）"),
+    _: str = Depends(verify_admin),
+):
+    """导出原始点击明细（关联工具/分类/用户名称），流式输出"""
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="开始日期不能晚于结束日期")
+
+    filename = f"clicks_{start or 'all'}_{end or date.today().isoformat()}.{format}"
+    media_type = CLICK_MEDIA_TYPES[format]
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        export_clicks(start, end, format, compress=gzip),
+        media_type=media_type,
         headers={"Content-Disposition": f"attachment; filename={filename}"},
     )
 
 
+# ============ 系统状态 ============
+
+@router.get("/system/executor")
+async def get_executor_stats(
+    _: str = Depends(verify_admin),
+):
+    """CPU 密集任务执行器状态（各池在途任务、排队深度、超时次数）"""
+    return executor_stats()
+
+
+@router.get("/system/jobs")
+async def get_job_stats(
+    db: AsyncSession = Depends(get_db),
+    _: str = Depends(verify_admin),
+):
+    """持久化后台任务状态（各状态任务数、最早排队时长、本进程吞吐与等待/执行耗时）"""
+    return await job_stats(db)
+
+
 # ============ 导入导出 ============
 
 @router.post("/tools/import")
 async def import_tools_from_excel(
     file: UploadFile = File(...),
     update_existing: bool = True,
+    dry_run: bool = False,
     db: AsyncSession = Depends(get_db),
     _: str = Depends(verify_admin),
 ):
@@ -548,6 +635,7 @@ async def import_tools_from_excel(
 
     - **file**: Excel文件 (.xlsx)
     - **update_existing**: 是否更新已存在的工具（按名称匹配）
+    - **dry_run**: 只预览变更（逐行新增/更新的字段），不写入
     """
     # 验证文件类型
     if not file.filename.endswith((".xlsx", ".xls")):
@@ -555,13 +643,9 @@ async def import_tools_from_excel(
 
     try:
         content = await file.read()
-        result = await import_tools(db, content, update_existing)
-
-        logger.info(
-            f"导入完成: 新增{result.created}, 更新{result.updated}, "
-            f"跳过{result.skipped}, 错误{len(result.errors)}"
-        )
-
+        result = await import_tools(db, content, update_existing, dry_run=dry_run)
+        if not dry_run and (result.created or result.updated):
+            await publish_catalog_change(db)
         return result.to_dict()
 
     except Exception as e:
@@ -569,12 +653,34 @@ async def import_tools_from_excel(
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/clicks/backfill")
+async def backfill_click_logs(
+    file: UploadFile = File(...),
+    format: Optional[Literal["csv", "ndjson"]] = Query(None, description="文件格式，默认按扩展名判断"),
+    create_users: bool = Query(False, description="为未知 open_id 新建用户"),
+    dry_run: bool = Query(False, description="只校验映射，不写入"),
+    db: AsyncSession = Depends(get_db),
+    _: str = Depends(verify_admin),
+):
+    """
+    回填历史点击日志（CSV / NDJSON，可 gzip 压缩）
+
+    文件解析在线程池中按批进行；完成后只校准受影响工具的计数器，
+    相关工具与个性化排序由每天凌晨的定时任务重算。大文件建议在服务器上使用 `python scripts/backfill_clicks.py`
+    """
+    result = await backfill_clicks(
+        db, file.file, format or detect_format(file.filename or ""),
+        create_users=create_users, dry_run=dry_run, rebuild_rankings=False,
+    )
+    return result.to_dict()
+
+
 @router.get("/tools/import/template")
 async def download_import_template(
     _: str = Depends(verify_admin),
 ):
     """下载导入模板"""
-    content = generate_template()
+    content = await run_in_process(generate_template)
     return Response(
         content=content,
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
@@ -47,6 +47,13 @@ async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
         user_info = await feishu_service.get_user_info(user_access_token)
         open_id = user_info["open_id"]
 
+        # 部门/职务用于工具可见范围，每次登录刷新；通讯录不可用时保留原值
+        try:
+            org = await feishu_service.get_user_org(open_id)
+        except Exception as e:
+            logger.warning(f"获取用户部门/职务失败: {open_id}: {e}")
+            org = {}
+
         # 查找或创建用户
         result = await db.execute(select(User).where(User.open_id == open_id))
         user = result.scalar_one_or_none()
@@ -57,6 +64,9 @@ async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
             user.visit_count += 1
             user.name = user_info.get("name", user.name)
             user.avatar_url = user_info.get("avatar_url", user.avatar_url)
+            if org:
+                user.department = org["department"]
+                user.role = org["role"]
         else:
             # 创建新用户
             user = User(
@@ -65,6 +75,8 @@ async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
                 user_id=user_info.get("user_id"),
                 name=user_info.get("name"),
                 avatar_url=user_info.get("avatar_url"),
+                department=org.get("department"),
+                role=org.get("role"),
             )
             db.add(user)
 
@@ -1,17 +1,21 @@
 """用户交互API（收藏、点赞）"""
 from fastapi import APIRouter, Depends, HTTPException, Header
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, delete
+from sqlalchemy import select, delete
 from typing import Optional
 import logging
 
 from ..database import get_db
 from ..models import Tool, User, UserFavorite, UserLike, Category, SearchHistory
 from ..schemas import (
-    InteractionResponse, ToolInteractionStats,
+    InteractionResponse, ToolInteractionStats, ToolStatsBatchRequest,
+    InteractionBatchRequest, InteractionBatchResponse,
     FavoriteToolResponse, FavoriteListResponse,
     SearchHistoryItem, SearchHistoryResponse
 )
+from ..services.counter_service import bump_counters, get_counter, get_counters
+from ..services.interaction_service import add_interactions, remove_interactions, set_interactions
+from ..services.search_history_service import record_search, recent_searches
 from .auth import verify_token
 
 router = APIRouter()
@@ -57,6 +61,12 @@ async def get_optional_user(
         return None
 
 
+async def _ensure_tool(db: AsyncSession, tool_id: int):
+    """工具不存在时返回 404"""
+    if not (await db.execute(select(Tool.id).where(Tool.id == tool_id))).scalar():
+        raise HTTPException(status_code=404, detail="工具不存在")
+
+
 # ========== 收藏 ==========
 
 @router.post("/tools/{tool_id}/favorite", response_model=InteractionResponse)
@@ -66,28 +76,15 @@ async def add_favorite(
     user: User = Depends(get_current_user),
 ):
     """添加收藏"""
-    # 验证工具存在
-    result = await db.execute(select(Tool).where(Tool.id == tool_id))
-    tool = result.scalar_one_or_none()
-    if not tool:
-        raise HTTPException(status_code=404, detail="工具不存在")
-
-    # 检查是否已收藏
-    result = await db.execute(
-        select(UserFavorite).where(
-            UserFavorite.user_id == user.id,
-            UserFavorite.tool_id == tool_id
-        )
-    )
-    if result.scalar_one_or_none():
+    if not await add_interactions(db, "favorite", user.id, [tool_id]):
+        # 未插入：工具不存在或已收藏
+        await _ensure_tool(db, tool_id)
         return InteractionResponse(success=True, message="已收藏")
 
-    # 添加收藏
-    favorite = UserFavorite(user_id=user.id, tool_id=tool_id)
-    db.add(favorite)
+    await bump_counters(db, tool_id, favorite_count=1)
     await db.commit()
 
-    logger.info(f"用户 {user.name} 收藏了工具 {tool.name}")
+    logger.info(f"用户 {user.name} 收藏了工具 {tool_id}")
     return InteractionResponse(success=True, message="收藏成功")
 
 
@@ -98,15 +95,12 @@ async def remove_favorite(
     user: User = Depends(get_current_user),
 ):
     """取消收藏"""
-    result = await db.execute(
-        delete(UserFavorite).where(
-            UserFavorite.user_id == user.id,
-            UserFavorite.tool_id == tool_id
-        )
-    )
+    removed = await remove_interactions(db, "favorite", user.id, [tool_id])
+    if removed:
+        await bump_counters(db, tool_id, favorite_count=-1)
     await db.commit()
 
-    if result.rowcount > 0:
+    if removed:
         logger.info(f"用户 {user.name} 取消收藏工具 {tool_id}")
         return InteractionResponse(success=True, message="已取消收藏")
     return InteractionResponse(success=True, message="未收藏该工具")
@@ -153,28 +147,15 @@ async def add_like(
     user: User = Depends(get_current_user),
 ):
     """点赞工具"""
-    # 验证工具存在
-    result = await db.execute(select(Tool).where(Tool.id == tool_id))
-    tool = result.scalar_one_or_none()
-    if not tool:
-        raise HTTPException(status_code=404, detail="工具不存在")
-
-    # 检查是否已点赞
-    result = await db.execute(
-        select(UserLike).where(
-            UserLike.user_id == user.id,
-            UserLike.tool_id == tool_id
-        )
-    )
-    if result.scalar_one_or_none():
+    if not await add_interactions(db, "like", user.id, [tool_id]):
+        # 未插入：工具不存在或已点赞
+        await _ensure_tool(db, tool_id)
         return InteractionResponse(success=True, message="已点赞")
 
-    # 添加点赞
-    like = UserLike(user_id=user.id, tool_id=tool_id)
-    db.add(like)
+    await bump_counters(db, tool_id, like_count=1)
     await db.commit()
 
-    logger.info(f"用户 {user.name} 点赞了工具 {tool.name}")
+    logger.info(f"用户 {user.name} 点赞了工具 {tool_id}")
     return InteractionResponse(success=True, message="点赞成功")
 
 
@@ -185,15 +166,12 @@ async def remove_like(
     user: User = Depends(get_current_user),
 ):
     """取消点赞"""
-    result = await db.execute(
-        delete(UserLike).where(
-            UserLike.user_id == user.id,
-            UserLike.tool_id == tool_id
-        )
-    )
+    removed = await remove_interactions(db, "like", user.id, [tool_id])
+    if removed:
+        await bump_counters(db, tool_id, like_count=-1)
     await db.commit()
 
-    if result.rowcount > 0:
+    if removed:
         logger.info(f"用户 {user.name} 取消点赞工具 {tool_id}")
         return InteractionResponse(success=True, message="已取消点赞")
     return InteractionResponse(success=True, message="未点赞该工具")
@@ -201,6 +179,47 @@ async def remove_like(
 
 # ========== 统计 ==========
 
+@router.post("/tools/stats:batch", response_model=dict[int, ToolInteractionStats])
+async def get_tool_stats_batch(
+    data: ToolStatsBatchRequest,
+    authorization: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """批量获取工具交互统计（卡片列表一次请求），返回以工具ID为键的字典"""
+    tool_ids = list(dict.fromkeys(data.tool_ids))
+    if not tool_ids:
+        return {}
+    user = await get_optional_user(authorization, db)
+    return await _interaction_stats(db, tool_ids, user)
+
+
+async def _interaction_stats(
+    db: AsyncSession, tool_ids: list[int], user: Optional[User]
+) -> dict[int, ToolInteractionStats]:
+    """计数器 + 当前用户已点赞/收藏的工具（两条归属查询）"""
+    counters = await get_counters(db, tool_ids)
+
+    liked: set[int] = set()
+    favorited: set[int] = set()
+    if user:
+        liked = set((await db.execute(
+            select(UserLike.tool_id).where(UserLike.user_id == user.id, UserLike.tool_id.in_(tool_ids))
+        )).scalars().all())
+        favorited = set((await db.execute(
+            select(UserFavorite.tool_id).where(UserFavorite.user_id == user.id, UserFavorite.tool_id.in_(tool_ids))
+        )).scalars().all())
+
+    return {
+        tool_id: ToolInteractionStats(
+            like_count=counters[tool_id]["like_count"],
+            favorite_count=counters[tool_id]["favorite_count"],
+            is_liked=tool_id in liked,
+            is_favorited=tool_id in favorited,
+        )
+        for tool_id in tool_ids
+    }
+
+
 @router.get("/tools/{tool_id}/stats", response_model=ToolInteractionStats)
 async def get_tool_stats(
     tool_id: int,
@@ -208,17 +227,7 @@ async def get_tool_stats(
     db: AsyncSession = Depends(get_db),
 ):
     """获取工具交互统计"""
-    # 点赞数
-    result = await db.execute(
-        select(func.count()).select_from(UserLike).where(UserLike.tool_id == tool_id)
-    )
-    like_count = result.scalar() or 0
-
-    # 收藏数
-    result = await db.execute(
-        select(func.count()).select_from(UserFavorite).where(UserFavorite.tool_id == tool_id)
-    )
-    favorite_count = result.scalar() or 0
+    counters = await get_counter(db, tool_id)
 
     # 当前用户是否点赞/收藏
     is_liked = False
@@ -243,13 +252,39 @@ async def get_tool_stats(
         is_favorited = result.scalar_one_or_none() is not None
 
     return ToolInteractionStats(
-        like_count=like_count,
-        favorite_count=favorite_count,
+        like_count=counters["like_count"],
+        favorite_count=counters["favorite_count"],
         is_liked=is_liked,
         is_favorited=is_favorited,
     )
 
 
+# ========== 批量点赞/收藏 ==========
+
+@router.post("/user/interactions:batch", response_model=InteractionBatchResponse)
+async def batch_interactions(
+    data: InteractionBatchRequest,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """批量设置/取消点赞与收藏（单事务），返回涉及工具的最新计数与当前用户状态"""
+    ops = {(op.type, op.tool_id): op.value for op in data.ops}
+    tool_ids = list(dict.fromkeys(tool_id for _, tool_id in ops))
+    if not tool_ids:
+        return InteractionBatchResponse(changed=0, stats={})
+
+    existing = set((await db.execute(select(Tool.id).where(Tool.id.in_(tool_ids)))).scalars().all())
+    missing = [tool_id for tool_id in tool_ids if tool_id not in existing]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"工具不存在: {', '.join(map(str, missing))}")
+
+    changed = await set_interactions(db, user.id, ops)
+    await db.commit()
+
+    logger.info(f"用户 {user.name} 批量更新点赞/收藏: {len(ops)} 条操作, {changed} 条变化")
+    return InteractionBatchResponse(changed=changed, stats=await _interaction_stats(db, tool_ids, user))
+
+
 # ========== 搜索历史 ==========
 
 @router.get("/user/search-history", response_model=SearchHistoryResponse)
@@ -258,30 +293,8 @@ async def get_search_history(
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
-    """获取用户搜索历史（最近N条，去重）"""
-    # 使用子查询获取每个关键词的最新记录
-    subquery = (
-        select(
-            SearchHistory.keyword,
-            func.max(SearchHistory.searched_at).label("latest")
-        )
-        .where(SearchHistory.user_id == user.id)
-        .group_by(SearchHistory.keyword)
-        .subquery()
-    )
-
-    result = await db.execute(
-        select(SearchHistory)
-        .join(
-            subquery,
-            (SearchHistory.keyword == subquery.c.keyword) &
-            (SearchHistory.searched_at == subquery.c.latest)
-        )
-        .where(SearchHistory.user_id == user.id)
-        .order_by(SearchHistory.searched_at.desc())
-        .limit(limit)
-    )
-    histories = result.scalars().all()
+    """获取用户搜索历史（最近N条，写入时已去重）"""
+    histories = await recent_searches(db, user.id, limit)
 
     items = [
         SearchHistoryItem(
@@ -307,8 +320,7 @@ async def add_search_history(
 
     keyword = keyword.strip()[:100]  # 限制长度
 
-    history = SearchHistory(user_id=user.id, keyword=keyword)
-    db.add(history)
+    await record_search(db, user.id, keyword)
     await db.commit()
 
     logger.info(f"用户 {user.name} 搜索了: {keyword}")
@@ -1,19 +1,25 @@
 """报表推送管理API"""
 import io
+import json
 import logging
 from datetime import datetime
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, update
 from pydantic import BaseModel, EmailStr
 
 from app.database import get_db
-from app.models import ReportPushSettings, ReportRecipient, ReportPushHistory
+from app.models import ReportPushSettings, ReportRecipient, ReportPushHistory, ReportPushDelivery
 from app.api.admin import verify_admin
 from app.services.stats_service import StatsService
 from app.services.feishu_service import feishu_service
+from app.services.executor import run_in_process
+from app.services.fanout import FanOutResult, fan_out, call_with_retry
+from app.services.identity_service import resolve_open_ids, get_cached_open_ids
+from app.services.job_runner import register_job, enqueue_job, notify_jobs
+from app.services.counter_service import dialect_insert
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/admin/report-push", tags=["报表推送"])
@@ -118,6 +124,7 @@ async def get_recipients(
         select(ReportRecipient).order_by(ReportRecipient.created_at.desc())
     )
     recipients = result.scalars().all()
+    cached = await get_cached_open_ids(db, [r.email for r in recipients])
 
     return [
         {
@@ -125,15 +132,29 @@ async def get_recipients(
             "name": r.name,
             "email": r.email,
             "is_active": r.is_active,
+            # 是否已匹配到飞书用户（None 表示尚未解析）
+            "feishu_matched": bool(cached[r.email]) if r.email in cached else None,
             "created_at": r.created_at.isoformat() if r.created_at else None
         }
         for r in recipients
     ]
 
 
+async def _prewarm_identity(email: str):
+    """后台解析新接收人的 open_id，写入身份缓存"""
+    from app.database import async_session
+
+    try:
+        async with async_session() as db:
+            await resolve_open_ids(db, [email])
+    except Exception as e:
+        logger.warning(f"预解析接收人 {email} 失败（推送时重试）: {e}")
+
+
 @router.post("/recipients")
 async def add_recipient(
     data: RecipientCreate,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     _admin: str = Depends(verify_admin)
 ):
@@ -149,6 +170,7 @@ async def add_recipient(
     db.add(recipient)
     await db.commit()
     await db.refresh(recipient)
+    background_tasks.add_task(_prewarm_identity, recipient.email)
 
     return {
         "id": recipient.id,
@@ -252,6 +274,8 @@ async def get_history(
                 "push_method": h.push_method,
                 "recipient_count": h.recipient_count,
                 "status": h.status,
+                "success_count": h.success_count,
+                "failed_count": h.failed_count,
                 "error_msg": h.error_msg,
                 "pushed_at": h.pushed_at.isoformat() if h.pushed_at else None
             }
@@ -301,7 +325,6 @@ async def preview_report(
 @router.post("/push")
 async def push_report(
     data: PushRequest,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     _admin: str = Depends(verify_admin)
 ):
@@ -351,7 +374,7 @@ async def push_report(
     if "custom" in data.report_types and data.custom_content:
         report_data["custom"] = {"content": data.custom_content}
 
-    # 记录推送历史
+    # 记录推送历史，推送任务与历史同一事务写入任务表，由后台 worker 认领执行
     history = ReportPushHistory(
         report_type=",".join(data.report_types),
         push_method=data.method,
@@ -359,160 +382,199 @@ async def push_report(
         status="pending"
     )
     db.add(history)
+    await db.flush()
+
+    payload = {
+        "history_id": history.id,
+        "recipients": recipients,
+        # 统计结果中的日期/小数等转为字符串，便于存入 JSON 列
+        "report_data": json.loads(json.dumps(report_data, default=str)),
+        "days": data.days,
+    }
+    job = await enqueue_job(db, "report_push.feishu" if data.method == "feishu" else "report_push.email", payload)
     await db.commit()
-    await db.refresh(history)
-
-    # 后台推送
-    if data.method == "feishu":
-        background_tasks.add_task(
-            push_feishu_report,
-            history.id,
-            recipients,
-            report_data,
-            data.days
-        )
-    else:
-        background_tasks.add_task(
-            push_email_report,
-            history.id,
-            recipients,
-            report_data,
-            data.days
-        )
+    notify_jobs()
+
+    return {"message": "推送任务已提交", "history_id": history.id, "job_id": job.id}
+
+
+async def _update_history(db: AsyncSession, history_id: int, **values):
+    await db.execute(
+        update(ReportPushHistory).where(ReportPushHistory.id == history_id).values(**values)
+    )
+    await db.commit()
+
+
+async def _resolve_open_ids(db: AsyncSession, recipients: list) -> tuple[list, list]:
+    """把接收人邮箱换成 open_id（优先读身份缓存），返回 (找到的接收人, 未找到的错误信息)"""
+    found = await resolve_open_ids(db, [r["email"] for r in recipients])
+    resolved, errors = [], []
+    for r in recipients:
+        if found.get(r["email"]):
+            resolved.append({**r, "open_id": found[r["email"]]})
+        else:
+            errors.append(f"{r['name']}: 未找到飞书用户")
+    return resolved, errors
+
+
+async def _delivered(db: AsyncSession, history_id: int) -> set:
+    """已送达的接收人（任务重新执行时跳过）"""
+    rows = await db.execute(
+        select(ReportPushDelivery.recipient).where(ReportPushDelivery.history_id == history_id)
+    )
+    return set(rows.scalars().all())
+
+
+class _DeliveryLog:
+    """
+    送达记录：发送成功的接收人先记在内存，随进度回调和结束时批量落库
+
+    进程在两次落库之间崩溃时，这部分接收人会在任务重新执行时再发一次，
+    由消息 uuid 在飞书侧去重（1 小时内有效）
+    """
+
+    def __init__(self, db: AsyncSession, history_id: int, delivered: int, failed_before: int):
+        self.db = db
+        self.history_id = history_id
+        self.delivered = delivered
+        self.failed_before = failed_before
+        self.pending: list[str] = []
 
-    return {"message": "推送任务已提交", "history_id": history.id}
+    def add(self, recipient: str):
+        self.pending.append(recipient)
+
+    async def flush(self, result: FanOutResult, **values):
+        keys, self.pending = self.pending, []
+        try:
+            if keys:
+                stmt = dialect_insert(self.db, ReportPushDelivery).values(
+                    [{"history_id": self.history_id, "recipient": key} for key in keys]
+                ).on_conflict_do_nothing(index_elements=["history_id", "recipient"])
+                await self.db.execute(stmt)
+            await _update_history(
+                self.db, self.history_id,
+                success_count=self.delivered + result.success,
+                failed_count=self.failed_before + result.failed,
+                **values,
+            )
+        except Exception:
+            self.pending = keys + self.pending
+            await self.db.rollback()
+            raise
+
+    async def finish(self, total: int, result: FanOutResult, errors: list):
+        """写入最终状态：有成功即为 success（部分失败记入备注），全部失败为 failed"""
+        success = self.delivered + result.success
+        errors = errors + result.errors
+        if success > 0:
+            status = "success"
+            error_msg = f"部分成功({success}/{total}): " + "; ".join(errors) if errors else None
+        else:
+            status = "failed"
+            error_msg = "; ".join(errors)
+        await self.flush(result, status=status, error_msg=error_msg)
 
 
 async def push_feishu_report(history_id: int, recipients: list, report_data: dict, days: int):
-    """飞书消息推送"""
+    """
+    飞书消息推送（后台任务，并发、限速，频控/5xx 按退避重试，进度增量写入推送历史）
+
+    可重复执行：已送达的接收人跳过，消息 uuid 按 (推送, 接收人) 固定
+    """
     from app.database import async_session
 
     async with async_session() as db:
-        try:
-            # 构建卡片消息
-            card = build_report_card(report_data, days)
-
-            # 逐个推送给接收人
-            success_count = 0
-            errors = []
-
-            for recipient in recipients:
-                try:
-                    if recipient.get("type") == "chat":
-                        # 推送到群聊
-                        await feishu_service.send_card_message(
-                            recipient["chat_id"],
-                            card,
-                            receive_id_type="chat_id"
-                        )
-                        success_count += 1
-                    else:
-                        # 推送到个人（通过邮箱获取open_id）
-                        user_info = await feishu_service.get_user_by_email(recipient["email"])
-                        if user_info and user_info.get("open_id"):
-                            await feishu_service.send_card_message(
-                                user_info["open_id"],
-                                card,
-                                receive_id_type="open_id"
-                            )
-                            success_count += 1
-                        else:
-                            errors.append(f"{recipient['name']}: 未找到飞书用户")
-                except Exception as e:
-                    name = recipient.get("name") or recipient.get("chat_id", "未知")
-                    errors.append(f"{name}: {str(e)}")
-                    logger.error(f"推送给 {name} 失败: {e}")
-
-            # 更新历史记录
-            result = await db.execute(
-                select(ReportPushHistory).where(ReportPushHistory.id == history_id)
-            )
-            history = result.scalar_one_or_none()
-            if history:
-                if success_count > 0:
-                    history.status = "success"
-                    if errors:
-                        history.error_msg = f"部分成功({success_count}/{len(recipients)}): " + "; ".join(errors)
-                else:
-                    history.status = "failed"
-                    history.error_msg = "; ".join(errors)
-                await db.commit()
-
-            logger.info(f"飞书推送完成: {success_count}/{len(recipients)}")
-
-        except Exception as e:
-            logger.error(f"飞书推送失败: {e}")
-            result = await db.execute(
-                select(ReportPushHistory).where(ReportPushHistory.id == history_id)
+        await _update_history(db, history_id, status="running")
+
+        # 构建卡片消息
+        card = build_report_card(report_data, days)
+
+        done = await _delivered(db, history_id)
+        # 个人接收人批量换取 open_id，群聊直接推送
+        chats = [r for r in recipients if r.get("type") == "chat" and r["chat_id"] not in done]
+        users, errors = await _resolve_open_ids(
+            db, [r for r in recipients if r.get("type") != "chat" and r["email"] not in done]
+        )
+        targets = (
+            [{"key": r["chat_id"], "name": r["chat_id"], "receive_id": r["chat_id"], "receive_id_type": "chat_id"}
+             for r in chats]
+            + [{"key": r["email"], "name": r["name"], "receive_id": r["open_id"], "receive_id_type": "open_id"}
+               for r in users]
+        )
+        log = _DeliveryLog(db, history_id, delivered=len(done), failed_before=len(errors))
+
+        async def send(target: dict):
+            # 同一次推送同一接收人使用固定 uuid，重试不会重复发送
+            await feishu_service.send_card_message(
+                target["receive_id"],
+                card,
+                receive_id_type=target["receive_id_type"],
+                uuid=f"push-{history_id}-{target['receive_id']}"[:50],
             )
-            history = result.scalar_one_or_none()
-            if history:
-                history.status = "failed"
-                history.error_msg = str(e)
-                await db.commit()
+            log.add(target["key"])
+
+        result = await fan_out(targets, send, label=lambda t: t["name"], on_progress=log.flush)
+        await log.finish(len(recipients), result, errors)
+
+        logger.info(
+            f"飞书推送完成: {log.delivered + result.success}/{len(recipients)}（此前已送达 {len(done)}）, "
+            f"重试 {result.retries} 次, 耗时 {result.seconds:.1f} 秒"
+        )
 
 
 async def push_email_report(history_id: int, recipients: list, report_data: dict, days: int):
-    """邮件推送(Excel附件)"""
+    """邮件推送(Excel附件，后台任务)：文件只上传一次，再并发发给各接收人；可重复执行，已送达的跳过"""
     from app.database import async_session
 
-    # 过滤只保留用户类型的接收人（群聊不支持邮件推送）
-    user_recipients = [r for r in recipients if r.get("type") == "user"]
-    if not user_recipients:
-        logger.warning("没有可用的邮件接收人（群聊不支持邮件推送）")
-        return
-
     async with async_session() as db:
-        try:
-            # 生成Excel文件
-            excel_content = generate_report_excel(report_data, days)
-
-            # 逐个发送邮件
-            success_count = 0
-            errors = []
-
-            for recipient in user_recipients:
-                try:
-                    # 通过飞书邮件API发送
-                    await feishu_service.send_email_with_attachment(
-                        to_email=recipient["email"],
-                        subject=f"AI工具导航统计报表 - 近{days}天",
-                        content="请查看附件中的统计报表。",
-                        attachment_name=f"report_{datetime.now().strftime('%Y%m%d')}.xlsx",
-                        attachment_content=excel_content
-                    )
-                    success_count += 1
-                except Exception as e:
-                    errors.append(f"{recipient['name']}: {str(e)}")
-                    logger.error(f"发送邮件给 {recipient['name']} 失败: {e}")
-
-            # 更新历史记录
-            result = await db.execute(
-                select(ReportPushHistory).where(ReportPushHistory.id == history_id)
+        # 过滤只保留用户类型的接收人（群聊不支持邮件推送）
+        user_recipients = [r for r in recipients if r.get("type") == "user"]
+        if not user_recipients:
+            logger.warning("没有可用的邮件接收人（群聊不支持邮件推送）")
+            await _update_history(db, history_id, status="failed", error_msg="没有可用的邮件接收人（群聊不支持邮件推送）")
+            return
+
+        await _update_history(db, history_id, status="running")
+
+        done = await _delivered(db, history_id)
+        users, errors = await _resolve_open_ids(db, [r for r in user_recipients if r["email"] not in done])
+        log = _DeliveryLog(db, history_id, delivered=len(done), failed_before=len(errors))
+
+        file_key = None
+        if users:
+            # 生成Excel文件并上传（所有接收人共用一个 file_key）
+            excel_content = await run_in_process(generate_report_excel, report_data, days)
+            file_key = await call_with_retry(
+                feishu_service.upload_file,
+                f"report_{datetime.now().strftime('%Y%m%d')}.xlsx",
+                excel_content,
             )
-            history = result.scalar_one_or_none()
-            if history:
-                if success_count > 0:
-                    history.status = "success"
-                    if errors:
-                        history.error_msg = f"部分成功({success_count}/{len(recipients)}): " + "; ".join(errors)
-                else:
-                    history.status = "failed"
-                    history.error_msg = "; ".join(errors)
-                await db.commit()
-
-            logger.info(f"邮件推送完成: {success_count}/{len(recipients)}")
-
-        except Exception as e:
-            logger.error(f"邮件推送失败: {e}")
-            result = await db.execute(
-                select(ReportPushHistory).where(ReportPushHistory.id == history_id)
+
+        async def send(user: dict):
+            await feishu_service.send_file_message(
+                user["open_id"], file_key, uuid=f"push-{history_id}-{user['open_id']}"[:50]
             )
-            history = result.scalar_one_or_none()
-            if history:
-                history.status = "failed"
-                history.error_msg = str(e)
-                await db.commit()
+            log.add(user["email"])
+
+        result = await fan_out(users, send, label=lambda u: u["name"], on_progress=log.flush)
+        await log.finish(len(user_recipients), result, errors)
+
+        logger.info(
+            f"邮件推送完成: {log.delivered + result.success}/{len(user_recipients)}（此前已送达 {len(done)}）, "
+            f"重试 {result.retries} 次, 耗时 {result.seconds:.1f} 秒"
+        )
+
+
+async def _push_failed(history_id: int, error: str, **_):
+    """推送任务多次执行均失败"""
+    from app.database import async_session
+
+    async with async_session() as db:
+        await _update_history(db, history_id, status="failed", error_msg=f"推送任务失败: {error}")
+
+
+register_job("report_push.feishu", push_feishu_report, on_failed=_push_failed)
+register_job("report_push.email", push_email_report, on_failed=_push_failed)
 
 
 def build_report_card(report_data: dict, days: int) -> dict:
@@ -10,6 +10,7 @@ from ..database import get_db
 from ..models import Tag, Tool, tool_tags
 from ..schemas import TagCreate, TagUpdate, TagResponse, TagListResponse, TagSimple
 from ..config import get_settings
+from ..services.catalog_events import publish_catalog_change
 from .auth import verify_token
 
 router = APIRouter()
@@ -84,6 +85,7 @@ async def create_tag(
     db.add(tag)
     await db.commit()
     await db.refresh(tag)
+    await publish_catalog_change(db)
 
     logger.info(f"创建标签: {tag.name}")
     return TagResponse(
@@ -119,6 +121,7 @@ async def update_tag(
 
     await db.commit()
     await db.refresh(tag)
+    await publish_catalog_change(db)
 
     # 获取工具数量
     count_result = await db.execute(
@@ -152,6 +155,7 @@ async def delete_tag(
 
     await db.delete(tag)
     await db.commit()
+    await publish_catalog_change(db)
 
     logger.info(f"删除标签: {tag.name}")
     return {"success": True}
@@ -200,6 +204,7 @@ async def set_tool_tags(
 
     tool.tags = new_tags
     await db.commit()
+    await publish_catalog_change(db, [tool_id])
 
     logger.info(f"设置工具 {tool.name} 的标签: {[t.name for t in new_tags]}")
     return {"success": True, "tags": [TagSimple.model_validate(t) for t in new_tags]}
@@ -1,79 +1,227 @@
 """工具API"""
 from fastapi import APIRouter, Depends, HTTPException, Header, Request, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, or_
+from sqlalchemy import select, func
 from sqlalchemy.orm import selectinload
-from typing import Optional, Literal
-from datetime import datetime, timedelta
+from typing import Callable, Optional, Literal, Union
 import logging
 
 from ..database import get_db
-from ..models import Tool, User, ClickLog, UserLike, Category, Tag
-from ..schemas import ToolResponse, TagSimple
+from ..models import Tool, User, ClickLog, UserLike, Category, Tag, ToolCounter
+from ..schemas import ToolResponse, ToolPage, TagSimple, RelatedTool
 from ..services.click_service import should_record_click
+from ..services.counter_service import bump_counters
+from ..services.related_service import get_related
+from ..services.personal_service import PersonalRanking, get_personal_ranking
+from ..services.catalog_cache import catalog_responses, hot_responses, respond
+from ..services.pagination import SortKey, encode_cursor, decode_cursor, keyset_order, keyset_after
+from ..services.search_service import search_tools as search_tool_index
+from ..services.suggest_service import suggest
+from ..services.tag_index import TagMode, parse_tag_ids, tag_index
+from ..services.visibility import hidden_tool_ids
 from .auth import verify_token
+from .interactions import get_optional_user
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
-@router.get("", response_model=list[ToolResponse])
+# 游标分页默认每页数量
+DEFAULT_PAGE_SIZE = 20
+
+
+@router.get("", response_model=Union[list[ToolResponse], ToolPage])
 async def get_tools(
+    request: Request,
     mode: Literal["category", "all"] = Query("category", description="显示模式"),
-    sort: Literal["default", "hot", "recent", "name"] = Query("default", description="排序方式"),
+    sort: Literal["default", "hot", "recent", "name", "personal"] = Query("default", description="排序方式"),
     keyword: Optional[str] = Query(None, description="搜索关键词"),
     category_id: Optional[int] = Query(None, description="分类ID筛选"),
-    tag_id: Optional[int] = Query(None, description="标签ID筛选"),
+    tag_id: Optional[int] = Query(None, description="标签ID筛选（兼容旧参数，并入 tags）"),
+    tags: Optional[str] = Query(None, description="多标签筛选，逗号分隔的标签ID"),
+    tag_mode: Literal["all", "any"] = Query("all", description="多标签匹配：all 包含全部 / any 包含任一"),
+    facets: bool = Query(False, description="返回结果集内各标签的工具数"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的 next_cursor）"),
+    limit: Optional[int] = Query(None, ge=1, le=100, description="每页数量，不传则返回全部"),
     db: AsyncSession = Depends(get_db),
+    user: Optional[User] = Depends(get_optional_user),
 ):
-    """获取工具列表（支持搜索和排序）"""
-    query = select(Tool).options(selectinload(Tool.category), selectinload(Tool.tags)).where(Tool.is_active == True)
+    """
+    获取工具列表（支持搜索、排序和游标分页，按当前用户的部门/角色过滤可见范围）
+
+    sort=personal 按当前用户预计算的个性化排序，未登录或尚未计算时按热门排序
+
+    不传 limit/cursor 且 facets=false 时返回完整列表；否则返回 {items, next_cursor, facets}
+    """
+    if cursor and not limit:
+        limit = DEFAULT_PAGE_SIZE
+
+    try:
+        tag_ids = parse_tag_ids(tags)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="无效的标签ID")
+    if tag_id and tag_id not in tag_ids:
+        tag_ids = (tag_id, *tag_ids)
+    if len(tag_ids) <= 1:
+        # 单标签时 all/any 等价，统一缓存键
+        tag_mode = "all"
+
+    hidden = await hidden_tool_ids(db, user)
+    personal = None
+    if sort == "personal":
+        personal = await get_personal_ranking(db, user.id) if user else None
+        if personal is None:
+            sort = "hot"
+
+    keyword = keyword.strip() if keyword else None
+    if keyword or personal is not None:
+        # 关键词搜索组合太多、个性化排序因人而异，不走响应缓存
+        return await _list_tools(
+            db, sort, keyword, category_id, tag_ids, cursor, limit, hidden, tag_mode, facets, personal
+        )
+
+    # 不可见集合相同的用户共享同一份缓存
+    cache = hot_responses if sort == "hot" else catalog_responses
+    cached = await cache.get_or_render(
+        ("tools", sort, category_id, tag_ids, tag_mode, facets, cursor, limit, hidden),
+        lambda: _list_tools(db, sort, None, category_id, tag_ids, cursor, limit, hidden, tag_mode, facets),
+    )
+    return respond(request, cached)
+
+
+def _tool_sort_keys(sort: str, hot_clicks=None) -> list[SortKey]:
+    """各排序方式的 keyset 排序键（均以 id 收尾保证唯一）"""
+    if sort == "hot":
+        return [(hot_clicks, True), (Tool.id, False)]
+    if sort == "recent":
+        return [(Tool.created_at, True), (Tool.id, False)]
+    if sort == "name":
+        return [(Tool.name, False), (Tool.id, False)]
+    # 默认按 sort_order
+    return [(Tool.sort_order, False), (Tool.id, False)]
+
+
+def _tool_result(
+    tools: list[Tool],
+    limit: Optional[int],
+    next_cursor: Optional[str] = None,
+    facets: Optional[dict[int, int]] = None,
+) -> Union[list[ToolResponse], ToolPage]:
+    """不分页且不要分面时返回完整列表，否则返回 ToolPage"""
+    items = [ToolResponse.model_validate(t) for t in tools]
+    if limit is None and facets is None:
+        return items
+    return ToolPage(items=items, next_cursor=next_cursor, facets=facets)
+
+
+async def _sort_in_memory(
+    db: AsyncSession,
+    query,
+    cursor_sort: str,
+    key: Callable[[Tool], tuple],
+    key_size: int,
+    cursor: Optional[str],
+    limit: Optional[int],
+    facets: Optional[dict[int, int]],
+) -> Union[list[ToolResponse], ToolPage]:
+    """按内存中的排序键排序分页（游标记录最后一条的排序键）"""
+    tools = sorted((await db.execute(query)).scalars().all(), key=key)
+    if limit is None:
+        return _tool_result(tools, limit, facets=facets)
+    if cursor:
+        after = tuple(decode_cursor(cursor, cursor_sort, key_size))
+        tools = [t for t in tools if key(t) > after]
+    page = tools[:limit]
+    next_cursor = encode_cursor(cursor_sort, list(key(page[-1]))) if len(tools) > limit else None
+    return _tool_result(page, limit, next_cursor, facets)
+
+
+async def _list_tools(
+    db: AsyncSession,
+    sort: str,
+    keyword: Optional[str],
+    category_id: Optional[int],
+    tag_ids: tuple[int, ...] = (),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    hidden: frozenset[int] = frozenset(),
+    tag_mode: TagMode = "all",
+    with_facets: bool = False,
+    personal: Optional[PersonalRanking] = None,
+) -> Union[list[ToolResponse], ToolPage]:
+    """
+    查询工具列表，limit 为空且不要分面时返回完整列表
+
+    hidden 为当前用户不可见的工具；with_facets 时附带完整结果集（不受分页影响）内各标签的工具数；
+    personal 为当前用户的预计算排序（优先于其他排序方式）
+    """
+    empty_facets = {} if with_facets else None
+    conditions = [Tool.is_active == True]
+
+    # 可见范围
+    if hidden:
+        conditions.append(Tool.id.notin_(hidden))
 
     # 分类筛选
     if category_id:
-        query = query.where(Tool.category_id == category_id)
+        conditions.append(Tool.category_id == category_id)
 
-    # 标签筛选
-    if tag_id:
-        query = query.where(Tool.tags.any(Tag.id == tag_id))
+    # 标签筛选（位图索引求交/并）
+    if tag_ids:
+        await tag_index.ensure_fresh(db)
+        matched = tag_index.match(tag_ids, tag_mode)
+        if not matched:
+            return _tool_result([], limit, facets=empty_facets)
+        conditions.append(Tool.id.in_(matched))
 
-    # 关键词搜索
+    # 关键词搜索（内存倒排索引，按相关度排名）
+    rank: dict[int, int] = {}
     if keyword:
-        keyword = keyword.strip()
-        if keyword:
-            query = query.where(
-                or_(
-                    Tool.name.ilike(f"%{keyword}%"),
-                    Tool.description.ilike(f"%{keyword}%")
-                )
-            )
+        hits = await search_tool_index(db, keyword, limit=None, exclude=hidden)
+        if not hits:
+            return _tool_result([], limit, facets=empty_facets)
+        rank = {hit.tool_id: i for i, hit in enumerate(hits)}
+        conditions.append(Tool.id.in_(rank))
+
+    facets = None
+    if with_facets:
+        result_ids = (await db.execute(select(Tool.id).where(*conditions))).scalars().all()
+        await tag_index.ensure_fresh(db)
+        facets = tag_index.facets(result_ids)
+
+    query = select(Tool).options(selectinload(Tool.category), selectinload(Tool.tags)).where(*conditions)
+
+    # 个性化排序：预计算列表合并新上架工具
+    if personal is not None:
+        return await _sort_in_memory(db, query, "personal", personal.sort_key, 3, cursor, limit, facets)
+
+    # 有关键词且为默认排序时按相关度排序（排名在内存中，游标记录排名位置）
+    if rank and sort == "default":
+        return await _sort_in_memory(db, query, "relevance", lambda t: (rank[t.id],), 1, cursor, limit, facets)
 
     # 排序
+    hot_clicks = None
     if sort == "hot":
-        # 按近7天点击量排序
-        seven_days_ago = datetime.now() - timedelta(days=7)
-        click_subquery = (
-            select(ClickLog.tool_id, func.count().label("click_count"))
-            .where(ClickLog.clicked_at >= seven_days_ago)
-            .group_by(ClickLog.tool_id)
-            .subquery()
-        )
-        query = (
-            query
-            .outerjoin(click_subquery, Tool.id == click_subquery.c.tool_id)
-            .order_by(func.coalesce(click_subquery.c.click_count, 0).desc(), Tool.id)
-        )
-    elif sort == "recent":
-        query = query.order_by(Tool.created_at.desc(), Tool.id)
-    elif sort == "name":
-        query = query.order_by(Tool.name, Tool.id)
-    else:
-        # 默认按 sort_order
-        query = query.order_by(Tool.sort_order, Tool.id)
+        # 按计数器中的近7天点击量排序（翻页期间点击量变化可能导致个别工具重复或跳过）
+        hot_clicks = func.coalesce(ToolCounter.click_7d, 0)
+        query = query.outerjoin(ToolCounter, ToolCounter.tool_id == Tool.id)
+
+    keys = _tool_sort_keys(sort, hot_clicks)
+    query = query.order_by(*keyset_order(keys))
 
-    result = await db.execute(query)
-    tools = result.scalars().all()
-    return [ToolResponse.model_validate(t) for t in tools]
+    if limit is None:
+        result = await db.execute(query)
+        return _tool_result(result.scalars().all(), limit, facets=facets)
+
+    if cursor:
+        query = query.where(keyset_after(keys, decode_cursor(cursor, sort, len(keys))))
+    # 排序键一并取出用于生成游标，多取一条判断是否还有下一页
+    query = query.add_columns(*[expr.label(f"sort_key_{i}") for i, (expr, _) in enumerate(keys)])
+    rows = (await db.execute(query.limit(limit + 1))).all()
+
+    page = rows[:limit]
+    next_cursor = encode_cursor(sort, list(page[-1][1:])) if len(rows) > limit else None
+    return _tool_result([row[0] for row in page], limit, next_cursor, facets)
 
 
 @router.get("/search")
@@ -81,25 +229,52 @@ async def search_tools(
     q: str = Query(..., min_length=1, description="搜索关键词"),
     limit: int = Query(20, ge=1, le=50),
     db: AsyncSession = Depends(get_db),
+    user: Optional[User] = Depends(get_optional_user),
 ):
-    """快速搜索工具（轻量接口）"""
-    keyword = q.strip()
-    result = await db.execute(
-        select(Tool.id, Tool.name, Tool.description, Tool.icon_url)
-        .where(
-            Tool.is_active == True,
-            or_(
-                Tool.name.ilike(f"%{keyword}%"),
-                Tool.description.ilike(f"%{keyword}%")
-            )
-        )
-        .order_by(Tool.name)
-        .limit(limit)
-    )
-    rows = result.all()
+    """快速搜索工具（轻量接口，按相关度排序并返回高亮区间）"""
+    hidden = await hidden_tool_ids(db, user)
+    hits = await search_tool_index(db, q.strip(), limit=limit, exclude=hidden)
+    return [hit.to_dict() for hit in hits]
+
+
+@router.get("/suggest")
+async def suggest_tools(
+    prefix: str = Query(..., min_length=1, max_length=50, description="输入前缀"),
+    limit: int = Query(10, ge=1, le=20),
+    db: AsyncSession = Depends(get_db),
+    user: Optional[User] = Depends(get_optional_user),
+):
+    """搜索框自动补全（工具/标签/分类/热门搜索词，按热度排序）"""
+    hidden = await hidden_tool_ids(db, user)
+    suggestions = await suggest(db, prefix, limit=limit, exclude=hidden)
+    return [s.to_dict() for s in suggestions]
+
+
+@router.get("/{tool_id}/related", response_model=list[RelatedTool])
+async def get_related_tools(
+    tool_id: int,
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_db),
+    user: Optional[User] = Depends(get_optional_user),
+):
+    """用过该工具的人也在用（读取每日预计算的点击共现结果）"""
+    hidden = await hidden_tool_ids(db, user)
+    tool = await db.get(Tool, tool_id)
+    if not tool or not tool.is_active or tool_id in hidden:
+        raise HTTPException(status_code=404, detail="工具不存在")
+
+    rows = await get_related(db, tool_id, limit=limit, exclude=hidden)
     return [
-        {"id": r.id, "name": r.name, "description": r.description, "icon_url": r.icon_url}
-        for r in rows
+        RelatedTool(
+            id=related.id,
+            name=related.name,
+            description=related.description,
+            icon_url=related.icon_url,
+            target_url=related.target_url,
+            score=link.score,
+            co_users=link.co_users,
+        )
+        for related, link in rows
     ]
 
 
@@ -148,6 +323,7 @@ async def record_click(
         user_agent=user_agent,
     )
     db.add(click_log)
+    await bump_counters(db, tool_id, click_total=1, click_7d=1)
     await db.commit()
 
     logger.info(f"记录点击: tool_id={tool_id}, user_id={user_id}")
@@ -156,8 +332,12 @@ async def record_click(
 
 
 @router.get("/tags", response_model=list[TagSimple])
-async def get_tags(db: AsyncSession = Depends(get_db)):
+async def get_tags(request: Request, db: AsyncSession = Depends(get_db)):
     """获取所有标签（公开接口）"""
-    result = await db.execute(select(Tag).order_by(Tag.name))
-    tags = result.scalars().all()
-    return [TagSimple.model_validate(t) for t in tags]
+    async def build():
+        result = await db.execute(select(Tag).order_by(Tag.name))
+        tags = result.scalars().all()
+        return [TagSimple.model_validate(t) for t in tags]
+
+    cached = await catalog_responses.get_or_render("tags", build)
+    return respond(request, cached)
@@ -25,6 +25,66 @@ class Settings(BaseSettings):
     debug: bool = False
     app_base_url: str = ""  # 应用访问地址，用于卡片消息链接
 
+    # 搜索配置
+    search_engine: str = "memory"  # memory: 进程内倒排索引; database: PG pg_trgm/tsvector 或 SQLite FTS5
+    search_index_ttl: int = 300  # 内存索引最长存活秒数，多进程部署时兜底刷新
+
+    # 目录接口响应缓存（工具列表/分类树/标签）
+    catalog_cache_ttl: int = 300  # 缓存最长存活秒数，多进程部署时兜底刷新
+
+    # 工具计数器（点赞/收藏/点击）校准间隔
+    counter_reconcile_minutes: int = 60
+
+    # 相关工具（点击共现，每天凌晨重算）
+    related_window_days: int = 90  # 统计最近多少天的点击
+    related_top_n: int = 20  # 每个工具保留的相关工具数
+    related_min_co_users: int = 2  # 共同用户数下限，过滤偶然共现
+    related_max_tools_per_user: int = 200  # 单个用户最多参与计算的工具数
+
+    # 个性化首页排序（每天凌晨在相关工具之后重算）
+    personal_active_days: int = 30  # 最近多少天访问过的用户参与计算
+    personal_window_days: int = 90  # 分类偏好统计的点击窗口
+    personal_top_k: int = 50  # 每个用户保留的工具数
+    personal_weight_category: float = 0.3  # 分类偏好
+    personal_weight_interaction: float = 0.3  # 收藏/点赞
+    personal_weight_related: float = 0.25  # 点击过的工具的相关工具
+    personal_weight_hot: float = 0.15  # 全站近7天热度
+
+    # 搜索历史与搜索日志
+    search_history_size: int = 50  # 每个用户保留的最近搜索关键词数
+    search_log_retention_days: int = 180  # 原始搜索日志保留天数
+
+    # 后台导出任务与结果缓存
+    export_workers: int = 2  # 同时执行的导出任务数
+    export_queue_size: int = 20  # 排队任务数上限
+    export_job_ttl_minutes: int = 60  # 任务完成后状态保留时长
+    export_cache_dir: str = ""  # 结果缓存目录，默认系统临时目录下的 ai_nav_exports
+    export_cache_max_mb: int = 512  # 缓存目录容量上限，超出按最近访问时间淘汰
+
+    # CPU 密集任务执行器（openpyxl 读写、大 JSON 序列化）
+    executor_threads: int = 4  # 线程池大小
+    executor_processes: int = 2  # 进程池大小，0 表示不启用（退回线程池）
+    executor_queue_size: int = 32  # 每个池在途任务超出 worker 数的排队上限，超出时调用方等待
+    executor_timeout: int = 120  # 默认超时秒数
+
+    # 报表推送扇出（并发 + 令牌桶限速，与飞书应用接口频控配额对齐）
+    push_concurrency: int = 10  # 同时在途的发送数
+    push_rate_per_second: float = 20  # 每秒发送上限，0 表示不限速
+    push_burst: int = 20  # 令牌桶容量（允许的瞬时突发）
+    push_max_retries: int = 3  # 单个接收人遇到频控/5xx/网络错误时的重试次数
+    push_retry_base_delay: float = 1.0  # 退避基数秒数（指数增长，全抖动）
+    push_retry_max_delay: float = 30.0  # 单次退避上限秒数
+
+    # 飞书身份缓存（接收人邮箱 -> open_id）
+    feishu_identity_ttl_hours: int = 24  # 已找到的 open_id 缓存时长
+    feishu_identity_miss_ttl_minutes: int = 60  # 未找到的邮箱缓存时长（新入职用户可较快生效）
+
+    # 持久化后台任务（报表推送）
+    job_workers: int = 2  # 每个进程的任务 worker 数
+    job_poll_seconds: float = 2.0  # 无任务时的轮询间隔（本进程提交的任务立即唤醒）
+    job_lease_seconds: int = 60  # 认领租约时长，执行中每 1/3 租约续期一次；进程崩溃后租约过期即被重新认领
+    job_max_attempts: int = 3  # 最多执行次数（含因租约过期被重新认领）
+
     @property
     def admin_list(self) -> list[str]:
         """获取管理员列表"""
@@ -8,6 +8,10 @@ from .api import api_router
 from .config import get_settings
 from .database import init_db
 from .tasks.scheduler import init_scheduler, shutdown_scheduler
+from .services.export_jobs import shutdown_export_jobs
+from .services.executor import shutdown_executors
+from .services.feishu_service import feishu_service
+from .services.job_runner import start_job_runner, shutdown_job_runner
 
 # 配置日志
 logging.basicConfig(
@@ -29,10 +33,15 @@ async def lifespan(app: FastAPI):
         await init_db()
         logger.info("SQLite数据库已初始化")
     init_scheduler()
+    start_job_runner()
     yield
     # 关闭时
     logger.info("应用关闭中...")
     shutdown_scheduler()
+    await shutdown_job_runner()
+    await shutdown_export_jobs()
+    shutdown_executors()
+    await feishu_service.close()
 
 
 app = FastAPI(
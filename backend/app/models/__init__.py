@@ -7,8 +7,14 @@ from .user_interaction import UserFavorite, UserLike
 from .feedback import ToolFeedback
 from .admin_user import AdminUser
 from .search_history import SearchHistory
+from .search_log import SearchLog
 from .tag import Tag, tool_tags
-from .report_push import ReportPushSettings, ReportRecipient, ReportPushHistory
+from .report_push import ReportPushSettings, ReportRecipient, ReportPushHistory, ReportPushDelivery
+from .tool_counter import ToolCounter
+from .tool_related import ToolRelated
+from .user_ranking import UserRanking
+from .feishu_identity import FeishuIdentity
+from .background_job import BackgroundJob
 
 __all__ = [
     "Category",
@@ -21,9 +27,16 @@ __all__ = [
     "ToolFeedback",
     "AdminUser",
     "SearchHistory",
+    "SearchLog",
     "Tag",
     "tool_tags",
     "ReportPushSettings",
     "ReportRecipient",
     "ReportPushHistory",
+    "ReportPushDelivery",
+    "ToolCounter",
+    "ToolRelated",
+    "UserRanking",
+    "FeishuIdentity",
+    "BackgroundJob",
 ]
@@ -0,0 +1,27 @@
+"""后台任务模型"""
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Index
+from ..database import Base
+
+
+class BackgroundJob(Base):
+    """持久化后台任务（worker 以租约方式认领，租约过期未续期的任务会被其他 worker 重新认领）"""
+    __tablename__ = "background_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False, comment="任务类型")
+    payload = Column(JSON, nullable=False, comment="任务参数")
+    status = Column(String(20), nullable=False, default="queued", comment="状态: queued/running/done/failed")
+    attempts = Column(Integer, nullable=False, default=0, comment="已认领次数")
+    max_attempts = Column(Integer, nullable=False, default=3, comment="最多执行次数")
+    run_after = Column(DateTime, nullable=False, default=datetime.now, comment="最早执行时间（失败重试时退避）")
+    lease_owner = Column(String(100), nullable=True, comment="持有租约的 worker")
+    lease_until = Column(DateTime, nullable=True, comment="租约到期时间，执行中由心跳续期")
+    error = Column(Text, nullable=True, comment="最近一次错误")
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
+    started_at = Column(DateTime, nullable=True, comment="最近一次开始执行时间")
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("idx_background_jobs_claim", "status", "run_after"),
+    )
@@ -0,0 +1,16 @@
+"""飞书身份缓存模型"""
+from sqlalchemy import Column, String, DateTime, Index
+from ..database import Base
+
+
+class FeishuIdentity(Base):
+    """邮箱 -> open_id 缓存（未找到的邮箱也记录一行，open_id 为空，避免反复查询）"""
+    __tablename__ = "feishu_identity_cache"
+
+    email = Column(String(100), primary_key=True)
+    open_id = Column(String(100), nullable=True)
+    resolved_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("idx_feishu_identity_resolved", "resolved_at"),
+    )
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, JSON, ForeignKey
 from app.database import Base
 
 
@@ -36,6 +36,17 @@ class ReportPushHistory(Base):
     report_type = Column(String(50), nullable=False, comment="报表类型")
     push_method = Column(String(20), nullable=False, comment="推送方式: feishu/email")
     recipient_count = Column(Integer, default=0, comment="接收人数")
-    status = Column(String(20), default="pending", comment="状态: pending/success/failed")
+    status = Column(String(20), default="pending", comment="状态: pending/running/success/failed")
+    success_count = Column(Integer, default=0, comment="已成功人数")
+    failed_count = Column(Integer, default=0, comment="已失败人数")
     error_msg = Column(Text, nullable=True, comment="错误信息")
     pushed_at = Column(DateTime, default=datetime.utcnow, comment="推送时间")
+
+
+class ReportPushDelivery(Base):
+    """报表推送送达记录（任务重试/重新认领时跳过已送达的接收人）"""
+    __tablename__ = "report_push_deliveries"
+
+    history_id = Column(Integer, ForeignKey("report_push_history.id", ondelete="CASCADE"), primary_key=True)
+    recipient = Column(String(100), primary_key=True, comment="接收人标识: 邮箱或群聊ID")
+    delivered_at = Column(DateTime, default=datetime.utcnow)
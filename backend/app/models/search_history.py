@@ -1,12 +1,12 @@
 """搜索历史模型"""
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from ..database import Base
 
 
 class SearchHistory(Base):
-    """用户搜索历史"""
+    """用户搜索历史（每个用户每个关键词一行，写入时刷新时间并只保留最近 N 条）"""
     __tablename__ = "search_history"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -17,7 +17,8 @@ class SearchHistory(Base):
     # 关系
     user = relationship("User", back_populates="search_histories")
 
-    # 索引：加速用户历史查询
+    # 索引：去重写入 + 按时间倒序读取用户历史
     __table_args__ = (
+        UniqueConstraint("user_id", "keyword", name="uq_search_history_user_keyword"),
         Index("idx_search_history_user_time", "user_id", "searched_at"),
     )
@@ -0,0 +1,14 @@
+"""搜索日志模型"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class SearchLog(Base):
+    """搜索日志（只追加的原始搜索事件，用于热词统计，超过保留期由定时任务清理）"""
+    __tablename__ = "search_logs"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
+    keyword = Column(String(100), nullable=False)
+    searched_at = Column(DateTime, server_default=func.now(), index=True)
@@ -1,5 +1,5 @@
 """工具模型"""
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, JSON, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -31,3 +31,10 @@ class Tool(Base):
     # 关系
     category = relationship("Category", back_populates="tools")
     tags = relationship("Tag", secondary="tool_tags", back_populates="tools")
+
+    # 索引：列表各排序方式的游标分页 (排序键, id)
+    __table_args__ = (
+        Index("idx_tools_sort_id", "sort_order", "id"),
+        Index("idx_tools_created_id", created_at.desc(), "id"),  # 与 sort=recent 的 created_at DESC, id 一致
+        Index("idx_tools_name_id", "name", "id"),
+    )
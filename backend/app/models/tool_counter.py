@@ -0,0 +1,15 @@
+"""工具计数器模型"""
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from ..database import Base
+
+
+class ToolCounter(Base):
+    """工具计数器（反范式化：写入路径增量维护，定时任务按明细表校准）"""
+    __tablename__ = "tool_counters"
+
+    tool_id = Column(Integer, ForeignKey("tools.id", ondelete="CASCADE"), primary_key=True)
+    like_count = Column(Integer, nullable=False, default=0, server_default="0")
+    favorite_count = Column(Integer, nullable=False, default=0, server_default="0")
+    click_total = Column(Integer, nullable=False, default=0, server_default="0")
+    click_7d = Column(Integer, nullable=False, default=0, server_default="0")  # 点击增量累加，过期部分由校准任务扣除
+    reconciled_at = Column(DateTime)
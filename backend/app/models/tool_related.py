@@ -0,0 +1,19 @@
+"""相关工具模型"""
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Index
+from ..database import Base
+
+
+class ToolRelated(Base):
+    """相关工具（"用过 X 的人也用过 Y"，由定时任务按点击共现预计算）"""
+    __tablename__ = "tool_related"
+
+    tool_id = Column(Integer, ForeignKey("tools.id", ondelete="CASCADE"), primary_key=True)
+    related_tool_id = Column(Integer, ForeignKey("tools.id", ondelete="CASCADE"), primary_key=True)
+    rank = Column(Integer, nullable=False)  # 从 1 开始
+    score = Column(Float, nullable=False)  # 余弦相似度：共同用户数 / sqrt(X用户数 * Y用户数)
+    co_users = Column(Integer, nullable=False)  # 共同用户数
+    computed_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("idx_tool_related_rank", "tool_id", "rank"),
+    )
@@ -16,6 +16,7 @@ class User(Base):
     name = Column(String(100))
     avatar_url = Column(String(500))
     department = Column(String(200))
+    role = Column(String(100))  # 角色，与 department 一起用于工具可见范围
 
     first_visit_at = Column(DateTime, server_default=func.now())
     last_visit_at = Column(DateTime, server_default=func.now())
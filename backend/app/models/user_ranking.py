@@ -0,0 +1,12 @@
+"""个性化排序模型"""
+from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey
+from ..database import Base
+
+
+class UserRanking(Base):
+    """用户个性化工具排序（定时任务预计算，每个用户一行，按主键直接读取）"""
+    __tablename__ = "user_rankings"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    tool_ids = Column(Text, nullable=False)  # 按得分降序的工具ID，逗号分隔
+    computed_at = Column(DateTime, nullable=False)
@@ -1,4 +1,4 @@
-from .tool import ToolCreate, ToolUpdate, ToolResponse, ToolList
+from .tool import ToolCreate, ToolUpdate, ToolResponse, ToolAdminResponse, ToolList, ToolPage, RelatedTool
 from .user import UserResponse, LoginRequest, LoginResponse
 from .stats import StatsOverview, ToolStats, UserStats, TrendData
 from .category import (
@@ -6,7 +6,8 @@ from .category import (
     CategoryWithChildren, CategoryTree
 )
 from .interaction import (
-    InteractionResponse, ToolInteractionStats,
+    InteractionResponse, ToolInteractionStats, ToolStatsBatchRequest,
+    InteractionOp, InteractionBatchRequest, InteractionBatchResponse,
     FavoriteToolResponse, FavoriteListResponse,
     SearchHistoryItem, SearchHistoryResponse
 )
@@ -20,12 +21,13 @@ from .tag import (
 )
 
 __all__ = [
-    "ToolCreate", "ToolUpdate", "ToolResponse", "ToolList",
+    "ToolCreate", "ToolUpdate", "ToolResponse", "ToolAdminResponse", "ToolList", "ToolPage", "RelatedTool",
     "UserResponse", "LoginRequest", "LoginResponse",
     "StatsOverview", "ToolStats", "UserStats", "TrendData",
     "CategoryCreate", "CategoryUpdate", "CategoryResponse",
     "CategoryWithChildren", "CategoryTree",
-    "InteractionResponse", "ToolInteractionStats",
+    "InteractionResponse", "ToolInteractionStats", "ToolStatsBatchRequest",
+    "InteractionOp", "InteractionBatchRequest", "InteractionBatchResponse",
     "FavoriteToolResponse", "FavoriteListResponse",
     "SearchHistoryItem", "SearchHistoryResponse",
     "FeedbackType", "FeedbackStatus",
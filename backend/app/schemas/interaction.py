@@ -1,7 +1,7 @@
 """用户交互相关 Schema"""
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Literal
 
 
 class InteractionResponse(BaseModel):
@@ -18,6 +18,29 @@ class ToolInteractionStats(BaseModel):
     is_favorited: bool = False
 
 
+class ToolStatsBatchRequest(BaseModel):
+    """批量获取工具交互统计"""
+    tool_ids: list[int] = Field(..., max_length=200)
+
+
+class InteractionOp(BaseModel):
+    """单条点赞/收藏操作"""
+    tool_id: int
+    type: Literal["like", "favorite"]
+    value: bool  # True 设置 / False 取消
+
+
+class InteractionBatchRequest(BaseModel):
+    """批量设置/取消点赞与收藏（同一工具同一类型以最后一条为准）"""
+    ops: list[InteractionOp] = Field(..., max_length=200)
+
+
+class InteractionBatchResponse(BaseModel):
+    """批量操作结果"""
+    changed: int  # 实际发生变化的条数
+    stats: dict[int, ToolInteractionStats]  # 涉及工具的最新计数与当前用户状态
+
+
 class FavoriteToolResponse(BaseModel):
     """收藏工具响应"""
     id: int
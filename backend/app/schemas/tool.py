@@ -18,7 +18,8 @@ class ToolBase(BaseModel):
 
 class ToolCreate(ToolBase):
     """创建工具"""
-    pass
+    visible_departments: Optional[List[str]] = None  # 可见部门，为空不限制
+    visible_roles: Optional[List[str]] = None  # 可见角色，为空不限制
 
 
 class ToolUpdate(BaseModel):
@@ -31,6 +32,8 @@ class ToolUpdate(BaseModel):
     category_id: Optional[int] = None
     sort_order: Optional[int] = None
     is_active: Optional[bool] = None
+    visible_departments: Optional[List[str]] = None
+    visible_roles: Optional[List[str]] = None
 
 
 class CategoryBrief(BaseModel):
@@ -65,7 +68,32 @@ class ToolResponse(ToolBase):
         from_attributes = True
 
 
+class ToolAdminResponse(ToolResponse):
+    """工具响应（管理后台，含可见范围；公开接口不返回）"""
+    visible_departments: Optional[List[str]] = None
+    visible_roles: Optional[List[str]] = None
+
+
 class ToolList(BaseModel):
-    """工具列表响应"""
+    """工具列表响应（管理后台）"""
     total: int
+    items: list[ToolAdminResponse]
+    next_cursor: Optional[str] = None  # 下一页游标，无更多数据时为空
+
+
+class ToolPage(BaseModel):
+    """工具游标分页响应"""
     items: list[ToolResponse]
+    next_cursor: Optional[str] = None
+    facets: Optional[dict[int, int]] = None  # 标签ID -> 结果集内工具数（facets=true 时返回）
+
+
+class RelatedTool(BaseModel):
+    """相关工具（点击共现）"""
+    id: int
+    name: str
+    description: Optional[str] = None
+    icon_url: Optional[str] = None
+    target_url: str
+    score: float  # 余弦相似度 0~1
+    co_users: int  # 共同用户数
@@ -11,6 +11,7 @@ class UserResponse(BaseModel):
     name: Optional[str] = None
     avatar_url: Optional[str] = None
     department: Optional[str] = None
+    role: Optional[str] = None
     first_visit_at: datetime
     last_visit_at: datetime
     visit_count: int
@@ -0,0 +1,36 @@
+"""工具位图公共工具
+
+按工具ID升序为每个工具分配一个位序号，集合运算用 Python 大整数的按位与/或完成。
+"""
+from typing import Iterable
+
+
+def bit_positions(mask: int) -> Iterable[int]:
+    """依次返回位图中为 1 的位序号（从低位到高位）"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class ToolPositions:
+    """工具ID与位序号的双向映射"""
+
+    def __init__(self, tool_ids: list[int]):
+        self.tool_ids = tool_ids
+        self.positions = {tool_id: i for i, tool_id in enumerate(tool_ids)}
+        self.all = (1 << len(tool_ids)) - 1
+
+    def __len__(self) -> int:
+        return len(self.tool_ids)
+
+    def to_mask(self, tool_ids: Iterable[int]) -> int:
+        mask = 0
+        for tool_id in tool_ids:
+            position = self.positions.get(tool_id)
+            if position is not None:
+                mask |= 1 << position
+        return mask
+
+    def to_ids(self, mask: int) -> list[int]:
+        return [self.tool_ids[i] for i in bit_positions(mask)]
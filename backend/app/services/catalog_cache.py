@@ -0,0 +1,140 @@
+"""目录接口响应缓存 - 预序列化 JSON + gzip + 强 ETag
+
+工具列表、分类树、标签列表每次请求都要走 ORM 加载与逐条 model_validate，而目录一天只改几次。
+这里按目录版本把响应渲染成 JSON 字节（同时备好 gzip 版本）缓存起来，
+请求携带 If-None-Match 且命中时直接返回 304。
+目录写入后由变更通知清空缓存；TTL 兜底多进程部署下其他进程的写入。
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import weakref
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable, Optional
+import logging
+
+from cachetools import TTLCache
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+from ..config import get_settings
+from .catalog_events import on_catalog_change, get_catalog_version
+from .executor import run_in_thread
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 小于该字节数的响应不压缩
+GZIP_MIN_SIZE = 1024
+
+# 依赖点击数据的响应（sort=hot）单独缓存，过期更快
+HOT_TTL = 60
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """预渲染响应"""
+    body: bytes
+    gzip_body: Optional[bytes]
+    etag: str
+
+    @property
+    def gzip_etag(self) -> str:
+        # 强 ETag 按表示区分：压缩版本使用不同的标签
+        return self.etag[:-1] + '-gz"'
+
+
+def render(payload: Any) -> CachedResponse:
+    """序列化为紧凑 JSON，并按需生成 gzip 版本"""
+    body = json.dumps(jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    gzip_body = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_SIZE else None
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    return CachedResponse(body=body, gzip_body=gzip_body, etag=etag)
+
+
+def _etag_matches(if_none_match: Optional[str], cached: CachedResponse) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # 兼容反向代理追加的弱标记 W/
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return cached.etag in tags or cached.gzip_etag in tags
+
+
+def _accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """按 Accept-Encoding 的 q 值判断是否接受 gzip（gzip;q=0、"identity, *;q=0" 均视为不接受）"""
+    if not accept_encoding:
+        return False
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+    q = weights.get("gzip", weights.get("x-gzip", weights.get("*", 0.0)))
+    return q > 0
+
+
+def respond(request: Request, cached: CachedResponse) -> Response:
+    """按 If-None-Match / Accept-Encoding 返回 304、gzip 或原始 JSON"""
+    headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    use_gzip = cached.gzip_body is not None and _accepts_gzip(request.headers.get("accept-encoding"))
+    headers["ETag"] = cached.gzip_etag if use_gzip else cached.etag
+
+    if _etag_matches(request.headers.get("if-none-match"), cached):
+        return Response(status_code=304, headers=headers)
+
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=cached.gzip_body, media_type="application/json", headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+class CatalogResponseCache:
+    """按目录版本缓存的响应集合"""
+
+    def __init__(self, maxsize: int, ttl: int):
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # 渲染锁只在有请求持有时存在：键含游标等客户端可任意取值的参数，不能常驻
+        self._locks: weakref.WeakValueDictionary[Hashable, asyncio.Lock] = weakref.WeakValueDictionary()
+
+    def clear(self, tool_ids: Optional[set[int]] = None):
+        self._cache.clear()
+
+    async def get_or_render(self, key: Hashable, build: Callable[[], Awaitable[Any]]) -> CachedResponse:
+        """命中直接返回；未命中时同一 key 只渲染一次，并发请求等待结果"""
+        version = get_catalog_version()
+        cached = self._cache.get((version, key))
+        if cached is not None:
+            return cached
+
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        async with lock:
+            cached = self._cache.get((version, key))
+            if cached is None:
+                # 序列化与压缩放到线程池，大响应不阻塞事件循环
+                cached = await run_in_thread(render, await build())
+                # 渲染期间目录已变更则不写入，避免缓存旧数据
+                if version == get_catalog_version():
+                    self._cache[(version, key)] = cached
+        return cached
+
+
+catalog_responses = CatalogResponseCache(maxsize=256, ttl=settings.catalog_cache_ttl)
+hot_responses = CatalogResponseCache(maxsize=64, ttl=min(HOT_TTL, settings.catalog_cache_ttl))
+on_catalog_change(catalog_responses.clear)
+on_catalog_change(hot_responses.clear)
@@ -0,0 +1,68 @@
+"""目录变更通知 - 工具/分类/标签写入后通知各内存索引与缓存"""
+from typing import Awaitable, Callable, Iterable, Optional
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# 监听函数签名: listener(tool_ids)，tool_ids 为 None 表示整体变更（分类/标签/批量导入）
+CatalogListener = Callable[[Optional[set[int]]], None]
+
+# 提交后钩子签名: await hook(db, tool_ids)，用于同步数据库侧的派生数据（如全文索引影子表）
+CatalogCommitHook = Callable[[AsyncSession, Optional[set[int]]], Awaitable[None]]
+
+_listeners: list[CatalogListener] = []
+_commit_hooks: list[CatalogCommitHook] = []
+_version = 0
+
+
+def on_catalog_change(listener: CatalogListener) -> CatalogListener:
+    """注册目录变更监听（可作装饰器使用）"""
+    _listeners.append(listener)
+    return listener
+
+
+def on_catalog_commit(hook: CatalogCommitHook) -> CatalogCommitHook:
+    """注册目录提交后钩子（可作装饰器使用）"""
+    _commit_hooks.append(hook)
+    return hook
+
+
+def notify_catalog_changed(tool_ids: Optional[Iterable[int]] = None):
+    """
+    通知目录已变更（在 commit 之后调用）
+
+    Args:
+        tool_ids: 受影响的工具ID；不传表示整体变更，监听方应全量重建
+    """
+    global _version
+    _version += 1
+    ids = set(tool_ids) if tool_ids is not None else None
+
+    for listener in _listeners:
+        try:
+            listener(ids)
+        except Exception as e:
+            logger.error(f"目录变更监听执行失败: {e}")
+
+
+async def publish_catalog_change(db: AsyncSession, tool_ids: Optional[Iterable[int]] = None):
+    """
+    目录写入提交后调用：先执行数据库同步钩子，再通知内存监听
+
+    钩子失败只记录日志，不影响已提交的写入
+    """
+    ids = set(tool_ids) if tool_ids is not None else None
+    for hook in _commit_hooks:
+        try:
+            await hook(db, ids)
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"目录同步钩子执行失败: {e}")
+    notify_catalog_changed(ids)
+
+
+def get_catalog_version() -> int:
+    """当前进程内的目录版本号"""
+    return _version
@@ -0,0 +1,73 @@
+"""分类树构建
+
+两条只取列的扁平查询（启用的分类、启用的工具），用 id 字典一次挂接成树，支持任意层级。
+停用的分类连同其子树一并隐藏。输出字段与 CategoryWithChildren / ToolBrief 一致。
+"""
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import Category, Tool
+
+
+async def build_category_tree(db: AsyncSession, exclude: frozenset[int] = frozenset()) -> list[dict[str, Any]]:
+    """查询并构建分类树（同级按 sort_order、id 排序），exclude 为当前用户不可见的工具"""
+    category_rows = (await db.execute(
+        select(
+            Category.id, Category.name, Category.parent_id, Category.icon_url,
+            Category.color, Category.sort_order, Category.is_active, Category.created_at,
+        )
+        .where(Category.is_active == True)
+        .order_by(Category.sort_order, Category.id)
+    )).all()
+
+    nodes: dict[int, dict[str, Any]] = {}
+    for row in category_rows:
+        nodes[row.id] = {
+            "id": row.id,
+            "name": row.name,
+            "parent_id": row.parent_id,
+            "icon_url": row.icon_url,
+            "color": row.color,
+            "sort_order": row.sort_order or 0,
+            "is_active": row.is_active,
+            "created_at": row.created_at,
+            "children": [],
+            "tools": [],
+        }
+
+    # 按排序顺序挂接，父节点不在（已停用）的子树不会被根节点引用到
+    roots = []
+    for row in category_rows:
+        node = nodes[row.id]
+        if row.parent_id is None:
+            roots.append(node)
+        elif row.parent_id in nodes:
+            nodes[row.parent_id]["children"].append(node)
+
+    tool_rows = (await db.execute(
+        select(
+            Tool.id, Tool.name, Tool.description, Tool.icon_url, Tool.target_url,
+            Tool.provider, Tool.sort_order, Tool.category_id,
+        )
+        .where(Tool.is_active == True, Tool.category_id.is_not(None))
+        .order_by(Tool.sort_order, Tool.id)
+    )).all()
+
+    for row in tool_rows:
+        if row.id in exclude:
+            continue
+        node = nodes.get(row.category_id)
+        if node is not None:
+            node["tools"].append({
+                "id": row.id,
+                "name": row.name,
+                "description": row.description,
+                "icon_url": row.icon_url,
+                "target_url": row.target_url,
+                "provider": row.provider,
+                "sort_order": row.sort_order or 0,
+            })
+
+    return roots
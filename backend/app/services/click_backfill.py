@@ -0,0 +1,365 @@
+"""历史点击回填 - 从旧系统导出的 CSV / NDJSON 批量导入 click_logs
+
+- 逐行流式解析（支持 gzip 压缩文件），不把文件读进内存；解压与解析按批在线程池中进行，不阻塞事件循环
+- 工具名称/ID、用户 open_id/ID 通过导入前一次性加载的内存索引映射，逐行不查库
+- 每 BATCH_SIZE 行写入一次并提交：PostgreSQL（asyncpg）用 COPY，其他数据库用多行 INSERT
+- 导入完成后校准受影响工具的计数器；数据落在相关工具/个性化排序的统计窗口内时一并重算
+  （HTTP 接口不重算，留给每天凌晨的定时任务）
+
+字段（CSV 表头或 NDJSON 键，与点击明细导出一致）：
+    clicked_at（必填，ISO 8601 或 Unix 时间戳）
+    tool_name 或 tool_id（至少一个，优先按名称匹配）
+    open_id 或 user_id（可选，缺省为匿名点击）
+    client_type / ip_address / user_agent（可选）
+
+无法解析的行（坏 JSON、非对象、时间无效）计为无效行并跳过，不中断回填。
+回填不去重，重复导入同一文件会重复计数，可先用 dry_run 校验映射结果。
+"""
+import csv
+import gzip
+import io
+import json
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Any, AsyncIterator, BinaryIO, Iterator, Literal, Optional
+import logging
+
+from sqlalchemy import select, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..models import Tool, User, ClickLog
+from .counter_service import dialect_insert, reconcile_counters
+from .related_service import build_related
+from .personal_service import build_personal
+from .executor import run_in_thread
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+BackfillFormat = Literal["csv", "ndjson"]
+
+# 每批写入并提交的行数
+BATCH_SIZE = 5000
+# 结果中保留的未匹配工具名称数
+UNKNOWN_SAMPLE = 20
+
+COPY_COLUMNS = ["user_id", "tool_id", "clicked_at", "client_type", "ip_address", "user_agent"]
+
+
+@dataclass
+class BackfillResult:
+    """回填结果"""
+    dry_run: bool = False
+    read: int = 0
+    inserted: int = 0
+    invalid: int = 0
+    unknown_tools: Counter = field(default_factory=Counter)
+    unknown_users: int = 0
+    created_users: int = 0
+    first_click: Optional[datetime] = None
+    last_click: Optional[datetime] = None
+    tool_ids: set[int] = field(default_factory=set)
+    rebuilt: list[str] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+    seconds: float = 0.0
+    rebuild_seconds: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "dry_run": self.dry_run,
+            "read": self.read,
+            "inserted": self.inserted,
+            "invalid": self.invalid,
+            "unknown_tools": sum(self.unknown_tools.values()),
+            "unknown_tool_names": [name for name, _ in self.unknown_tools.most_common(UNKNOWN_SAMPLE)],
+            "unknown_users": self.unknown_users,
+            "created_users": self.created_users,
+            "first_click": self.first_click,
+            "last_click": self.last_click,
+            "tools": len(self.tool_ids),
+            "rebuilt": self.rebuilt,
+            "errors": self.errors,
+            "seconds": round(self.seconds, 2),
+            "rows_per_second": round(self.read / self.seconds) if self.seconds else 0,
+            "rebuild_seconds": round(self.rebuild_seconds, 2),
+        }
+
+
+def detect_format(filename: str) -> BackfillFormat:
+    """按文件扩展名判断格式（忽略 .gz）"""
+    name = filename.lower().removesuffix(".gz")
+    return "ndjson" if name.endswith((".ndjson", ".jsonl", ".json")) else "csv"
+
+
+def iter_records(raw: BinaryIO, fmt: BackfillFormat) -> Iterator[tuple[Optional[dict[str, Any]], Optional[str]]]:
+    """
+    逐行读取记录，gzip 文件按魔数自动解压
+
+    Yields:
+        (记录, None)，或无法解析的行 (None, 错误原因)，由调用方计为无效行后继续
+    """
+    if raw.read(2) == b"\x1f\x8b":
+        raw.seek(0)
+        raw = gzip.GzipFile(fileobj=raw, mode="rb")  # 上传文件的 mode 为 w+b，需显式指定
+    else:
+        raw.seek(0)
+    text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        while True:
+            try:
+                yield next(reader), None
+            except StopIteration:
+                return
+            except csv.Error as e:
+                yield None, f"CSV 格式错误: {e}"
+    else:
+        for line in text:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield None, f"JSON 格式错误: {e}"
+                continue
+            if isinstance(record, dict):
+                yield record, None
+            else:
+                yield None, f"不是 JSON 对象: {line.strip()[:50]!r}"
+
+
+def _parse_time(value: Any) -> datetime:
+    if isinstance(value, (int, float)) or (isinstance(value, str) and value.replace(".", "", 1).isdigit()):
+        return datetime.fromtimestamp(float(value))
+    dt = datetime.fromisoformat(str(value).strip())
+    # 带时区的时间统一转为本地时间（库中按本地时间存储）
+    return dt.astimezone().replace(tzinfo=None) if dt.tzinfo else dt
+
+
+def _text(value: Any, limit: Optional[int] = None) -> Optional[str]:
+    if value is None or value == "":
+        return None
+    return str(value)[:limit]
+
+
+def _int(value: Any) -> Optional[int]:
+    try:
+        return int(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+class _Index:
+    """工具与用户的内存映射"""
+
+    def __init__(self, tools: list[tuple[int, str]], users: list[tuple[int, str]]):
+        self.tool_ids = {tool_id for tool_id, _ in tools}
+        # 同名工具取最早的一条
+        self.tools_by_name = {name: tool_id for tool_id, name in reversed(tools)}
+        self.user_ids = {user_id for user_id, _ in users}
+        self.users_by_open_id = {open_id: user_id for user_id, open_id in users}
+
+    def tool(self, record: dict) -> Optional[int]:
+        name = record.get("tool_name")
+        if name and name in self.tools_by_name:
+            return self.tools_by_name[name]
+        tool_id = _int(record.get("tool_id"))
+        return tool_id if tool_id in self.tool_ids else None
+
+    def user(self, record: dict) -> Optional[int]:
+        open_id = record.get("open_id")
+        if open_id and open_id in self.users_by_open_id:
+            return self.users_by_open_id[open_id]
+        user_id = _int(record.get("user_id"))
+        return user_id if user_id in self.user_ids else None
+
+
+async def _iter_offloaded(records: Iterator, batch_size: int) -> AsyncIterator[tuple[int, Any]]:
+    """按批在线程池中推进读取（解压、CSV/JSON 解析），不阻塞事件循环"""
+    line_no = 0
+    while batch := await run_in_thread(list, islice(records, batch_size)):
+        for item in batch:
+            line_no += 1
+            yield line_no, item
+
+
+async def _load_index(db: AsyncSession) -> _Index:
+    tools = (await db.execute(select(Tool.id, Tool.name).order_by(Tool.id))).all()
+    users = (await db.execute(select(User.id, User.open_id))).all()
+    return _Index(tools, users)
+
+
+async def _create_users(db: AsyncSession, index: _Index, pending: dict[str, dict]) -> int:
+    """为未知 open_id 批量建用户（首次/最近访问时间取其点击时间），返回新建数"""
+    stmt = (
+        dialect_insert(db, User)
+        .values(list(pending.values()))
+        .on_conflict_do_nothing(index_elements=["open_id"])
+        .returning(User.id)
+    )
+    created = len((await db.execute(stmt)).all())
+    rows = await db.execute(select(User.id, User.open_id).where(User.open_id.in_(list(pending))))
+    for user_id, open_id in rows.all():
+        index.user_ids.add(user_id)
+        index.users_by_open_id[open_id] = user_id
+    return created
+
+
+async def _write(db: AsyncSession, rows: list[dict]):
+    """写入一批：asyncpg 走 COPY，其余多行 INSERT"""
+    bind = db.get_bind()
+    if bind.dialect.name == "postgresql" and bind.dialect.driver == "asyncpg":
+        conn = await db.connection()
+        raw = (await conn.get_raw_connection()).driver_connection
+        await raw.copy_records_to_table(
+            ClickLog.__tablename__,
+            records=[tuple(row[column] for column in COPY_COLUMNS) for row in rows],
+            columns=COPY_COLUMNS,
+        )
+    else:
+        await db.execute(insert(ClickLog.__table__), rows)
+
+
+async def _rebuild(db: AsyncSession, result: BackfillResult, rankings: bool):
+    """
+    重算受影响的统计：计数器（受影响工具）；rankings=True 时数据落在窗口内的相关工具、个性化排序也一并重算，
+    否则留给每天凌晨的定时任务
+    """
+    repaired = await reconcile_counters(db, sorted(result.tool_ids))
+    result.rebuilt.append(f"tool_counters({repaired})")
+    if not rankings:
+        return
+
+    now = datetime.now()
+    if result.last_click >= now - timedelta(days=settings.related_window_days):
+        await build_related(db)
+        result.rebuilt.append("tool_related")
+    if result.last_click >= now - timedelta(days=settings.personal_window_days):
+        await build_personal(db)
+        result.rebuilt.append("user_rankings")
+
+
+async def backfill_clicks(
+    db: AsyncSession,
+    raw: BinaryIO,
+    fmt: BackfillFormat = "csv",
+    create_users: bool = False,
+    dry_run: bool = False,
+    batch_size: int = BATCH_SIZE,
+    rebuild_rankings: bool = True,
+) -> BackfillResult:
+    """
+    流式回填历史点击
+
+    Args:
+        raw: 二进制文件对象（需可 seek，用于识别 gzip）
+        create_users: 为未知 open_id 新建用户；否则记为匿名点击
+        dry_run: 只解析和映射，不写库
+        rebuild_rankings: 完成后立即重算相关工具与个性化排序（纯 Python 计算，耗时较长）；
+            False 时留给每天凌晨的定时任务
+
+    Returns:
+        BackfillResult: 读取/写入/跳过行数、耗时与每秒行数
+    """
+    result = BackfillResult(dry_run=dry_run)
+    start = time.perf_counter()
+    index = await _load_index(db)
+
+    rows: list[dict] = []
+    pending_users: dict[str, dict] = {}  # open_id -> 待建用户
+    new_open_ids: set[str] = set()  # dry_run 时统计将新建的用户
+    waiting: list[tuple[dict, str]] = []  # 等待用户建好后回填 user_id 的行
+
+    async def flush():
+        if dry_run:
+            new_open_ids.update(pending_users)
+        elif pending_users:
+            result.created_users += await _create_users(db, index, pending_users)
+            for row, open_id in waiting:
+                row["user_id"] = index.users_by_open_id.get(open_id)
+        pending_users.clear()
+        waiting.clear()
+        if rows and not dry_run:
+            await _write(db, rows)
+            await db.commit()
+            result.inserted += len(rows)
+            elapsed = time.perf_counter() - start
+            logger.info(f"点击回填进度: 已写入 {result.inserted} 行, {round(result.read / elapsed)} 行/秒")
+        rows.clear()
+
+    try:
+        async for line_no, (record, error) in _iter_offloaded(iter_records(raw, fmt), batch_size):
+            result.read += 1
+            if error:
+                result.invalid += 1
+                if len(result.errors) < UNKNOWN_SAMPLE:
+                    result.errors.append(f"第{line_no}条 {error}")
+                continue
+            try:
+                clicked_at = _parse_time(record["clicked_at"])
+            except (KeyError, TypeError, ValueError, OverflowError):
+                result.invalid += 1
+                if len(result.errors) < UNKNOWN_SAMPLE:
+                    result.errors.append(f"第{line_no}条 点击时间无效: {record.get('clicked_at')!r}")
+                continue
+
+            tool_id = index.tool(record)
+            if tool_id is None:
+                result.unknown_tools[str(record.get("tool_name") or record.get("tool_id"))] += 1
+                continue
+
+            row = {
+                "user_id": index.user(record),
+                "tool_id": tool_id,
+                "clicked_at": clicked_at,
+                "client_type": _text(record.get("client_type"), 20),
+                "ip_address": _text(record.get("ip_address"), 50),
+                "user_agent": _text(record.get("user_agent")),
+            }
+            open_id = record.get("open_id")
+            if row["user_id"] is None and open_id:
+                if create_users:
+                    pending_users.setdefault(open_id, {
+                        "open_id": open_id,
+                        "name": _text(record.get("user_name"), 100),
+                        "department": _text(record.get("department"), 200),
+                        "first_visit_at": clicked_at,
+                        "last_visit_at": clicked_at,
+                    })
+                    waiting.append((row, open_id))
+                else:
+                    result.unknown_users += 1
+            rows.append(row)
+
+            result.tool_ids.add(tool_id)
+            if result.first_click is None or clicked_at < result.first_click:
+                result.first_click = clicked_at
+            if result.last_click is None or clicked_at > result.last_click:
+                result.last_click = clicked_at
+
+            if len(rows) >= batch_size:
+                await flush()
+        await flush()
+    except Exception as e:
+        await db.rollback()
+        result.errors.append(f"回填中断（已提交 {result.inserted} 行）: {str(e)}")
+        logger.error(f"点击回填失败: {e}")
+
+    result.seconds = time.perf_counter() - start
+    if dry_run:
+        result.created_users = len(new_open_ids)
+    elif result.inserted:
+        try:
+            await _rebuild(db, result, rebuild_rankings)
+        except Exception as e:
+            await db.rollback()
+            result.errors.append(f"统计重算失败（可等待定时任务）: {str(e)}")
+            logger.error(f"点击回填后统计重算失败: {e}", exc_info=True)
+        result.rebuild_seconds = time.perf_counter() - start - result.seconds
+
+    logger.info(f"点击回填{'校验' if dry_run else '完成'}: {result.to_dict()}")
+    return result
@@ -0,0 +1,144 @@
+"""原始点击日志导出 - CSV / NDJSON 流式输出，可选 gzip
+
+点击明细按时间范围关联工具、分类、用户名称后逐批输出，不在内存中保留结果集：
+- PostgreSQL 的 CSV 导出使用 COPY (SELECT ...) TO STDOUT，由数据库直接产出 CSV 字节
+- 其他情况走服务端游标（db.stream）按批格式化
+gzip 在输出过程中逐块压缩。导出自行打开数据库会话，不依赖请求会话的生命周期。
+"""
+import asyncio
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, time, timedelta
+from typing import AsyncIterator, Literal, Optional
+import logging
+
+from sqlalchemy import select
+
+from ..database import async_session, engine
+from ..models import Tool, User, Category, ClickLog
+from .executor import run_in_thread
+
+logger = logging.getLogger(__name__)
+
+ClickExportFormat = Literal["csv", "ndjson"]
+
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+# 服务端游标每批取出的行数
+FETCH_SIZE = 5000
+# COPY 输出缓冲的块数上限（消费方跟不上时反压数据库）
+COPY_QUEUE_SIZE = 32
+
+COLUMNS = [
+    ("id", ClickLog.id),
+    ("clicked_at", ClickLog.clicked_at),
+    ("user_id", ClickLog.user_id),
+    ("user_name", User.name),
+    ("department", User.department),
+    ("tool_id", ClickLog.tool_id),
+    ("tool_name", Tool.name),
+    ("category_name", Category.name),
+    ("client_type", ClickLog.client_type),
+    ("ip_address", ClickLog.ip_address),
+    ("user_agent", ClickLog.user_agent),
+]
+FIELD_NAMES = [name for name, _ in COLUMNS]
+
+
+def click_query(start: Optional[date], end: Optional[date]):
+    """点击明细查询（按 id 排序，end 为包含当天的结束日期）"""
+    query = (
+        select(*[column.label(name) for name, column in COLUMNS])
+        .outerjoin(User, ClickLog.user_id == User.id)
+        .outerjoin(Tool, ClickLog.tool_id == Tool.id)
+        .outerjoin(Category, Tool.category_id == Category.id)
+        .order_by(ClickLog.id)
+    )
+    if start:
+        query = query.where(ClickLog.clicked_at >= datetime.combine(start, time.min))
+    if end:
+        query = query.where(ClickLog.clicked_at < datetime.combine(end + timedelta(days=1), time.min))
+    return query
+
+
+def _format_csv(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _format_ndjson(rows) -> bytes:
+    lines = (json.dumps(dict(zip(FIELD_NAMES, row)), ensure_ascii=False, default=str) for row in rows)
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+async def _stream_rows(query, fmt: ClickExportFormat) -> AsyncIterator[bytes]:
+    """服务端游标逐批格式化"""
+    if fmt == "csv":
+        yield _format_csv([FIELD_NAMES])
+    formatter = _format_csv if fmt == "csv" else _format_ndjson
+    async with async_session() as db:
+        result = await db.stream(query)
+        async for partition in result.partitions(FETCH_SIZE):
+            yield await run_in_thread(formatter, partition)
+
+
+async def _copy_csv(query) -> AsyncIterator[bytes]:
+    """PostgreSQL COPY TO STDOUT（asyncpg 驱动），数据库按块推送 CSV"""
+    queue: asyncio.Queue = asyncio.Queue(maxsize=COPY_QUEUE_SIZE)
+
+    async def copy():
+        cancelled = False
+        try:
+            async with async_session() as db:
+                conn = await db.connection()
+                compiled = query.compile(dialect=conn.dialect)
+                args = [compiled.params[name] for name in compiled.positiontup]
+                raw = (await conn.get_raw_connection()).driver_connection
+                await raw.copy_from_query(
+                    str(compiled), *args, output=queue.put, format="csv", header=True
+                )
+        except asyncio.CancelledError:
+            # 客户端已断开、消费方不再读取队列，发送结束标记会永久阻塞
+            cancelled = True
+            raise
+        finally:
+            if not cancelled:
+                await queue.put(None)
+
+    task = asyncio.create_task(copy())
+    try:
+        while (chunk := await queue.get()) is not None:
+            yield chunk
+        # 传播 COPY 过程中的异常
+        await task
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+async def _gzip(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31：gzip 格式
+    async for chunk in chunks:
+        data = await run_in_thread(compressor.compress, chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_clicks(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    fmt: ClickExportFormat = "csv",
+    compress: bool = False,
+) -> AsyncIterator[bytes]:
+    """按时间范围导出点击明细，返回字节块的异步迭代器（供 StreamingResponse 使用）"""
+    query = click_query(start, end)
+    if fmt == "csv" and engine.dialect.name == "postgresql" and engine.dialect.driver == "asyncpg":
+        chunks = _copy_csv(query)
+    else:
+        chunks = _stream_rows(query, fmt)
+    logger.info(f"导出点击明细: {start} ~ {end}, 格式 {fmt}, gzip={compress}")
+    return _gzip(chunks) if compress else chunks
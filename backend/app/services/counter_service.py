@@ -0,0 +1,134 @@
+"""工具计数器服务
+
+点赞/收藏/点击的写入路径在同一事务内增量更新 tool_counters，读取方不再对明细表 COUNT(*)。
+click_7d 只做累加，滑出 7 天窗口的点击由定时校准任务扣除；校准同时修复
+用户注销级联删除、并发写入等造成的偏差。
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+import logging
+
+from sqlalchemy import select, func, case, or_, true, literal, DateTime
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import Tool, ToolCounter, UserLike, UserFavorite, ClickLog
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = ("like_count", "favorite_count", "click_total", "click_7d")
+
+# 与热门排序一致的点击窗口
+CLICK_WINDOW_DAYS = 7
+
+
+def dialect_insert(db: AsyncSession, table):
+    """按当前数据库方言返回支持 ON CONFLICT 的 insert 构造器"""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+async def bump_counters(db: AsyncSession, tool_id: int, **deltas: int):
+    """
+    增量更新计数（不提交，由调用方与明细写入一起 commit）
+
+    Example:
+        await bump_counters(db, tool_id, like_count=1)
+    """
+    stmt = dialect_insert(db, ToolCounter).values(
+        tool_id=tool_id, **{field: max(delta, 0) for field, delta in deltas.items()}
+    )
+    updates = {}
+    for field, delta in deltas.items():
+        column = getattr(ToolCounter, field)
+        # 计数不低于 0（极端并发下的偏差交给校准任务）
+        updates[field] = case((column + delta < 0, 0), else_=column + delta)
+    await db.execute(stmt.on_conflict_do_update(index_elements=[ToolCounter.tool_id], set_=updates))
+
+
+async def get_counters(db: AsyncSession, tool_ids: list[int]) -> dict[int, dict[str, int]]:
+    """批量读取计数，没有计数行的工具按 0 返回"""
+    counters = {tool_id: dict.fromkeys(COUNTER_FIELDS, 0) for tool_id in tool_ids}
+    if not tool_ids:
+        return counters
+    result = await db.execute(select(ToolCounter).where(ToolCounter.tool_id.in_(tool_ids)))
+    for row in result.scalars().all():
+        counters[row.tool_id] = {field: getattr(row, field) or 0 for field in COUNTER_FIELDS}
+    return counters
+
+
+async def get_counter(db: AsyncSession, tool_id: int) -> dict[str, int]:
+    return (await get_counters(db, [tool_id]))[tool_id]
+
+
+def _actual_counts(tool_ids: Optional[list[int]] = None):
+    """从明细表统计计数的查询（列：tool_id + COUNTER_FIELDS），tool_ids 过滤下推到各明细表"""
+    since = datetime.now() - timedelta(days=CLICK_WINDOW_DAYS)
+
+    def grouped(model, *conditions):
+        query = select(model.tool_id, func.count().label("n")).where(*conditions)
+        if tool_ids is not None:
+            query = query.where(model.tool_id.in_(tool_ids))
+        return query.group_by(model.tool_id).subquery()
+
+    counts = {
+        "like_count": grouped(UserLike),
+        "favorite_count": grouped(UserFavorite),
+        "click_total": grouped(ClickLog),
+        "click_7d": grouped(ClickLog, ClickLog.clicked_at >= since),
+    }
+    query = select(Tool.id, *(func.coalesce(sub.c.n, 0).label(field) for field, sub in counts.items()))
+    for sub in counts.values():
+        query = query.outerjoin(sub, sub.c.tool_id == Tool.id)
+    # SQLite 的 INSERT ... SELECT ... ON CONFLICT 要求 SELECT 带 WHERE，否则 ON 会被解析为 JOIN 条件
+    return query.where(Tool.id.in_(tool_ids) if tool_ids is not None else true())
+
+
+async def reconcile_counters(db: AsyncSession, tool_ids: Optional[list[int]] = None) -> int:
+    """
+    按明细表校准计数器
+
+    统计与写入是同一条 INSERT ... SELECT ... ON CONFLICT 语句，
+    不会覆盖读取之后才提交的 bump_counters 增量；只更新与明细不一致的计数行。
+
+    Returns:
+        修正的工具数（含新建计数行）
+    """
+    if tool_ids is not None and not tool_ids:
+        return 0
+
+    # 修正前的值只用于记录偏差日志
+    stored_query = select(ToolCounter)
+    if tool_ids is not None:
+        stored_query = stored_query.where(ToolCounter.tool_id.in_(tool_ids))
+    stored = {
+        row.tool_id: {field: getattr(row, field) or 0 for field in COUNTER_FIELDS}
+        for row in (await db.execute(stored_query)).scalars().all()
+    }
+
+    now = datetime.now()
+    columns = ["tool_id", *COUNTER_FIELDS, "reconciled_at"]
+    stmt = dialect_insert(db, ToolCounter).from_select(
+        columns, _actual_counts(tool_ids).add_columns(literal(now, DateTime).label("reconciled_at"))
+    )
+    current = ToolCounter.__table__.c
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ToolCounter.tool_id],
+        set_={field: stmt.excluded[field] for field in (*COUNTER_FIELDS, "reconciled_at")},
+        where=or_(*(current[field] != stmt.excluded[field] for field in COUNTER_FIELDS)),
+    ).returning(ToolCounter.tool_id, *(current[field] for field in COUNTER_FIELDS))
+
+    repaired = 0
+    for row in (await db.execute(stmt)).all():
+        repaired += 1
+        before = stored.get(row.tool_id)
+        if before is None:
+            continue
+        drift = {f: getattr(row, f) - before[f] for f in COUNTER_FIELDS if getattr(row, f) != before[f]}
+        # click_7d 的窗口滑出属于预期，不视为异常
+        if set(drift) - {"click_7d"}:
+            logger.warning(f"计数器偏差已修正: tool_id={row.tool_id}, 偏差={drift}")
+
+    await db.commit()
+    return repaired
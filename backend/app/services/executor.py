@@ -0,0 +1,124 @@
+"""CPU 密集任务执行器 - 把 openpyxl 读写、大 JSON 序列化等从事件循环挪到线程池/进程池
+
+- 线程池：与调用方共享内存（流式写工作表、渲染缓存响应等），释放 GIL 的库（解压、加解密）可真正并行
+- 进程池：参数和返回值可 pickle 的独立计算（整份报表生成、整表解析），不受 GIL 限制；
+  EXECUTOR_PROCESSES=0 时退回线程池
+- 每个池最多 workers + EXECUTOR_QUEUE_SIZE 个任务在途，超出时调用方等待（反压），不无限堆积
+- 超时只停止等待并抛出 TimeoutError，已在执行的任务无法中断，会继续占用 worker 直至完成
+"""
+import asyncio
+import functools
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+import logging
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+T = TypeVar("T")
+
+
+class _Pool:
+    """带在途上限与统计的执行器"""
+
+    def __init__(self, name: str, workers: int, factory: Callable[[int], Executor]):
+        self.name = name
+        self.workers = workers
+        self._factory = factory
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.busy_seconds = 0.0
+
+    def _ensure(self):
+        if self._executor is None:
+            self._executor = self._factory(self.workers)
+            self._slots = asyncio.Semaphore(self.workers + settings.executor_queue_size)
+
+    async def run(self, fn: Callable[..., T], *args, timeout: Optional[float] = None, **kwargs) -> T:
+        self._ensure()
+        timeout = timeout or settings.executor_timeout
+        deadline = time.monotonic() + timeout
+
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning(f"执行器排队超时: {self.name} {getattr(fn, '__name__', fn)}, 在途 {self.in_flight}")
+            raise TimeoutError(f"{self.name} 池排队超时: {getattr(fn, '__name__', fn)}")
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        start = time.perf_counter()
+        future = asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        # 超时不影响 slot 归还：future 完成时才释放
+        future.add_done_callback(lambda _: self._release(start))
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), max(deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning(f"执行器任务超时: {self.name} {getattr(fn, '__name__', fn)}（{timeout} 秒）")
+            raise TimeoutError(f"{self.name} 池执行超时（{timeout} 秒）: {getattr(fn, '__name__', fn)}")
+        except Exception:
+            self.failed += 1
+            raise
+        self.completed += 1
+        return result
+
+    def _release(self, start: float):
+        self.in_flight -= 1
+        self.busy_seconds += time.perf_counter() - start
+        self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queue_depth": max(self.in_flight - self.workers, 0),
+            "max_in_flight": self.max_in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "busy_seconds": round(self.busy_seconds, 2),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_threads = _Pool(
+    "thread", settings.executor_threads,
+    lambda n: ThreadPoolExecutor(max_workers=n, thread_name_prefix="cpu"),
+)
+_processes = _Pool("process", settings.executor_processes, lambda n: ProcessPoolExecutor(max_workers=n))
+
+
+async def run_in_thread(fn: Callable[..., T], *args, timeout: Optional[float] = None, **kwargs) -> T:
+    """在线程池中执行（可访问调用方的对象）"""
+    return await _threads.run(fn, *args, timeout=timeout, **kwargs)
+
+
+async def run_in_process(fn: Callable[..., T], *args, timeout: Optional[float] = None, **kwargs) -> T:
+    """在进程池中执行（fn 须为模块级函数，参数与返回值须可 pickle）；未启用进程池时走线程池"""
+    pool = _processes if _processes.workers > 0 else _threads
+    return await pool.run(fn, *args, timeout=timeout, **kwargs)
+
+
+def executor_stats() -> dict[str, Any]:
+    """各池的在途任务、排队深度与累计统计"""
+    return {"thread": _threads.stats(), "process": _processes.stats()}
+
+
+def shutdown_executors():
+    """关闭执行器（应用关闭时调用，不等待未完成的任务）"""
+    _threads.shutdown()
+    _processes.shutdown()
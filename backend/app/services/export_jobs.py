@@ -0,0 +1,260 @@
+"""导出任务队列 - 后台生成报表，可轮询进度，结果按数据版本缓存在本地磁盘
+
+- 提交导出返回任务ID，任务由固定数量的后台 worker 依次执行，排队数有上限
+- 生成结果以 (报表类型, 参数, 数据版本) 的哈希为键存入缓存目录；同一份数据重复导出直接命中文件
+- 数据版本取自该报表依赖的表上的轻量聚合（最大ID/行数/最后更新时间），
+  按时间窗口统计的报表另外带上当天日期
+- 缓存目录超出容量时按最近访问时间淘汰（命中时刷新文件 mtime），多进程共用同一目录
+- 任务状态保存在进程内存中，完成后保留 EXPORT_JOB_TTL_MINUTES 分钟
+"""
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Literal, Optional
+import logging
+
+from fastapi import HTTPException
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..database import async_session
+from ..models import Tool, User, ClickLog, UserFavorite, UserLike, ToolFeedback
+from .export_service import ExportService
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+ExportType = Literal["tools", "users", "trend", "interactions", "providers", "wants"]
+JobStatus = Literal["queued", "running", "done", "failed"]
+
+# 报表类型 -> (ExportService 方法, 是否带 days 参数, 下载文件名前缀)
+EXPORT_TYPES: dict[str, tuple[str, bool, str]] = {
+    "tools": ("export_tools_stats", True, "tools_stats"),
+    "users": ("export_users_stats", True, "users_stats"),
+    "trend": ("export_trend_stats", True, "trend_stats"),
+    "interactions": ("export_interactions_stats", False, "interactions_stats"),
+    "providers": ("export_providers_stats", False, "providers_stats"),
+    "wants": ("export_wants_stats", False, "wants_stats"),
+}
+
+# 各报表依赖的数据版本（单条聚合查询）
+_VERSION_COLUMNS = {
+    "tools": lambda: [func.max(Tool.updated_at), select(func.max(ClickLog.id)).scalar_subquery()],
+    "users": lambda: [func.max(User.id), select(func.max(ClickLog.id)).scalar_subquery()],
+    "trend": lambda: [func.max(ClickLog.id)],
+    "interactions": lambda: [
+        func.max(Tool.updated_at),
+        select(func.max(UserFavorite.id)).scalar_subquery(),
+        select(func.count(UserFavorite.id)).scalar_subquery(),
+        select(func.max(UserLike.id)).scalar_subquery(),
+        select(func.count(UserLike.id)).scalar_subquery(),
+    ],
+    "providers": lambda: [func.max(Tool.updated_at), func.count(Tool.id), select(func.max(ClickLog.id)).scalar_subquery()],
+    "wants": lambda: [func.max(ToolFeedback.id), func.count(ToolFeedback.id), func.max(ToolFeedback.updated_at)],
+}
+
+
+@dataclass
+class ExportJob:
+    """导出任务"""
+    id: str
+    type: str
+    params: dict
+    key: str
+    status: JobStatus = "queued"
+    rows: int = 0
+    cached: bool = False
+    error: Optional[str] = None
+    path: Optional[Path] = None
+    created_at: datetime = field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def filename(self) -> str:
+        return f"{EXPORT_TYPES[self.type][2]}_{self.created_at.date().isoformat()}.xlsx"
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "type": self.type,
+            "params": self.params,
+            "status": self.status,
+            "rows": self.rows,
+            "cached": self.cached,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "download_url": f"/api/admin/export-jobs/{self.id}/download" if self.status == "done" else None,
+        }
+
+    def finish(self, status: JobStatus, path: Optional[Path] = None, error: Optional[str] = None):
+        self.status, self.path, self.error = status, path, error
+        self.finished_at = datetime.now()
+        self.done.set()
+
+
+class ExportCache:
+    """磁盘上的导出结果缓存（按访问时间 LRU 淘汰）"""
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.xlsx"
+
+    def get(self, key: str) -> Optional[Path]:
+        path = self._path(key)
+        try:
+            os.utime(path)  # 刷新访问顺序
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, source: Path) -> Path:
+        """把生成好的临时文件移入缓存（原子替换），并淘汰超出容量的旧文件"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        os.replace(source, path)
+        self._evict(keep=path)
+        return path
+
+    def _evict(self, keep: Path):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".xlsx") and entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, Path(entry.path)))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            # 正在下载的文件已被打开，删除后仍可读完；不允许删除已打开文件的平台上跳过
+            try:
+                path.unlink(missing_ok=True)
+            except OSError as e:
+                logger.warning(f"导出缓存淘汰失败: {path.name}: {e}")
+                continue
+            total -= size
+            logger.info(f"导出缓存淘汰: {path.name}")
+
+
+cache = ExportCache(
+    Path(settings.export_cache_dir or Path(tempfile.gettempdir()) / "ai_nav_exports"),
+    settings.export_cache_max_mb * 1024 * 1024,
+)
+
+_jobs: dict[str, ExportJob] = {}
+_active: dict[str, ExportJob] = {}  # 缓存键 -> 排队/执行中的任务（相同导出合并）
+_queue: Optional[asyncio.Queue] = None
+_workers: list[asyncio.Task] = []
+
+
+async def _data_version(db: AsyncSession, export_type: str, params: dict) -> list:
+    version = list((await db.execute(select(*_VERSION_COLUMNS[export_type]()))).one())
+    if "days" in params:
+        version.append(date.today())
+    return version
+
+
+def _cache_key(export_type: str, params: dict, version: list) -> str:
+    raw = json.dumps([export_type, params, version], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def _prune_jobs():
+    cutoff = datetime.now() - timedelta(minutes=settings.export_job_ttl_minutes)
+    for job_id in [j.id for j in _jobs.values() if j.finished_at and j.finished_at < cutoff]:
+        del _jobs[job_id]
+
+
+async def _run(job: ExportJob):
+    method = EXPORT_TYPES[job.type][0]
+
+    def progress(rows: int):
+        job.rows = rows
+
+    async with async_session() as db:
+        path = await getattr(ExportService(db, on_progress=progress), method)(**job.params)
+    return cache.put(job.key, path)
+
+
+async def _worker():
+    while True:
+        job = await _queue.get()
+        job.status, job.started_at = "running", datetime.now()
+        try:
+            path = await _run(job)
+            job.finish("done", path=path)
+            logger.info(f"导出任务完成: {job.id} {job.type} {job.rows} 行")
+        except Exception as e:
+            logger.error(f"导出任务失败: {job.id} {job.type}: {e}")
+            job.finish("failed", error=str(e))
+        finally:
+            _active.pop(job.key, None)
+            _queue.task_done()
+
+
+def _ensure_workers():
+    global _queue
+    if _queue is None:
+        _queue = asyncio.Queue(maxsize=settings.export_queue_size)
+    if not _workers:
+        _workers.extend(asyncio.create_task(_worker()) for _ in range(settings.export_workers))
+
+
+async def submit_export(export_type: str, days: Optional[int] = None) -> ExportJob:
+    """
+    提交导出任务
+
+    已有缓存时直接返回已完成的任务；相同导出正在排队或执行时返回该任务；队列已满返回 429
+    """
+    params = {"days": days or 30} if EXPORT_TYPES[export_type][1] else {}
+    async with async_session() as db:
+        version = await _data_version(db, export_type, params)
+    key = _cache_key(export_type, params, version)
+
+    _prune_jobs()
+    if key in _active:
+        return _active[key]
+
+    job = ExportJob(id=uuid.uuid4().hex, type=export_type, params=params, key=key)
+    path = cache.get(key)
+    if path:
+        job.cached = True
+        job.finish("done", path=path)
+        _jobs[job.id] = job
+        return job
+
+    _ensure_workers()
+    try:
+        _queue.put_nowait(job)
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=429, detail="导出任务排队已满，请稍后再试")
+    _jobs[job.id] = job
+    _active[key] = job
+    return job
+
+
+def get_export_job(job_id: str) -> Optional[ExportJob]:
+    return _jobs.get(job_id)
+
+
+async def shutdown_export_jobs():
+    """停止后台 worker（应用关闭时调用）"""
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
@@ -1,221 +1,219 @@
-"""数据导出服务"""
-import io
-from datetime import date, datetime, timedelta
+"""数据导出服务
+
+报表以 openpyxl 只写模式（write_only）生成：行从数据库游标按批取出后直接追加到工作表临时文件，
+表头/数据单元格共用工作簿级命名样式，不再为每个单元格创建样式对象，内存占用与行数无关。
+每批行的追加与最终保存在执行器线程池中进行，不阻塞事件循环。
+生成结果写入临时文件，由接口按块流式返回并在发送完毕后删除。
+"""
+import os
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, AsyncIterator, BinaryIO, Callable, Iterable, Optional
 from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle
 from openpyxl.utils import get_column_letter
-from sqlalchemy import select, func, distinct
+from sqlalchemy import select, func, distinct, case
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
-from ..models import Tool, User, Category, ClickLog, UserFavorite, UserLike, ToolFeedback
+from ..models import Tool, User, ClickLog, UserFavorite, UserLike, ToolFeedback
+from .executor import run_in_thread
 import logging
 
 logger = logging.getLogger(__name__)
 
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# 数据库游标每批取出的行数
+FETCH_SIZE = 2000
+# 导出文件按块下发的大小
+CHUNK_SIZE = 64 * 1024
+
+HEADER_STYLE = "export_header"
+CELL_STYLE = "export_cell"
+
+
+def _named_styles() -> list[NamedStyle]:
+    """命名样式（每个工作簿注册一次，单元格按名称引用）"""
+    thin = Side(style="thin")
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    return [
+        NamedStyle(
+            name=HEADER_STYLE,
+            font=Font(bold=True, color="FFFFFF"),
+            fill=PatternFill(start_color="667eea", end_color="667eea", fill_type="solid"),
+            alignment=Alignment(horizontal="center", vertical="center"),
+            border=border,
+        ),
+        NamedStyle(name=CELL_STYLE, border=border),
+    ]
+
+
+class SheetWriter:
+    """只写模式的单工作表报表"""
+
+    def __init__(self, title: str, headers: list[str], column_widths: list[int]):
+        self.wb = Workbook(write_only=True)
+        for style in _named_styles():
+            self.wb.add_named_style(style)
+        self.ws = self.wb.create_sheet(title)
+        self.rows = 0
+
+        # 只写模式下列宽必须在写入第一行之前设置
+        for col, width in enumerate(column_widths, 1):
+            self.ws.column_dimensions[get_column_letter(col)].width = width
+        self.ws.append([self._cell(header, HEADER_STYLE) for header in headers])
+
+    def _cell(self, value: Any, style: str) -> WriteOnlyCell:
+        cell = WriteOnlyCell(self.ws, value=value)
+        cell.style = style
+        return cell
+
+    def append(self, values: Iterable[Any]):
+        self.ws.append([self._cell(value, CELL_STYLE) for value in values])
+        self.rows += 1
+
+    def append_rows(self, rows: Iterable, to_values: Callable[[int, Any], Iterable[Any]]):
+        """追加一批数据行，to_values(序号, 行) 返回单元格值"""
+        for row in rows:
+            self.append(to_values(self.rows + 1, row))
+
+    def save(self) -> Path:
+        """保存到临时文件并返回路径（调用方负责删除）"""
+        fd, name = tempfile.mkstemp(prefix="export_", suffix=".xlsx")
+        os.close(fd)
+        try:
+            self.wb.save(name)
+        except Exception:
+            os.unlink(name)
+            raise
+        return Path(name)
+
+
+async def iter_file(f: BinaryIO) -> AsyncIterator[bytes]:
+    """按块读取已打开的导出文件（供 StreamingResponse 使用），发送完毕或客户端断开后关闭"""
+    with f:
+        while chunk := f.read(CHUNK_SIZE):
+            yield chunk
+
+
+def calc_trend(current, previous):
+    if previous == 0:
+        return 100.0 if current > 0 else 0.0
+    return round((current - previous) / previous * 100, 1)
+
+
+def format_datetime(dt):
+    if not dt:
+        return ""
+    if isinstance(dt, str):
+        return dt[:16]
+    return dt.strftime("%Y-%m-%d %H:%M")
+
 
 class ExportService:
-    """数据导出服务"""
+    """数据导出服务（各方法返回生成好的临时文件路径）"""
 
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, on_progress: Optional[Callable[[int], None]] = None):
+        """
+        Args:
+            on_progress: 进度回调，每写完一批调用一次，参数为已写入行数
+        """
         self.db = db
-
-    async def export_tools_stats(self, days: int = 30) -> bytes:
+        self.on_progress = on_progress
+
+    async def _write_rows(self, sheet: SheetWriter, query, to_values) -> Path:
+        """流式执行查询（服务端游标），逐批写入工作表"""
+        result = await self.db.stream(query)
+        async for partition in result.partitions(FETCH_SIZE):
+            await run_in_thread(sheet.append_rows, partition, to_values)
+            if self.on_progress:
+                self.on_progress(sheet.rows)
+        path = await run_in_thread(sheet.save)
+        logger.info(f"导出完成: {sheet.ws.title} {sheet.rows} 行")
+        return path
+
+    async def export_tools_stats(self, days: int = 30) -> Path:
         """导出工具点击统计报表（与页面字段一致）"""
         now = datetime.now()
         current_start = now - timedelta(days=days)
         previous_start = current_start - timedelta(days=days)
 
-        # 当前周期统计
-        current_query = (
+        # 当前周期与上周期（用于计算环比）在同一次扫描中按条件聚合
+        in_current = ClickLog.clicked_at >= current_start
+        pv = func.count(case((in_current, ClickLog.id)))
+        query = (
             select(
                 Tool.id,
                 Tool.name,
                 Tool.provider,
-                func.count(ClickLog.id).label("pv"),
-                func.count(distinct(ClickLog.user_id)).label("uv"),
+                pv.label("pv"),
+                func.count(distinct(case((in_current, ClickLog.user_id)))).label("uv"),
+                func.count(case((~in_current, ClickLog.id))).label("prev_pv"),
+                func.count(distinct(case((~in_current, ClickLog.user_id)))).label("prev_uv"),
             )
             .join(ClickLog, Tool.id == ClickLog.tool_id)
-            .where(ClickLog.clicked_at >= current_start)
+            .where(ClickLog.clicked_at >= previous_start)
             .group_by(Tool.id, Tool.name, Tool.provider)
-            .order_by(func.count(ClickLog.id).desc())
+            .having(pv > 0)
+            .order_by(pv.desc())
         )
-        current_result = await self.db.execute(current_query)
-        current_rows = current_result.all()
-
-        # 获取上周期数据用于计算环比
-        tool_ids = [row.id for row in current_rows]
-        previous_stats = {}
-        if tool_ids:
-            previous_query = (
-                select(
-                    ClickLog.tool_id,
-                    func.count(ClickLog.id).label("pv"),
-                    func.count(distinct(ClickLog.user_id)).label("uv"),
-                )
-                .where(
-                    ClickLog.tool_id.in_(tool_ids),
-                    ClickLog.clicked_at >= previous_start,
-                    ClickLog.clicked_at < current_start
-                )
-                .group_by(ClickLog.tool_id)
-            )
-            previous_result = await self.db.execute(previous_query)
-            for row in previous_result.all():
-                previous_stats[row.tool_id] = {"pv": row.pv, "uv": row.uv}
-
-        def calc_trend(current, previous):
-            if previous == 0:
-                return 100.0 if current > 0 else 0.0
-            return round((current - previous) / previous * 100, 1)
-
-        # 创建 Excel
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "工具点击统计"
-
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="667eea", end_color="667eea", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        thin_border = Border(
-            left=Side(style='thin'), right=Side(style='thin'),
-            top=Side(style='thin'), bottom=Side(style='thin')
-        )
-
-        # 写入表头（与页面一致）
-        headers = ["排名", "工具名称", "提供者", "PV", "UV", "PV环比(%)", "UV环比(%)"]
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-            cell.border = thin_border
-
-        # 写入数据
-        for row_idx, row in enumerate(current_rows, 2):
-            prev = previous_stats.get(row.id, {"pv": 0, "uv": 0})
-            pv_trend = calc_trend(row.pv, prev["pv"])
-            uv_trend = calc_trend(row.uv, prev["uv"])
-
-            ws.cell(row=row_idx, column=1, value=row_idx - 1).border = thin_border
-            ws.cell(row=row_idx, column=2, value=row.name).border = thin_border
-            ws.cell(row=row_idx, column=3, value=row.provider or "-").border = thin_border
-            ws.cell(row=row_idx, column=4, value=row.pv or 0).border = thin_border
-            ws.cell(row=row_idx, column=5, value=row.uv or 0).border = thin_border
-            ws.cell(row=row_idx, column=6, value=pv_trend).border = thin_border
-            ws.cell(row=row_idx, column=7, value=uv_trend).border = thin_border
-
-        # 调整列宽
-        column_widths = [8, 25, 15, 12, 12, 12, 12]
-        for col, width in enumerate(column_widths, 1):
-            ws.column_dimensions[get_column_letter(col)].width = width
 
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
-        return output.read()
-
-    async def export_users_stats(self, days: int = 30) -> bytes:
+        sheet = SheetWriter(
+            "工具点击统计",
+            ["排名", "工具名称", "提供者", "PV", "UV", "PV环比(%)", "UV环比(%)"],
+            [8, 25, 15, 12, 12, 12, 12],
+        )
+        return await self._write_rows(sheet, query, lambda rank, row: (
+            rank,
+            row.name,
+            row.provider or "-",
+            row.pv or 0,
+            row.uv or 0,
+            calc_trend(row.pv, row.prev_pv),
+            calc_trend(row.uv, row.prev_uv),
+        ))
+
+    async def export_users_stats(self, days: int = 30) -> Path:
         """导出用户分析报表（与页面字段一致）"""
         now = datetime.now()
         current_start = now - timedelta(days=days)
         previous_start = current_start - timedelta(days=days)
 
-        # 当前周期统计
-        current_query = (
+        in_current = ClickLog.clicked_at >= current_start
+        click_count = func.count(case((in_current, ClickLog.id)))
+        query = (
             select(
                 User.id,
                 User.name,
-                func.count(ClickLog.id).label("click_count"),
-                func.max(ClickLog.clicked_at).label("last_click"),
+                click_count.label("click_count"),
+                func.max(case((in_current, ClickLog.clicked_at))).label("last_click"),
+                func.count(case((~in_current, ClickLog.id))).label("prev_count"),
             )
             .join(ClickLog, User.id == ClickLog.user_id)
-            .where(ClickLog.clicked_at >= current_start)
+            .where(ClickLog.clicked_at >= previous_start)
             .group_by(User.id, User.name)
-            .order_by(func.count(ClickLog.id).desc())
-        )
-        current_result = await self.db.execute(current_query)
-        current_rows = current_result.all()
-
-        # 获取上周期数据用于计算环比
-        user_ids = [row.id for row in current_rows]
-        previous_stats = {}
-        if user_ids:
-            previous_query = (
-                select(
-                    ClickLog.user_id,
-                    func.count(ClickLog.id).label("click_count"),
-                )
-                .where(
-                    ClickLog.user_id.in_(user_ids),
-                    ClickLog.clicked_at >= previous_start,
-                    ClickLog.clicked_at < current_start
-                )
-                .group_by(ClickLog.user_id)
-            )
-            previous_result = await self.db.execute(previous_query)
-            for row in previous_result.all():
-                previous_stats[row.user_id] = row.click_count
-
-        def calc_trend(current, previous):
-            if previous == 0:
-                return 100.0 if current > 0 else 0.0
-            return round((current - previous) / previous * 100, 1)
-
-        def format_datetime(dt):
-            if not dt:
-                return ""
-            if isinstance(dt, str):
-                return dt[:16]
-            return dt.strftime("%Y-%m-%d %H:%M")
-
-        # 创建 Excel
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "用户分析"
-
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="667eea", end_color="667eea", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        thin_border = Border(
-            left=Side(style='thin'), right=Side(style='thin'),
-            top=Side(style='thin'), bottom=Side(style='thin')
+            .having(click_count > 0)
+            .order_by(click_count.desc())
         )
 
-        # 写入表头（与页面一致）
-        headers = ["排名", "用户", "点击次数", "环比(%)", "最后访问"]
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-            cell.border = thin_border
-
-        # 写入数据
-        for row_idx, row in enumerate(current_rows, 2):
-            prev_clicks = previous_stats.get(row.id, 0)
-            click_trend = calc_trend(row.click_count, prev_clicks)
-
-            ws.cell(row=row_idx, column=1, value=row_idx - 1).border = thin_border
-            ws.cell(row=row_idx, column=2, value=row.name or "未知用户").border = thin_border
-            ws.cell(row=row_idx, column=3, value=row.click_count or 0).border = thin_border
-            ws.cell(row=row_idx, column=4, value=click_trend).border = thin_border
-            ws.cell(row=row_idx, column=5, value=format_datetime(row.last_click)).border = thin_border
-
-        # 调整列宽
-        column_widths = [8, 20, 12, 12, 18]
-        for col, width in enumerate(column_widths, 1):
-            ws.column_dimensions[get_column_letter(col)].width = width
-
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
-        return output.read()
-
-    async def export_trend_stats(self, days: int = 30) -> bytes:
+        sheet = SheetWriter(
+            "用户分析",
+            ["排名", "用户", "点击次数", "环比(%)", "最后访问"],
+            [8, 20, 12, 12, 18],
+        )
+        return await self._write_rows(sheet, query, lambda rank, row: (
+            rank,
+            row.name or "未知用户",
+            row.click_count or 0,
+            calc_trend(row.click_count, row.prev_count),
+            format_datetime(row.last_click),
+        ))
+
+    async def export_trend_stats(self, days: int = 30) -> Path:
         """导出趋势统计报表"""
         start_date = datetime.now() - timedelta(days=days)
 
-        # 查询趋势数据
         query = (
             select(
                 func.date(ClickLog.clicked_at).label("date"),
@@ -227,53 +225,14 @@ class ExportService:
             .order_by(func.date(ClickLog.clicked_at))
         )
 
-        result = await self.db.execute(query)
-        rows = result.all()
-
-        # 创建 Excel
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "趋势统计"
-
-        # 表头样式
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="667eea", end_color="667eea", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-
-        # 写入表头
-        headers = ["日期", "PV(浏览量)", "UV(独立访客)"]
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-            cell.border = thin_border
-
-        # 写入数据
-        for row_idx, row in enumerate(rows, 2):
-            date_str = row.date if isinstance(row.date, str) else row.date.isoformat()
-            ws.cell(row=row_idx, column=1, value=date_str).border = thin_border
-            ws.cell(row=row_idx, column=2, value=row.pv or 0).border = thin_border
-            ws.cell(row=row_idx, column=3, value=row.uv or 0).border = thin_border
-
-        # 调整列宽
-        column_widths = [15, 15, 15]
-        for col, width in enumerate(column_widths, 1):
-            ws.column_dimensions[get_column_letter(col)].width = width
-
-        # 保存到内存
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
-        return output.read()
+        sheet = SheetWriter("趋势统计", ["日期", "PV(浏览量)", "UV(独立访客)"], [15, 15, 15])
+        return await self._write_rows(sheet, query, lambda _, row: (
+            row.date if isinstance(row.date, str) else row.date.isoformat(),
+            row.pv or 0,
+            row.uv or 0,
+        ))
 
-    async def export_interactions_stats(self) -> bytes:
+    async def export_interactions_stats(self) -> Path:
         """导出工具互动统计报表"""
         # 收藏统计子查询
         fav_subq = (
@@ -310,48 +269,21 @@ class ExportService:
             )
         )
 
-        result = await self.db.execute(query)
-        rows = result.all()
-
-        # 创建 Excel
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "工具互动统计"
-
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="667eea", end_color="667eea", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        thin_border = Border(
-            left=Side(style='thin'), right=Side(style='thin'),
-            top=Side(style='thin'), bottom=Side(style='thin')
+        sheet = SheetWriter(
+            "工具互动统计",
+            ["工具ID", "工具名称", "提供者", "收藏数", "点赞数", "总计"],
+            [10, 25, 15, 12, 12, 12],
         )
-
-        headers = ["工具ID", "工具名称", "提供者", "收藏数", "点赞数", "总计"]
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-            cell.border = thin_border
-
-        for row_idx, row in enumerate(rows, 2):
-            ws.cell(row=row_idx, column=1, value=row.id).border = thin_border
-            ws.cell(row=row_idx, column=2, value=row.name).border = thin_border
-            ws.cell(row=row_idx, column=3, value=row.provider or "-").border = thin_border
-            ws.cell(row=row_idx, column=4, value=row.favorite_count).border = thin_border
-            ws.cell(row=row_idx, column=5, value=row.like_count).border = thin_border
-            ws.cell(row=row_idx, column=6, value=row.favorite_count + row.like_count).border = thin_border
-
-        column_widths = [10, 25, 15, 12, 12, 12]
-        for col, width in enumerate(column_widths, 1):
-            ws.column_dimensions[get_column_letter(col)].width = width
-
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
-        return output.read()
-
-    async def export_providers_stats(self) -> bytes:
+        return await self._write_rows(sheet, query, lambda _, row: (
+            row.id,
+            row.name,
+            row.provider or "-",
+            row.favorite_count,
+            row.like_count,
+            row.favorite_count + row.like_count,
+        ))
+
+    async def export_providers_stats(self) -> Path:
         """导出提供者统计报表"""
         query = (
             select(
@@ -367,46 +299,15 @@ class ExportService:
             .order_by(func.count(Tool.id).desc())
         )
 
-        result = await self.db.execute(query)
-        rows = result.all()
-
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "提供者统计"
-
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="667eea", end_color="667eea", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        thin_border = Border(
-            left=Side(style='thin'), right=Side(style='thin'),
-            top=Side(style='thin'), bottom=Side(style='thin')
-        )
-
-        headers = ["提供者", "贡献工具数", "总点击数", "平均点击"]
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-            cell.border = thin_border
-
-        for row_idx, row in enumerate(rows, 2):
-            avg_clicks = round(row.click_count / row.tool_count) if row.tool_count > 0 else 0
-            ws.cell(row=row_idx, column=1, value=row.provider).border = thin_border
-            ws.cell(row=row_idx, column=2, value=row.tool_count).border = thin_border
-            ws.cell(row=row_idx, column=3, value=row.click_count).border = thin_border
-            ws.cell(row=row_idx, column=4, value=avg_clicks).border = thin_border
-
-        column_widths = [20, 15, 15, 15]
-        for col, width in enumerate(column_widths, 1):
-            ws.column_dimensions[get_column_letter(col)].width = width
-
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
-        return output.read()
+        sheet = SheetWriter("提供者统计", ["提供者", "贡献工具数", "总点击数", "平均点击"], [20, 15, 15, 15])
+        return await self._write_rows(sheet, query, lambda _, row: (
+            row.provider,
+            row.tool_count,
+            row.click_count,
+            round(row.click_count / row.tool_count) if row.tool_count > 0 else 0,
+        ))
 
-    async def export_wants_stats(self) -> bytes:
+    async def export_wants_stats(self) -> Path:
         """导出用户想要统计报表"""
         query = (
             select(
@@ -420,38 +321,5 @@ class ExportService:
             .order_by(func.count(ToolFeedback.id).desc())
         )
 
-        result = await self.db.execute(query)
-        rows = result.all()
-
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "用户想要"
-
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="667eea", end_color="667eea", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        thin_border = Border(
-            left=Side(style='thin'), right=Side(style='thin'),
-            top=Side(style='thin'), bottom=Side(style='thin')
-        )
-
-        headers = ["工具名称", "想要次数"]
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-            cell.border = thin_border
-
-        for row_idx, row in enumerate(rows, 2):
-            ws.cell(row=row_idx, column=1, value=row.tool_name).border = thin_border
-            ws.cell(row=row_idx, column=2, value=row.want_count).border = thin_border
-
-        column_widths = [30, 15]
-        for col, width in enumerate(column_widths, 1):
-            ws.column_dimensions[get_column_letter(col)].width = width
-
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
-        return output.read()
+        sheet = SheetWriter("用户想要", ["工具名称", "想要次数"], [30, 15])
+        return await self._write_rows(sheet, query, lambda _, row: (row.tool_name, row.want_count))
@@ -0,0 +1,161 @@
+"""推送扇出 - 并发、限速、逐个接收人重试
+
+- 固定数量的 worker 从接收人列表取任务，同时在途的发送数不超过 PUSH_CONCURRENCY
+- 令牌桶限速（PUSH_RATE_PER_SECOND / PUSH_BURST），进程内所有推送共用一个桶，与飞书应用的接口频控配额对齐
+- 只对可重试错误（HTTP 429、5xx、飞书频控错误码、网络错误）重试：指数退避 + 全抖动，
+  响应带频控重置时间时至少等到重置；每次重试重新取令牌
+- 进度按间隔回调，调用方据此增量写库
+"""
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterable, Optional, TypeVar
+import logging
+
+import httpx
+
+from ..config import get_settings
+from .feishu_service import FeishuAPIError
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+T = TypeVar("T")
+
+# 结果中保留的错误条数
+ERROR_SAMPLE = 50
+
+
+class TokenBucket:
+    """令牌桶：按 rate 个/秒补充，最多积攒 burst 个；等待者按先后顺序取令牌"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+bucket = TokenBucket(settings.push_rate_per_second, settings.push_burst)
+
+
+@dataclass
+class FanOutResult:
+    """扇出结果"""
+    total: int = 0
+    success: int = 0
+    failed: int = 0
+    retries: int = 0
+    errors: list[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def done(self) -> int:
+        return self.success + self.failed
+
+    def fail(self, message: str):
+        self.failed += 1
+        if len(self.errors) < ERROR_SAMPLE:
+            self.errors.append(message)
+
+
+def retry_delay(exc: Exception, attempt: int) -> Optional[float]:
+    """可重试错误返回本次退避秒数，否则返回 None"""
+    if isinstance(exc, FeishuAPIError) and exc.retryable:
+        floor = exc.retry_after or 0
+    elif isinstance(exc, httpx.TransportError):
+        floor = 0
+    else:
+        return None
+    backoff = min(settings.push_retry_max_delay, settings.push_retry_base_delay * 2 ** attempt)
+    return max(random.uniform(0, backoff), floor)
+
+
+async def call_with_retry(
+    fn: Callable[..., Awaitable[T]], *args, on_retry: Optional[Callable[[], Any]] = None, **kwargs
+) -> T:
+    """限速调用 fn，可重试错误按退避重试至 PUSH_MAX_RETRIES 次"""
+    attempt = 0
+    while True:
+        await bucket.acquire()
+        try:
+            return await fn(*args, **kwargs)
+        except Exception as e:
+            delay = retry_delay(e, attempt)
+            if delay is None or attempt >= settings.push_max_retries:
+                raise
+            attempt += 1
+            if on_retry:
+                on_retry()
+            logger.warning(f"{getattr(fn, '__name__', fn)} 第{attempt}次重试（{delay:.1f} 秒后）: {e}")
+            await asyncio.sleep(delay)
+
+
+async def fan_out(
+    items: Iterable[T],
+    send: Callable[[T], Awaitable[Any]],
+    label: Callable[[T], str] = str,
+    on_progress: Optional[Callable[[FanOutResult], Awaitable[None]]] = None,
+    progress_interval: float = 1.0,
+    concurrency: Optional[int] = None,
+) -> FanOutResult:
+    """
+    对每个 item 并发调用 send（限速 + 重试），单个失败不影响其他
+
+    Args:
+        send: 发送函数，抛出异常即视为该接收人失败
+        label: 错误信息中标识接收人
+        on_progress: 进度回调，两次回调至少间隔 progress_interval 秒（结束时不回调，由调用方写最终结果）
+    """
+    items = list(items)
+    result = FanOutResult(total=len(items))
+    pending = iter(items)
+    start = time.perf_counter()
+    last_progress = start
+    reporting = False  # 同一时刻只有一个 worker 执行进度回调（回调通常共用一个数据库会话）
+
+    def count_retry():
+        result.retries += 1
+
+    async def report():
+        nonlocal last_progress, reporting
+        last_progress, reporting = time.perf_counter(), True
+        try:
+            await on_progress(result)
+        except Exception as e:
+            logger.warning(f"推送进度回调失败: {e}")
+        finally:
+            reporting = False
+
+    async def worker():
+        for item in pending:
+            try:
+                await call_with_retry(send, item, on_retry=count_retry)
+                result.success += 1
+            except Exception as e:
+                result.fail(f"{label(item)}: {e}")
+                logger.error(f"推送给 {label(item)} 失败: {e}")
+
+            if (on_progress and not reporting and result.done < result.total
+                    and time.perf_counter() - last_progress >= progress_interval):
+                await report()
+
+    workers = min(concurrency or settings.push_concurrency, len(items))
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    result.seconds = time.perf_counter() - start
+    return result
@@ -1,4 +1,6 @@
 """飞书服务封装"""
+import io
+import json
 import time
 import hashlib
 import httpx
@@ -9,6 +11,44 @@ from ..config import get_settings
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# 飞书频控错误码（应用/接口调用频率超限）
+RATE_LIMIT_CODES = {99991400}
+# batch_get_id 单次最多查询的邮箱数
+EMAIL_BATCH_SIZE = 50
+
+
+class FeishuAPIError(Exception):
+    """飞书接口错误，带 HTTP 状态码、飞书错误码与频控重置秒数，供调用方判断是否重试"""
+
+    def __init__(self, message: str, status_code: int = 200, code: Optional[int] = None,
+                 retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status_code == 429 or self.status_code >= 500 or self.code in RATE_LIMIT_CODES
+
+
+def _check(response: httpx.Response, action: str) -> dict:
+    """解析飞书响应，失败时抛出 FeishuAPIError（网关返回的非 JSON 错误页也按状态码处理）"""
+    try:
+        data = response.json()
+    except ValueError:
+        data = {"code": None, "msg": response.text[:200]}
+    if response.status_code < 400 and data.get("code") == 0:
+        return data
+
+    reset = response.headers.get("x-ogw-ratelimit-reset") or response.headers.get("retry-after")
+    try:
+        retry_after = float(reset) if reset else None
+    except ValueError:
+        retry_after = None
+    logger.error(f"{action}失败: HTTP {response.status_code} {data}")
+    raise FeishuAPIError(f"{action}失败: {data.get('msg')}", response.status_code, data.get("code"), retry_after)
+
 
 class FeishuService:
     """飞书API服务"""
@@ -20,6 +60,20 @@ class FeishuService:
         self.app_secret = settings.feishu_app_secret
         self._token_cache: dict = {}
         self._ticket_cache: dict = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._department_names: dict[str, str] = {}
+
+    def _http(self) -> httpx.AsyncClient:
+        """消息类接口共用的连接池（批量推送时复用连接，不必逐条握手）"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=30.0, limits=httpx.Limits(max_connections=50))
+        return self._client
+
+    async def close(self):
+        """关闭共用连接池（应用关闭时调用）"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     async def get_tenant_access_token(self) -> str:
         """获取tenant_access_token，带缓存"""
@@ -156,9 +210,46 @@ class FeishuService:
 
             return data["data"]
 
-    async def send_card_message(self, receive_id: str, card: dict, receive_id_type: str = "chat_id"):
-        """发送卡片消息"""
-        import json
+    async def get_user_org(self, open_id: str) -> dict:
+        """
+        通过通讯录获取用户的主部门名称与职务（用于工具可见范围）
+
+        需要应用开通通讯录读取权限；未返回的字段为 None
+        """
+        token = await self.get_tenant_access_token()
+        response = await self._http().get(
+            f"{self.BASE_URL}/contact/v3/users/{open_id}",
+            headers={"Authorization": f"Bearer {token}"},
+            params={"user_id_type": "open_id", "department_id_type": "open_department_id"},
+        )
+        user = _check(response, "获取通讯录用户").get("data", {}).get("user", {})
+
+        department = None
+        department_ids = user.get("department_ids") or []
+        if department_ids:
+            department_id = department_ids[0]
+            department = self._department_names.get(department_id)
+            if department is None:
+                response = await self._http().get(
+                    f"{self.BASE_URL}/contact/v3/departments/{department_id}",
+                    headers={"Authorization": f"Bearer {token}"},
+                    params={"department_id_type": "open_department_id"},
+                )
+                data = _check(response, "获取部门信息")
+                department = data.get("data", {}).get("department", {}).get("name")
+                if department:
+                    self._department_names[department_id] = department
+
+        return {"department": department, "role": user.get("job_title") or None}
+
+    async def send_card_message(
+        self, receive_id: str, card: dict, receive_id_type: str = "chat_id", uuid: Optional[str] = None
+    ):
+        """
+        发送卡片消息
+
+        uuid 用于飞书侧去重（1 小时内相同 uuid 只发送一次），重试时传同一个值可避免重复推送
+        """
         token = await self.get_tenant_access_token()
         url = f"{self.BASE_URL}/im/v1/messages?receive_id_type={receive_id_type}"
 
@@ -170,24 +261,21 @@ class FeishuService:
             "msg_type": "interactive",
             "content": content,
         }
-
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                url,
-                headers={
-                    "Authorization": f"Bearer {token}",
-                    "Content-Type": "application/json",
-                },
-                json=payload,
-            )
-            data = response.json()
-
-            if data.get("code") != 0:
-                logger.error(f"发送消息失败: {data}")
-                raise Exception(f"发送消息失败: {data.get('msg')}")
-
-            logger.info(f"消息发送成功: {receive_id}")
-            return data
+        if uuid:
+            payload["uuid"] = uuid
+
+        response = await self._http().post(
+            url,
+            headers={
+                "Authorization": f"Bearer {token}",
+                "Content-Type": "application/json",
+            },
+            json=payload,
+        )
+        data = _check(response, "发送消息")
+
+        logger.info(f"消息发送成功: {receive_id}")
+        return data
 
     async def get_bot_joined_chats(self) -> list:
         """获取机器人已加入的群聊列表"""
@@ -233,112 +321,108 @@ class FeishuService:
         logger.info(f"获取到 {len(all_chats)} 个群聊")
         return all_chats
 
-    async def get_user_by_email(self, email: str) -> Optional[dict]:
-        """通过邮箱获取用户信息"""
+    async def get_users_by_emails(self, emails: list[str]) -> dict[str, str]:
+        """
+        批量通过邮箱获取 open_id（每次请求最多 50 个邮箱）
+
+        Returns:
+            dict: 邮箱 -> open_id，未找到的邮箱不在结果中
+        """
         token = await self.get_tenant_access_token()
         url = f"{self.BASE_URL}/contact/v3/users/batch_get_id"
 
-        payload = {
-            "emails": [email],
-        }
-
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
+        found = {}
+        for i in range(0, len(emails), EMAIL_BATCH_SIZE):
+            response = await self._http().post(
                 url,
                 headers={
                     "Authorization": f"Bearer {token}",
                     "Content-Type": "application/json",
                 },
-                json=payload,
+                json={"emails": emails[i:i + EMAIL_BATCH_SIZE]},
                 params={"user_id_type": "open_id"},
             )
-            data = response.json()
+            data = _check(response, "通过邮箱获取用户")
+            for user in data.get("data", {}).get("user_list", []):
+                if user.get("user_id"):
+                    found[user["email"]] = user["user_id"]
 
-            if data.get("code") != 0:
-                logger.error(f"通过邮箱获取用户失败: {data}")
-                return None
-
-            user_list = data.get("data", {}).get("user_list", [])
-            if user_list and user_list[0].get("user_id"):
-                return {"open_id": user_list[0]["user_id"]}
+        return found
 
+    async def get_user_by_email(self, email: str) -> Optional[dict]:
+        """通过邮箱获取用户信息（频控/服务端错误抛出 FeishuAPIError，其余错误返回 None）"""
+        try:
+            found = await self.get_users_by_emails([email])
+        except FeishuAPIError as e:
+            if e.retryable:
+                raise
             return None
 
-    async def send_email_with_attachment(
-        self,
-        to_email: str,
-        subject: str,
-        content: str,
-        attachment_name: str,
-        attachment_content: bytes
-    ):
-        """发送带附件的邮件（通过飞书机器人发送文件消息）"""
-        import base64
-
-        # 先获取用户的 open_id
-        user_info = await self.get_user_by_email(to_email)
-        if not user_info or not user_info.get("open_id"):
-            raise Exception(f"未找到邮箱对应的飞书用户: {to_email}")
-
-        open_id = user_info["open_id"]
+        if email in found:
+            return {"open_id": found[email]}
+        return None
 
-        # 先上传文件
+    async def upload_file(self, file_name: str, content: bytes) -> str:
+        """上传文件，返回 file_key（同一文件发给多人时只需上传一次）"""
         token = await self.get_tenant_access_token()
-
-        # 使用飞书文件上传API
-        upload_url = f"{self.BASE_URL}/im/v1/files"
-
-        # 创建表单数据
-        import io
         files = {
-            "file": (attachment_name, io.BytesIO(attachment_content), "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+            "file": (file_name, io.BytesIO(content), "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
         }
         form_data = {
             "file_type": "stream",
-            "file_name": attachment_name,
+            "file_name": file_name,
         }
 
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                upload_url,
-                headers={"Authorization": f"Bearer {token}"},
-                files=files,
-                data=form_data,
-            )
-            upload_data = response.json()
-
-            if upload_data.get("code") != 0:
-                logger.error(f"上传文件失败: {upload_data}")
-                raise Exception(f"上传文件失败: {upload_data.get('msg')}")
-
-            file_key = upload_data["data"]["file_key"]
-
-        # 发送文件消息
-        import json
-        msg_url = f"{self.BASE_URL}/im/v1/messages?receive_id_type=open_id"
-        msg_payload = {
+        response = await self._http().post(
+            f"{self.BASE_URL}/im/v1/files",
+            headers={"Authorization": f"Bearer {token}"},
+            files=files,
+            data=form_data,
+            timeout=60.0,
+        )
+        data = _check(response, "上传文件")
+        return data["data"]["file_key"]
+
+    async def send_file_message(self, open_id: str, file_key: str, uuid: Optional[str] = None):
+        """发送文件消息（uuid 含义同 send_card_message）"""
+        token = await self.get_tenant_access_token()
+        payload = {
             "receive_id": open_id,
             "msg_type": "file",
             "content": json.dumps({"file_key": file_key}),
         }
+        if uuid:
+            payload["uuid"] = uuid
+
+        response = await self._http().post(
+            f"{self.BASE_URL}/im/v1/messages?receive_id_type=open_id",
+            headers={
+                "Authorization": f"Bearer {token}",
+                "Content-Type": "application/json",
+            },
+            json=payload,
+        )
+        data = _check(response, "发送文件消息")
+
+        logger.info(f"文件消息发送成功: {open_id}")
+        return data
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                msg_url,
-                headers={
-                    "Authorization": f"Bearer {token}",
-                    "Content-Type": "application/json",
-                },
-                json=msg_payload,
-            )
-            msg_data = response.json()
-
-            if msg_data.get("code") != 0:
-                logger.error(f"发送文件消息失败: {msg_data}")
-                raise Exception(f"发送文件消息失败: {msg_data.get('msg')}")
+    async def send_email_with_attachment(
+        self,
+        to_email: str,
+        subject: str,
+        content: str,
+        attachment_name: str,
+        attachment_content: bytes
+    ):
+        """发送带附件的邮件（通过飞书机器人发送文件消息）"""
+        # 先获取用户的 open_id
+        user_info = await self.get_user_by_email(to_email)
+        if not user_info or not user_info.get("open_id"):
+            raise Exception(f"未找到邮箱对应的飞书用户: {to_email}")
 
-            logger.info(f"文件消息发送成功: {to_email}")
-            return msg_data
+        file_key = await self.upload_file(attachment_name, attachment_content)
+        return await self.send_file_message(user_info["open_id"], file_key)
 
 
 # 单例
@@ -0,0 +1,117 @@
+"""飞书身份缓存 - 接收人邮箱 → open_id 持久化在 feishu_identity_cache
+
+- 解析时先读本地表，只有缺失或过期的邮箱才通过 batch_get_id 批量请求飞书（每次 50 个）
+- 已找到的缓存 FEISHU_IDENTITY_TTL_HOURS 小时，未找到的缓存 FEISHU_IDENTITY_MISS_TTL_MINUTES 分钟
+- 飞书请求失败时退回使用过期的缓存值；没有任何缓存可用时抛出异常
+- 添加接收人时后台预解析，定时任务在过期前刷新启用中的接收人，推送时通常不产生网络请求
+"""
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..models import FeishuIdentity, ReportRecipient
+from .counter_service import dialect_insert
+from .fanout import call_with_retry
+from .feishu_service import feishu_service
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 定时刷新提前量：在此时间内将过期的缓存提前刷新
+REFRESH_AHEAD = timedelta(hours=2)
+
+
+def _expires_at(row: FeishuIdentity) -> datetime:
+    if row.open_id:
+        return row.resolved_at + timedelta(hours=settings.feishu_identity_ttl_hours)
+    return row.resolved_at + timedelta(minutes=settings.feishu_identity_miss_ttl_minutes)
+
+
+async def _save(db: AsyncSession, found: dict[str, Optional[str]], now: datetime):
+    stmt = dialect_insert(db, FeishuIdentity).values(
+        [{"email": email, "open_id": open_id, "resolved_at": now} for email, open_id in found.items()]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["email"],
+        set_={"open_id": stmt.excluded.open_id, "resolved_at": stmt.excluded.resolved_at},
+    )
+    await db.execute(stmt)
+    await db.commit()
+
+
+async def resolve_open_ids(
+    db: AsyncSession, emails: Iterable[str], ahead: timedelta = timedelta()
+) -> dict[str, Optional[str]]:
+    """
+    批量解析邮箱对应的 open_id
+
+    Args:
+        ahead: 把在此时间内将过期的缓存也视为过期（定时预刷新用）
+
+    Returns:
+        dict: 邮箱 -> open_id，未找到的飞书用户为 None
+    """
+    emails = list(dict.fromkeys(e for e in emails if e))
+    if not emails:
+        return {}
+
+    rows = {
+        row.email: row
+        for row in (await db.execute(
+            select(FeishuIdentity).where(FeishuIdentity.email.in_(emails))
+        )).scalars()
+    }
+    now = datetime.now()
+    result = {}
+    stale = []
+    for email in emails:
+        row = rows.get(email)
+        if row and _expires_at(row) > now + ahead:
+            result[email] = row.open_id
+        else:
+            stale.append(email)
+
+    if not stale:
+        return result
+
+    try:
+        found = await call_with_retry(feishu_service.get_users_by_emails, stale)
+    except Exception as e:
+        missing = [email for email in stale if email not in rows]
+        if missing:
+            raise
+        logger.warning(f"刷新飞书身份失败，使用过期缓存（{len(stale)} 个邮箱）: {e}")
+        result.update({email: rows[email].open_id for email in stale})
+        return result
+
+    resolved = {email: found.get(email) for email in stale}
+    await _save(db, resolved, now)
+    result.update(resolved)
+    logger.info(
+        f"飞书身份解析: 缓存命中 {len(emails) - len(stale)}, 请求 {len(stale)}, "
+        f"未找到 {sum(1 for v in resolved.values() if not v)}"
+    )
+    return result
+
+
+async def get_cached_open_ids(db: AsyncSession, emails: list[str]) -> dict[str, Optional[str]]:
+    """只读本地缓存（不请求飞书，不判断过期），未缓存的邮箱不在结果中"""
+    if not emails:
+        return {}
+    rows = await db.execute(
+        select(FeishuIdentity.email, FeishuIdentity.open_id).where(FeishuIdentity.email.in_(emails))
+    )
+    return dict(rows.all())
+
+
+async def refresh_recipient_identities(db: AsyncSession) -> int:
+    """预解析启用中的接收人（缺失或即将过期的缓存批量刷新），返回接收人数"""
+    emails = (await db.execute(
+        select(ReportRecipient.email).where(ReportRecipient.is_active == True)
+    )).scalars().all()
+    await resolve_open_ids(db, emails, ahead=REFRESH_AHEAD)
+    return len(emails)
@@ -1,32 +1,57 @@
-"""Excel导入服务"""
+"""Excel导入服务
+
+按行流式读取（openpyxl 只读模式），不把整张表读进内存：
+- 导入前一次查询预加载 名称 -> 工具 索引，逐行只在内存中比对
+- 每 IMPORT_CHUNK_SIZE 行批量 INSERT / 按主键批量 UPDATE，每批一个 SAVEPOINT，
+  某批写入失败只回滚该批并记录错误，其余批次照常提交
+- 只更新内容有变化的字段；dry_run 时不写库，返回逐行的变更预览
+- xlsx 解析按批在执行器线程池中进行，不阻塞事件循环
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
 from io import BytesIO
-from typing import Any
+from itertools import islice
+from typing import Any, AsyncIterator, Iterator, Optional
 from openpyxl import load_workbook
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert, update, bindparam
 import logging
 
 from ..models import Tool, Category
+from .executor import run_in_thread
 
 logger = logging.getLogger(__name__)
 
+# 每批写入的行数
+IMPORT_CHUNK_SIZE = 1000
+# dry_run 返回的变更明细条数上限
+DIFF_LIMIT = 1000
+
 
 class ImportResult:
     """导入结果"""
     def __init__(self):
         self.created = 0
         self.updated = 0
+        self.unchanged = 0
         self.skipped = 0
         self.errors: list[str] = []
+        self.diff: Optional[list[dict]] = None
 
     def to_dict(self):
-        return {
+        data = {
             "created": self.created,
             "updated": self.updated,
+            "unchanged": self.unchanged,
             "skipped": self.skipped,
             "errors": self.errors,
-            "total": self.created + self.updated + self.skipped,
+            "total": self.created + self.updated + self.unchanged + self.skipped,
         }
+        if self.diff is not None:
+            data["dry_run"] = True
+            data["diff"] = self.diff
+        return data
 
 
 # Excel列映射
@@ -42,57 +67,139 @@ COLUMN_MAPPING = {
 
 REQUIRED_COLUMNS = ["名称", "链接"]
 
+# 导入可写入的工具字段
+TOOL_FIELDS = ["description", "target_url", "icon_url", "provider", "category_id", "sort_order"]
 
-async def parse_excel(file_content: bytes) -> list[dict[str, Any]]:
-    """解析Excel文件"""
-    wb = load_workbook(BytesIO(file_content), read_only=True)
-    ws = wb.active
 
-    if not ws:
-        raise ValueError("Excel文件为空")
+def iter_excel(file_content: bytes) -> Iterator[dict[str, Any]]:
+    """逐行解析Excel（只读模式，按需读取），跳过空行和缺少名称/链接的行"""
+    wb = load_workbook(BytesIO(file_content), read_only=True)
+    try:
+        ws = wb.active
+        if not ws:
+            raise ValueError("Excel文件为空")
 
-    # 读取表头
-    rows = list(ws.iter_rows(min_row=1, values_only=True))
-    if not rows:
-        raise ValueError("Excel文件为空")
+        rows = ws.iter_rows(min_row=1, values_only=True)
+        header_row = next(rows, None)
+        if header_row is None:
+            raise ValueError("Excel文件为空")
 
-    headers = [str(h).strip() if h else "" for h in rows[0]]
+        headers = [str(h).strip() if h else "" for h in header_row]
 
-    # 验证必要列
-    for col in REQUIRED_COLUMNS:
-        if col not in headers:
-            raise ValueError(f"缺少必要列: {col}")
+        # 验证必要列
+        for col in REQUIRED_COLUMNS:
+            if col not in headers:
+                raise ValueError(f"缺少必要列: {col}")
+        columns = [(i, COLUMN_MAPPING[h]) for i, h in enumerate(headers) if h in COLUMN_MAPPING]
 
-    # 解析数据行
-    data = []
-    for row_idx, row in enumerate(rows[1:], start=2):
-        if not any(row):  # 跳过空行
-            continue
+        for row_idx, row in enumerate(rows, start=2):
+            if not any(row):  # 跳过空行
+                continue
 
-        item = {"_row": row_idx}
-        for col_idx, header in enumerate(headers):
-            if header in COLUMN_MAPPING:
+            item = {"_row": row_idx}
+            for col_idx, key in columns:
                 value = row[col_idx] if col_idx < len(row) else None
                 if value is not None:
                     value = str(value).strip() if value else ""
-                item[COLUMN_MAPPING[header]] = value
+                item[key] = value
+
+            # 验证必填字段
+            if not item.get("name") or not item.get("target_url"):
+                continue
+            yield item
+    finally:
+        wb.close()
+
+
+async def _iter_excel_offloaded(file_content: bytes) -> AsyncIterator[dict[str, Any]]:
+    """按批在线程池中推进解析"""
+    items = iter_excel(file_content)
+    while batch := await run_in_thread(list, islice(items, IMPORT_CHUNK_SIZE)):
+        for item in batch:
+            yield item
+
+
+@dataclass
+class _Entry:
+    """名称索引中的一项：已有工具或本次导入待新建的工具"""
+    id: Optional[int]
+    values: dict[str, Any]
+
+
+def _normalize(item: dict[str, Any], categories: dict[str, int]) -> dict[str, Any]:
+    """Excel 行 -> 工具字段（分类按名称匹配，排序转整数）"""
+    values = {key: item[key] for key in ("description", "target_url", "icon_url", "provider") if key in item}
+    category_name = item.get("category_name")
+    if category_name and category_name in categories:
+        values["category_id"] = categories[category_name]
+    if "sort_order" in item:
+        try:
+            values["sort_order"] = int(item["sort_order"])
+        except (ValueError, TypeError):
+            values["sort_order"] = 0
+    return values
+
 
-        # 验证必填字段
-        if not item.get("name"):
-            continue
-        if not item.get("target_url"):
-            continue
+def _changes(current: dict[str, Any], values: dict[str, Any]) -> dict[str, Any]:
+    """需要更新的字段：Excel 中非空且与现值不同"""
+    return {
+        key: value for key, value in values.items()
+        if value is not None and value != "" and current.get(key) != value
+    }
+
+
+async def _load_index(db: AsyncSession) -> dict[str, _Entry]:
+    """一次查询预加载 名称 -> 工具（同名多条时取最早的一条）"""
+    columns = [getattr(Tool, key) for key in TOOL_FIELDS]
+    rows = await db.execute(select(Tool.id, Tool.name, *columns).order_by(Tool.id.desc()))
+    return {
+        row.name: _Entry(row.id, {key: getattr(row, key) for key in TOOL_FIELDS})
+        for row in rows.all()
+    }
+
+
+class _ChunkPlan:
+    """一批行的写入计划（写入成功后才合并进名称索引）"""
+
+    def __init__(self):
+        self.inserts: dict[str, dict[str, Any]] = {}
+        self.updates: dict[int, dict[str, Any]] = {}
+        self.pending: dict[str, _Entry] = {}
+        self.rows: list[int] = []
+        self.created = 0
+        self.updated = 0
 
-        data.append(item)
 
-    wb.close()
-    return data
+async def _apply_chunk(db: AsyncSession, plan: _ChunkPlan, index: dict[str, _Entry]):
+    """在 SAVEPOINT 中批量写入一批，新建工具的ID回填到索引"""
+    async with db.begin_nested():
+        if plan.inserts:
+            result = await db.execute(
+                insert(Tool).returning(Tool.id, Tool.name),
+                list(plan.inserts.values()),
+            )
+            for tool_id, name in result.all():
+                plan.pending[name].id = tool_id
+        # 按更新的字段组合分组，每组一条 UPDATE ... WHERE id = ? 的 executemany
+        groups: dict[tuple[str, ...], list[dict[str, Any]]] = defaultdict(list)
+        for tool_id, fields in plan.updates.items():
+            groups[tuple(sorted(fields))].append({"_id": tool_id, **fields})
+        now = datetime.now()
+        for keys, rows in groups.items():
+            stmt = (
+                update(Tool.__table__)
+                .where(Tool.__table__.c.id == bindparam("_id"))
+                .values(**{key: bindparam(key) for key in keys}, updated_at=now)
+            )
+            await db.execute(stmt, rows)
+    index.update(plan.pending)
 
 
 async def import_tools(
     db: AsyncSession,
     file_content: bytes,
     update_existing: bool = True,
+    dry_run: bool = False,
 ) -> ImportResult:
     """
     导入工具数据
@@ -101,85 +208,104 @@ async def import_tools(
         db: 数据库会话
         file_content: Excel文件内容
         update_existing: 是否更新已存在的工具（按名称匹配）
+        dry_run: 只比对不写库，结果中附带变更明细
 
     Returns:
         ImportResult: 导入结果
     """
     result = ImportResult()
+    if dry_run:
+        result.diff = []
 
+    # 获取所有分类（用于名称匹配）
+    categories_result = await db.execute(select(Category.name, Category.id))
+    categories = dict(categories_result.all())
+    index = await _load_index(db)
+
+    def add_diff(row_num, name, action, changes):
+        if dry_run and len(result.diff) < DIFF_LIMIT:
+            result.diff.append({"row": row_num, "name": name, "action": action, "changes": changes})
+
+    async def flush(plan: _ChunkPlan):
+        if not dry_run and (plan.inserts or plan.updates):
+            try:
+                await _apply_chunk(db, plan, index)
+            except Exception as e:
+                error_msg = f"第{plan.rows[0]}-{plan.rows[-1]}行 批量写入失败，已回滚该批: {str(e)}"
+                result.errors.append(error_msg)
+                logger.error(error_msg)
+                return
+        else:
+            index.update(plan.pending)
+        result.created += plan.created
+        result.updated += plan.updated
+
+    plan = _ChunkPlan()
+    rows = 0
     try:
-        data = await parse_excel(file_content)
+        async for item in _iter_excel_offloaded(file_content):
+            rows += 1
+            row_num = item["_row"]
+            name = item["name"].strip()
+            plan.rows.append(row_num)
+
+            try:
+                values = _normalize(item, categories)
+                entry = plan.pending.get(name) or index.get(name)
+
+                if entry is None:
+                    # 创建新工具
+                    tool = {
+                        "name": name,
+                        "description": values.get("description", ""),
+                        "target_url": values.get("target_url", ""),
+                        "icon_url": values.get("icon_url", ""),
+                        "provider": values.get("provider", ""),
+                        "category_id": values.get("category_id"),
+                        "sort_order": values.get("sort_order", 0),
+                        "is_active": True,
+                    }
+                    plan.inserts[name] = tool
+                    plan.pending[name] = _Entry(None, tool)
+                    plan.created += 1
+                    add_diff(row_num, name, "create", {k: v for k, v in tool.items() if k != "is_active"})
+                elif not update_existing:
+                    result.skipped += 1
+                elif changes := _changes(entry.values, values):
+                    add_diff(row_num, name, "update", {k: [entry.values.get(k), v] for k, v in changes.items()})
+                    plan.updated += 1
+                    if entry.id is None:
+                        # 同一文件中重复出现、尚未写入的新工具：合并进待插入的行
+                        entry.values.update(changes)
+                    else:
+                        plan.updates.setdefault(entry.id, {}).update(changes)
+                        plan.pending[name] = _Entry(entry.id, {**entry.values, **changes})
+                else:
+                    result.unchanged += 1
+            except Exception as e:
+                error_msg = f"第{row_num}行 [{name}] 处理失败: {str(e)}"
+                result.errors.append(error_msg)
+                logger.error(error_msg)
+
+            if len(plan.rows) >= IMPORT_CHUNK_SIZE:
+                await flush(plan)
+                plan = _ChunkPlan()
+        await flush(plan)
     except Exception as e:
+        await db.rollback()
         result.errors.append(f"解析Excel失败: {str(e)}")
         return result
 
-    if not data:
+    if not rows:
         result.errors.append("没有有效数据")
         return result
 
-    # 获取所有分类（用于名称匹配）
-    categories_result = await db.execute(select(Category))
-    categories = {c.name: c.id for c in categories_result.scalars().all()}
-
-    for item in data:
-        row_num = item.pop("_row", "?")
-        name = item.get("name", "").strip()
-
-        if not name:
-            result.skipped += 1
-            continue
-
-        try:
-            # 处理分类
-            category_name = item.pop("category_name", None)
-            if category_name and category_name in categories:
-                item["category_id"] = categories[category_name]
-
-            # 处理排序
-            if "sort_order" in item:
-                try:
-                    item["sort_order"] = int(item["sort_order"])
-                except (ValueError, TypeError):
-                    item["sort_order"] = 0
-
-            # 查找是否已存在
-            existing = await db.execute(
-                select(Tool).where(Tool.name == name)
-            )
-            tool = existing.scalar_one_or_none()
-
-            if tool:
-                if update_existing:
-                    # 更新已有工具
-                    for key, value in item.items():
-                        if value is not None and value != "":
-                            setattr(tool, key, value)
-                    result.updated += 1
-                    logger.info(f"更新工具: {name}")
-                else:
-                    result.skipped += 1
-            else:
-                # 创建新工具
-                tool = Tool(
-                    name=name,
-                    description=item.get("description", ""),
-                    target_url=item.get("target_url", ""),
-                    icon_url=item.get("icon_url", ""),
-                    provider=item.get("provider", ""),
-                    category_id=item.get("category_id"),
-                    sort_order=item.get("sort_order", 0),
-                    is_active=True,
-                )
-                db.add(tool)
-                result.created += 1
-                logger.info(f"创建工具: {name}")
-
-        except Exception as e:
-            error_msg = f"第{row_num}行 [{name}] 处理失败: {str(e)}"
-            result.errors.append(error_msg)
-            logger.error(error_msg)
-
-    await db.commit()
+    if not dry_run:
+        await db.commit()
+    logger.info(
+        f"导入{'预览' if dry_run else '完成'}: {rows} 行, 新增{result.created}, 更新{result.updated}, "
+        f"未变化{result.unchanged}, 跳过{result.skipped}"
+    )
     return result
 
 
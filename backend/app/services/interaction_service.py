@@ -0,0 +1,79 @@
+"""收藏/点赞写入服务
+
+新增走单条 INSERT ... SELECT ... ON CONFLICT DO NOTHING RETURNING：从 tools 表选取保证工具存在，
+唯一约束 (user_id, tool_id) 负责去重，RETURNING 返回实际插入的行。
+不再先查后插（并发请求都查不到时会同时插入并撞上唯一约束），计数器只按实际插入/删除的行增减。
+"""
+from collections import defaultdict
+from typing import Iterable, Literal
+
+from sqlalchemy import select, delete, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import Tool, UserLike, UserFavorite
+from .counter_service import dialect_insert, bump_counters
+
+InteractionType = Literal["like", "favorite"]
+
+INTERACTION_MODELS = {"like": UserLike, "favorite": UserFavorite}
+COUNTER_FIELDS = {"like": "like_count", "favorite": "favorite_count"}
+
+
+async def add_interactions(
+    db: AsyncSession, kind: InteractionType, user_id: int, tool_ids: Iterable[int]
+) -> list[int]:
+    """新增点赞/收藏（不提交），返回实际新增的工具ID；已存在或工具不存在的跳过"""
+    tool_ids = list(tool_ids)
+    if not tool_ids:
+        return []
+    model = INTERACTION_MODELS[kind]
+    rows = select(literal(user_id), Tool.id).where(Tool.id.in_(tool_ids))
+    stmt = (
+        dialect_insert(db, model)
+        .from_select(["user_id", "tool_id"], rows)
+        .on_conflict_do_nothing(index_elements=["user_id", "tool_id"])
+        .returning(model.tool_id)
+    )
+    return list((await db.execute(stmt)).scalars().all())
+
+
+async def remove_interactions(
+    db: AsyncSession, kind: InteractionType, user_id: int, tool_ids: Iterable[int]
+) -> list[int]:
+    """取消点赞/收藏（不提交），返回实际删除的工具ID"""
+    tool_ids = list(tool_ids)
+    if not tool_ids:
+        return []
+    model = INTERACTION_MODELS[kind]
+    stmt = (
+        delete(model)
+        .where(model.user_id == user_id, model.tool_id.in_(tool_ids))
+        .returning(model.tool_id)
+    )
+    return list((await db.execute(stmt)).scalars().all())
+
+
+async def set_interactions(
+    db: AsyncSession, user_id: int, ops: dict[tuple[InteractionType, int], bool]
+) -> int:
+    """
+    批量设置（True）或取消（False）点赞/收藏并同步计数器（不提交，由调用方统一 commit）
+
+    Args:
+        ops: (类型, 工具ID) -> 目标状态
+
+    Returns:
+        实际发生变化的条数
+    """
+    deltas: dict[int, dict[str, int]] = defaultdict(dict)
+    for kind, field in COUNTER_FIELDS.items():
+        added = await add_interactions(db, kind, user_id, [t for (k, t), v in ops.items() if k == kind and v])
+        removed = await remove_interactions(db, kind, user_id, [t for (k, t), v in ops.items() if k == kind and not v])
+        for tool_id in added:
+            deltas[tool_id][field] = 1
+        for tool_id in removed:
+            deltas[tool_id][field] = -1
+
+    for tool_id, fields in deltas.items():
+        await bump_counters(db, tool_id, **fields)
+    return sum(len(fields) for fields in deltas.values())
@@ -0,0 +1,299 @@
+"""持久化后台任务 - 任务写入 background_jobs 表，由各进程的 worker 以租约方式认领执行
+
+- 提交任务与业务数据同一事务写库，进程重启不丢任务
+- 认领：PostgreSQL 用 SELECT ... FOR UPDATE SKIP LOCKED，多个 worker/进程互不阻塞；
+  SQLite 单条 UPDATE ... WHERE id = (子查询) RETURNING，由数据库写锁保证只有一个 worker 认领成功
+- 执行中每 1/3 租约续期一次（心跳）；进程崩溃后租约过期，任务被其他 worker 重新认领
+- 至少执行一次：失败或崩溃的任务会重新执行，处理函数需保证每一步可重复（推送按接收人记录送达）
+- 失败按指数退避重新排队，达到 JOB_MAX_ATTEMPTS 次后标记失败并调用 on_failed
+"""
+import asyncio
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Optional
+import logging
+
+from sqlalchemy import select, update, func, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..database import async_session
+from ..models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 重试退避：第 n 次失败后等待 RETRY_BASE_SECONDS * 2^(n-1) 秒
+RETRY_BASE_SECONDS = 30
+
+
+@dataclass
+class _Handler:
+    run: Callable[..., Awaitable[Any]]
+    on_failed: Optional[Callable[..., Awaitable[Any]]] = None
+
+
+_handlers: dict[str, _Handler] = {}
+_workers: list[asyncio.Task] = []
+_wakeup: Optional[asyncio.Event] = None
+_owner_prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class _Stats:
+    """本进程的执行统计"""
+
+    def __init__(self):
+        self.claimed = 0
+        self.reattempted = 0  # 失败重试或租约过期后再次执行
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+        self.lease_lost = 0
+        self.wait_seconds = 0.0  # 提交到开始执行的累计等待
+        self.max_wait_seconds = 0.0
+        self.run_seconds = 0.0
+        self.max_run_seconds = 0.0
+        self.started_at = time.monotonic()
+
+    def to_dict(self) -> dict:
+        finished = self.completed + self.retried + self.failed
+        uptime = time.monotonic() - self.started_at
+        return {
+            "claimed": self.claimed,
+            "reattempted": self.reattempted,
+            "completed": self.completed,
+            "retried": self.retried,
+            "failed": self.failed,
+            "lease_lost": self.lease_lost,
+            "jobs_per_minute": round(self.completed / uptime * 60, 2) if uptime else 0,
+            "avg_wait_seconds": round(self.wait_seconds / self.claimed, 2) if self.claimed else 0,
+            "max_wait_seconds": round(self.max_wait_seconds, 2),
+            "avg_run_seconds": round(self.run_seconds / finished, 2) if finished else 0,
+            "max_run_seconds": round(self.max_run_seconds, 2),
+        }
+
+
+_stats = _Stats()
+
+
+def register_job(kind: str, run: Callable[..., Awaitable[Any]], on_failed: Optional[Callable[..., Awaitable[Any]]] = None):
+    """
+    注册任务处理函数
+
+    Args:
+        run: 以 payload 为关键字参数调用；抛出异常即视为本次执行失败
+        on_failed: 最终失败（不再重试）时调用，参数为 payload 与 error 关键字
+    """
+    _handlers[kind] = _Handler(run, on_failed)
+
+
+async def enqueue_job(db: AsyncSession, kind: str, payload: dict) -> BackgroundJob:
+    """提交任务（不提交事务，由调用方与业务数据一起 commit 后调用 notify_jobs）"""
+    job = BackgroundJob(kind=kind, payload=payload, max_attempts=settings.job_max_attempts)
+    db.add(job)
+    await db.flush()
+    return job
+
+
+def notify_jobs():
+    """唤醒本进程空闲的 worker（其他进程按轮询间隔发现新任务）"""
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+async def _claim(db: AsyncSession, owner: str) -> Optional[BackgroundJob]:
+    """认领一个到期的排队任务，或租约已过期的执行中任务"""
+    now = datetime.now()
+    candidate = (
+        select(BackgroundJob.id)
+        .where(or_(
+            and_(BackgroundJob.status == "queued", BackgroundJob.run_after <= now),
+            and_(BackgroundJob.status == "running", BackgroundJob.lease_until < now),
+        ))
+        .order_by(BackgroundJob.run_after, BackgroundJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)  # SQLite 忽略，依赖写锁
+        .scalar_subquery()
+    )
+    stmt = (
+        update(BackgroundJob)
+        .where(BackgroundJob.id == candidate)
+        .values(
+            status="running",
+            attempts=BackgroundJob.attempts + 1,
+            lease_owner=owner,
+            lease_until=now + timedelta(seconds=settings.job_lease_seconds),
+            started_at=now,
+        )
+        .returning(BackgroundJob)
+    )
+    job = (await db.execute(stmt)).scalar_one_or_none()
+    await db.commit()
+    return job
+
+
+async def _heartbeat(job_id: int, owner: str, task: asyncio.Task):
+    """定期续期租约；租约已被他人接管时取消本地执行"""
+    interval = settings.job_lease_seconds / 3
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with async_session() as db:
+                result = await db.execute(
+                    update(BackgroundJob)
+                    .where(BackgroundJob.id == job_id, BackgroundJob.lease_owner == owner)
+                    .values(lease_until=datetime.now() + timedelta(seconds=settings.job_lease_seconds))
+                )
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"任务 {job_id} 续租失败: {e}")
+            continue
+        if result.rowcount == 0:
+            _stats.lease_lost += 1
+            logger.warning(f"任务 {job_id} 租约已被其他 worker 接管，停止本地执行")
+            task.cancel()
+            return
+
+
+async def _finish(job: BackgroundJob, owner: str, error: Optional[str]):
+    """记录执行结果：成功 -> done；失败且未达上限 -> 退避后重新排队；否则 -> failed"""
+    now = datetime.now()
+    values: dict[str, Any] = {"lease_owner": None, "lease_until": None, "error": error}
+    if error is None:
+        values.update(status="done", finished_at=now)
+    elif job.attempts < job.max_attempts:
+        values.update(status="queued", run_after=now + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (job.attempts - 1)))
+    else:
+        values.update(status="failed", finished_at=now)
+
+    async with async_session() as db:
+        result = await db.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.id == job.id, BackgroundJob.lease_owner == owner)
+            .values(**values)
+        )
+        await db.commit()
+    if result.rowcount == 0:
+        # 租约已过期被他人接管，以接管方的结果为准
+        return
+
+    if error is None:
+        _stats.completed += 1
+    elif values["status"] == "queued":
+        _stats.retried += 1
+        logger.warning(f"任务 {job.id} {job.kind} 第{job.attempts}次执行失败，稍后重试: {error}")
+    else:
+        _stats.failed += 1
+        logger.error(f"任务 {job.id} {job.kind} 执行 {job.attempts} 次均失败: {error}")
+        handler = _handlers.get(job.kind)
+        if handler and handler.on_failed:
+            try:
+                await handler.on_failed(**job.payload, error=error)
+            except Exception as e:
+                logger.error(f"任务 {job.id} 失败回调出错: {e}", exc_info=True)
+
+
+async def _execute(job: BackgroundJob, owner: str):
+    _stats.claimed += 1
+    if job.attempts > 1:
+        _stats.reattempted += 1
+    wait = max((job.started_at - job.created_at).total_seconds(), 0) if job.attempts == 1 else 0
+    _stats.wait_seconds += wait
+    _stats.max_wait_seconds = max(_stats.max_wait_seconds, wait)
+
+    handler = _handlers.get(job.kind)
+    if handler is None:
+        await _finish(job, owner, f"未知任务类型: {job.kind}")
+        return
+    if job.attempts > job.max_attempts:
+        # 反复因进程崩溃/租约过期被重新认领的任务不再执行
+        await _finish(job, owner, job.error or f"租约过期被重新认领超过 {job.max_attempts} 次")
+        return
+
+    start = time.perf_counter()
+    task = asyncio.create_task(handler.run(**job.payload))
+    heartbeat = asyncio.create_task(_heartbeat(job.id, owner, task))
+    error = None
+    try:
+        await task
+    except asyncio.CancelledError:
+        if not heartbeat.done():
+            raise  # 应用关闭：不写结果，租约过期后由其他 worker 重新认领
+        return  # 租约被接管
+    except Exception as e:
+        error = str(e) or type(e).__name__
+    finally:
+        heartbeat.cancel()
+        elapsed = time.perf_counter() - start
+        _stats.run_seconds += elapsed
+        _stats.max_run_seconds = max(_stats.max_run_seconds, elapsed)
+
+    logger.info(f"任务 {job.id} {job.kind} 执行{'完成' if error is None else '失败'}，耗时 {elapsed:.1f} 秒，等待 {wait:.1f} 秒")
+    await _finish(job, owner, error)
+
+
+async def _worker(index: int):
+    owner = f"{_owner_prefix}:{index}:{uuid.uuid4().hex[:8]}"
+    while True:
+        try:
+            async with async_session() as db:
+                job = await _claim(db, owner)
+        except Exception as e:
+            logger.error(f"认领任务失败: {e}")
+            job = None
+
+        if job is None:
+            _wakeup.clear()
+            try:
+                await asyncio.wait_for(_wakeup.wait(), settings.job_poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        try:
+            await _execute(job, owner)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"任务 {job.id} 结果写入失败: {e}", exc_info=True)
+
+
+def start_job_runner():
+    """启动本进程的任务 worker（应用启动时调用）"""
+    global _wakeup
+    if _workers:
+        return
+    _wakeup = asyncio.Event()
+    _workers.extend(asyncio.create_task(_worker(i)) for i in range(settings.job_workers))
+    logger.info(f"后台任务 worker 已启动: {settings.job_workers} 个")
+
+
+async def shutdown_job_runner():
+    """停止 worker（执行中的任务不写结果，租约过期后由其他进程重新认领）"""
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+
+async def job_stats(db: AsyncSession) -> dict:
+    """各状态任务数、最早排队任务的等待时长与本进程执行统计"""
+    counts = dict((await db.execute(
+        select(BackgroundJob.status, func.count(BackgroundJob.id)).group_by(BackgroundJob.status)
+    )).all())
+    oldest = (await db.execute(
+        select(func.min(BackgroundJob.created_at)).where(BackgroundJob.status == "queued")
+    )).scalar()
+    return {
+        "workers": len(_workers),
+        "queued": counts.get("queued", 0),
+        "running": counts.get("running", 0),
+        "done": counts.get("done", 0),
+        "failed": counts.get("failed", 0),
+        "oldest_queued_seconds": round((datetime.now() - oldest).total_seconds(), 1) if oldest else 0,
+        "process": _stats.to_dict(),
+    }
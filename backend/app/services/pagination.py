@@ -0,0 +1,81 @@
+"""游标（keyset）分页工具
+
+按 (排序键..., id) 定位下一页的起点，避免 OFFSET 深翻页时逐行跳过。
+游标为 base64url 编码的 JSON，对客户端不透明，内含排序方式以拒绝跨排序复用。
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# 排序键: (列或表达式, 是否降序)
+SortKey = tuple[Any, bool]
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "$dt" in value:
+        return datetime.fromisoformat(value["$dt"])
+    return value
+
+
+def encode_cursor(sort: str, values: Sequence[Any]) -> str:
+    """生成游标（values 为最后一条记录的各排序键取值）"""
+    payload = json.dumps({"s": sort, "v": [_encode_value(v) for v in values]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, size: int) -> list[Any]:
+    """解析游标，格式错误或排序方式不一致时返回 400"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values = [_decode_value(v) for v in payload["v"]]
+        if payload["s"] != sort or len(values) != size:
+            raise ValueError
+    except (ValueError, KeyError, TypeError, binascii.Error, UnicodeError):
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+    return values
+
+
+def keyset_order(keys: Sequence[SortKey]) -> list:
+    return [expr.desc() if descending else expr.asc() for expr, descending in keys]
+
+
+def keyset_after(keys: Sequence[SortKey], values: Sequence[Any]):
+    """(k0, k1, ...) 严格排在 values 之后的条件（按各键方向逐级比较）"""
+    clauses = []
+    for i, (expr, descending) in enumerate(keys):
+        prefix = [k == v for (k, _), v in zip(keys[:i], values[:i])]
+        step = expr < values[i] if descending else expr > values[i]
+        clauses.append(and_(*prefix, step))
+    return or_(*clauses)
+
+
+async def estimate_count(db: AsyncSession, table: str) -> Optional[int]:
+    """
+    表行数估算（PostgreSQL 读取 pg_class.reltuples，无需全表扫描）
+
+    Returns:
+        估算值；不支持或尚未 ANALYZE 时返回 None，调用方应退回精确计数
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    result = await db.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": table},
+    )
+    estimate = result.scalar()
+    if estimate is None or estimate < 0:
+        return None
+    return int(estimate)
@@ -0,0 +1,235 @@
+"""个性化排序服务 - 首页"为我推荐"
+
+每天凌晨为近期活跃用户离线打分，每个用户只存得分最高的 K 个工具（一行，按主键读取）：
+
+    score = w_c * 分类偏好 + w_i * 收藏/点赞 + w_r * 相关工具 + w_h * 全站热度
+
+- 分类偏好：用户点击分布（用户×工具）乘 工具→分类 映射，即用户在各分类的点击占比
+- 收藏/点赞：收藏 1.0、点赞 0.6
+- 相关工具：用户点击分布乘相关工具矩阵（tool_related），按该用户最大值归一化
+- 全站热度：log(1 + click_7d) / log(1 + 最大 click_7d)
+
+除热度外各项都是稀疏的：没有个人信号的工具得分只取决于 分类偏好 + 热度，同一分类内按热度有序，
+因此候选集取 有个人信号的工具 ∪ 各偏好分类热度前 K ∪ 全站热度前 K，
+结果与对 用户数×工具数 全量打分后取 TOP K 一致。
+"""
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional
+import heapq
+import logging
+import math
+import time
+
+from sqlalchemy import select, func, delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..models import Tool, User, ClickLog, UserFavorite, UserLike, ToolCounter, ToolRelated, UserRanking
+from .executor import run_in_process
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 写入 user_rankings 的批大小
+INSERT_BATCH = 5000
+# 进程池中打分的超时秒数（夜间任务，数据量大时远超接口默认超时）
+SCORE_TIMEOUT = 1800
+
+# 收藏/点赞信号强度
+FAVORITE_SIGNAL = 1.0
+LIKE_SIGNAL = 0.6
+
+
+@dataclass
+class PersonalRanking:
+    """用户的预计算排序"""
+    tool_ids: tuple[int, ...]
+    computed_at: datetime
+    _positions: dict[int, int] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._positions = {tool_id: i for i, tool_id in enumerate(self.tool_ids)}
+
+    def sort_key(self, tool: Tool) -> tuple:
+        """
+        排序键：计算之后新上架的工具（最新在前）→ 预计算列表 → 其余工具按默认顺序
+
+        键值均为数字，可直接写入分页游标
+        """
+        if tool.created_at and tool.created_at > self.computed_at:
+            return (0, -tool.created_at.timestamp(), tool.id)
+        position = self._positions.get(tool.id)
+        if position is not None:
+            return (1, position, tool.id)
+        return (2, tool.sort_order or 0, tool.id)
+
+
+@dataclass
+class _Catalog:
+    """打分用的目录快照（只含启用的工具）"""
+    category: dict[int, Optional[int]]
+    hot: dict[int, float]
+    hot_by_category: dict[int, list[int]]
+    hot_top: list[int]
+    related: dict[int, list[tuple[int, float]]]
+
+
+async def _load_catalog(db: AsyncSession, top_k: int) -> _Catalog:
+    category = dict((await db.execute(select(Tool.id, Tool.category_id).where(Tool.is_active == True))).all())
+
+    clicks = dict((await db.execute(select(ToolCounter.tool_id, ToolCounter.click_7d))).all())
+    max_log = math.log1p(max((clicks.get(t) or 0 for t in category), default=0))
+    hot = {t: math.log1p(clicks.get(t) or 0) / max_log if max_log else 0.0 for t in category}
+
+    by_hot = sorted(category, key=lambda t: (-hot[t], t))
+    hot_by_category: dict[int, list[int]] = defaultdict(list)
+    for tool_id in by_hot:
+        bucket = hot_by_category[category[tool_id]]
+        if len(bucket) < top_k:
+            bucket.append(tool_id)
+
+    related: dict[int, list[tuple[int, float]]] = defaultdict(list)
+    rows = await db.execute(select(ToolRelated.tool_id, ToolRelated.related_tool_id, ToolRelated.score))
+    for tool_id, related_id, score in rows.all():
+        if related_id in category:
+            related[tool_id].append((related_id, score))
+
+    return _Catalog(category, hot, dict(hot_by_category), by_hot[:top_k], dict(related))
+
+
+async def _load_interactions(db: AsyncSession, users: set[int]) -> dict[int, dict[int, float]]:
+    """用户 -> {工具: 收藏/点赞信号}"""
+    interactions: dict[int, dict[int, float]] = defaultdict(dict)
+    for model, signal in ((UserLike, LIKE_SIGNAL), (UserFavorite, FAVORITE_SIGNAL)):
+        for user_id, tool_id in (await db.execute(select(model.user_id, model.tool_id))).all():
+            if user_id in users:
+                tools = interactions[user_id]
+                tools[tool_id] = max(tools.get(tool_id, 0.0), signal)
+    return interactions
+
+
+def _score_user(
+    clicks: dict[int, int], interactions: dict[int, float], catalog: _Catalog, top_k: int
+) -> list[int]:
+    """单个用户的 TOP K（只对候选集打分）"""
+    category, hot = catalog.category, catalog.hot
+    total = sum(clicks.values())
+    category_pref: dict[int, float] = defaultdict(float)
+    related: dict[int, float] = defaultdict(float)
+    for tool_id, count in clicks.items():
+        if tool_id not in category:
+            continue
+        share = count / total
+        category_pref[category[tool_id]] += share
+        for related_id, score in catalog.related.get(tool_id, ()):
+            related[related_id] += share * score
+
+    candidates = set(interactions) | set(related) | set(catalog.hot_top)
+    for category_id in category_pref:
+        candidates.update(catalog.hot_by_category.get(category_id, ()))
+
+    # 权重提前折算进各项，循环内只做查表和加法
+    w_category = settings.personal_weight_category
+    w_interaction = settings.personal_weight_interaction
+    w_related = settings.personal_weight_related / (max(related.values(), default=0.0) or 1.0)
+    w_hot = settings.personal_weight_hot
+    pref, signal, neighbor = category_pref.get, interactions.get, related.get
+    scored = [
+        (
+            w_category * pref(category[tool_id], 0.0)
+            + w_interaction * signal(tool_id, 0.0)
+            + w_related * neighbor(tool_id, 0.0)
+            + w_hot * hot[tool_id],
+            -tool_id,
+        )
+        for tool_id in candidates if tool_id in category
+    ]
+    return [-neg_id for _, neg_id in heapq.nlargest(top_k, scored)]
+
+
+def _score_users(
+    user_clicks: dict[int, dict[int, int]],
+    interactions: dict[int, dict[int, float]],
+    catalog: _Catalog,
+    top_k: int,
+) -> dict[int, list[int]]:
+    """全部用户打分（纯计算，在进程池中执行），返回 用户 -> TOP K；没有任何信号的用户不返回"""
+    ranked = {}
+    # 窗口内没有点击、只有收藏/点赞的用户同样打分
+    for user_id in user_clicks.keys() | interactions.keys():
+        clicks = user_clicks.get(user_id, {})
+        if not clicks and not interactions.get(user_id):
+            continue
+        tool_ids = _score_user(clicks, interactions.get(user_id, {}), catalog, top_k)
+        if tool_ids:
+            ranked[user_id] = tool_ids
+    return ranked
+
+
+async def build_personal(db: AsyncSession, top_k: Optional[int] = None) -> dict:
+    """
+    重新计算全部活跃用户的个性化排序（整表替换，单事务提交）
+
+    读写库在事件循环中进行，打分在进程池中执行
+
+    Returns:
+        统计信息（用户数、写入行数、耗时）
+    """
+    top_k = top_k or settings.personal_top_k
+    start = time.perf_counter()
+    now = datetime.now()
+
+    catalog = await _load_catalog(db, top_k)
+    active_since = now - timedelta(days=settings.personal_active_days)
+    users = set((await db.execute(select(User.id).where(User.last_visit_at >= active_since))).scalars().all())
+    interactions = await _load_interactions(db, users)
+
+    # 按用户流式读取窗口内的点击分布
+    stmt = (
+        select(ClickLog.user_id, ClickLog.tool_id, func.count())
+        .where(ClickLog.user_id.is_not(None), ClickLog.clicked_at >= now - timedelta(days=settings.personal_window_days))
+        .group_by(ClickLog.user_id, ClickLog.tool_id)
+        .order_by(ClickLog.user_id)
+    )
+    user_clicks: dict[int, dict[int, int]] = defaultdict(dict)
+    result = await db.stream(stmt)
+    async for partition in result.partitions(10000):
+        for user_id, tool_id, count in partition:
+            if user_id in users:
+                user_clicks[user_id][tool_id] = count
+
+    ranked = await run_in_process(
+        _score_users, dict(user_clicks), dict(interactions), catalog, top_k, timeout=SCORE_TIMEOUT
+    )
+    scored = time.perf_counter()
+
+    rows = [
+        {"user_id": user_id, "tool_ids": ",".join(map(str, tool_ids)), "computed_at": now}
+        for user_id, tool_ids in sorted(ranked.items())
+    ]
+    await db.execute(delete(UserRanking))
+    for i in range(0, len(rows), INSERT_BATCH):
+        await db.execute(insert(UserRanking), rows[i:i + INSERT_BATCH])
+    await db.commit()
+
+    stats = {
+        "active_users": len(users),
+        "rows": len(rows),
+        "tools": len(catalog.category),
+        "score_seconds": round(scored - start, 2),
+        "total_seconds": round(time.perf_counter() - start, 2),
+    }
+    logger.info(f"个性化排序计算完成: {stats}")
+    return stats
+
+
+async def get_personal_ranking(db: AsyncSession, user_id: int) -> Optional[PersonalRanking]:
+    """读取用户的预计算排序，尚未计算时返回 None"""
+    row = (await db.execute(
+        select(UserRanking.tool_ids, UserRanking.computed_at).where(UserRanking.user_id == user_id)
+    )).first()
+    if not row:
+        return None
+    return PersonalRanking(tuple(int(t) for t in row.tool_ids.split(",") if t), row.computed_at)
@@ -0,0 +1,176 @@
+"""相关工具服务 - 点击共现（"用过 X 的人也用过 Y"）
+
+以滑动窗口内的点击记录构造 用户×工具 的 0/1 稀疏矩阵 A（每个用户用过的工具集合），
+共现矩阵即 AᵀA：逐用户对其工具集合两两计数（只存非零项），再按
+    score = 共同用户数 / sqrt(X 的用户数 * Y 的用户数)
+做余弦归一化，抑制热门工具对所有工具都"相关"。每个工具保留 TOP N 写入 tool_related，
+接口与机器人只读预计算结果。
+"""
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from itertools import combinations
+from typing import Optional
+import heapq
+import logging
+import math
+import time
+
+from sqlalchemy import select, func, delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..models import Tool, ClickLog, ToolRelated
+from .executor import run_in_process
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 写入 tool_related 的批大小
+INSERT_BATCH = 5000
+# 进程池中计算的超时秒数（夜间任务，数据量大时远超接口默认超时）
+SCORE_TIMEOUT = 1800
+
+
+async def _load_baskets(db: AsyncSession, since: datetime) -> list[list[int]]:
+    """流式读取 (用户, 工具) 去重集合，返回每个用户用过的工具（最近使用的在前）"""
+    last_clicked = func.max(ClickLog.clicked_at)
+    stmt = (
+        select(ClickLog.user_id, ClickLog.tool_id)
+        .where(ClickLog.user_id.is_not(None), ClickLog.clicked_at >= since)
+        .group_by(ClickLog.user_id, ClickLog.tool_id)
+        .order_by(ClickLog.user_id, last_clicked.desc())
+    )
+
+    baskets: list[list[int]] = []
+    current_user = None
+    result = await db.stream(stmt)
+    async for partition in result.partitions(10000):
+        for user_id, tool_id in partition:
+            if user_id != current_user:
+                current_user = user_id
+                baskets.append([])
+            baskets[-1].append(tool_id)
+    return baskets
+
+
+def _count_cooccurrence(baskets: list[list[int]], max_tools_per_user: int) -> tuple[Counter, Counter]:
+    """
+    逐用户对其工具集合两两计数
+
+    Returns:
+        (工具对共同用户数, 工具用户数)
+    """
+    pairs: Counter = Counter()
+    users_per_tool: Counter = Counter()
+    for tools in baskets:
+        # 工具过多的账号（测试/爬虫）只取最近使用的部分，避免平方级膨胀
+        tools = sorted(tools[:max_tools_per_user])
+        users_per_tool.update(tools)
+        pairs.update(combinations(tools, 2))
+    return pairs, users_per_tool
+
+
+def _top_neighbors(
+    pairs: Counter, users_per_tool: Counter, top_n: int, min_co_users: int
+) -> dict[int, list[tuple[float, int, int]]]:
+    """每个工具按余弦得分取 TOP N，返回 tool_id -> [(score, co_users, related_id)]"""
+    neighbors: dict[int, list[tuple[float, int, int]]] = defaultdict(list)
+    for (a, b), co_users in pairs.items():
+        if co_users < min_co_users:
+            continue
+        score = co_users / math.sqrt(users_per_tool[a] * users_per_tool[b])
+        neighbors[a].append((score, co_users, b))
+        neighbors[b].append((score, co_users, a))
+    return {
+        tool_id: heapq.nlargest(top_n, candidates, key=lambda x: (x[0], x[1], -x[2]))
+        for tool_id, candidates in neighbors.items()
+    }
+
+
+def _score_related(
+    baskets: list[list[int]], max_tools_per_user: int, top_n: int, min_co_users: int
+) -> tuple[dict[int, list[tuple[float, int, int]]], int, int]:
+    """
+    共现计数 + TOP N（纯计算，在进程池中执行）
+
+    Returns:
+        (tool_id -> [(score, co_users, related_id)], 工具数, 工具对数)
+    """
+    pairs, users_per_tool = _count_cooccurrence(baskets, max_tools_per_user)
+    return _top_neighbors(pairs, users_per_tool, top_n, min_co_users), len(users_per_tool), len(pairs)
+
+
+async def build_related(
+    db: AsyncSession,
+    window_days: Optional[int] = None,
+    top_n: Optional[int] = None,
+) -> dict:
+    """
+    重新计算相关工具表（整表替换，单事务提交）
+
+    读写库在事件循环中进行，共现计数与打分在进程池中执行
+
+    Returns:
+        统计信息（用户数、工具对数、写入行数、耗时）
+    """
+    window_days = window_days or settings.related_window_days
+    top_n = top_n or settings.related_top_n
+    start = time.perf_counter()
+    since = datetime.now() - timedelta(days=window_days)
+
+    baskets = await _load_baskets(db, since)
+    neighbors, n_tools, n_pairs = await run_in_process(
+        _score_related, baskets, settings.related_max_tools_per_user, top_n, settings.related_min_co_users,
+        timeout=SCORE_TIMEOUT,
+    )
+    counted = time.perf_counter()
+
+    # 已删除的工具不写入（外键）
+    existing = set((await db.execute(select(Tool.id))).scalars().all())
+    now = datetime.now()
+    rows = [
+        {
+            "tool_id": tool_id,
+            "related_tool_id": related_id,
+            "rank": rank,
+            "score": round(score, 6),
+            "co_users": co_users,
+            "computed_at": now,
+        }
+        for tool_id, items in neighbors.items() if tool_id in existing
+        for rank, (score, co_users, related_id) in enumerate(
+            (item for item in items if item[2] in existing), start=1
+        )
+    ]
+
+    await db.execute(delete(ToolRelated))
+    for i in range(0, len(rows), INSERT_BATCH):
+        await db.execute(insert(ToolRelated), rows[i:i + INSERT_BATCH])
+    await db.commit()
+
+    stats = {
+        "window_days": window_days,
+        "users": len(baskets),
+        "tools": n_tools,
+        "pairs": n_pairs,
+        "rows": len(rows),
+        "count_seconds": round(counted - start, 2),
+        "total_seconds": round(time.perf_counter() - start, 2),
+    }
+    logger.info(f"相关工具计算完成: {stats}")
+    return stats
+
+
+async def get_related(
+    db: AsyncSession, tool_id: int, limit: int = 10, exclude: frozenset[int] = frozenset()
+) -> list[tuple[Tool, ToolRelated]]:
+    """读取预计算的相关工具（只返回启用且当前用户可见的工具）"""
+    query = (
+        select(Tool, ToolRelated)
+        .join(ToolRelated, ToolRelated.related_tool_id == Tool.id)
+        .where(ToolRelated.tool_id == tool_id, Tool.is_active == True)
+        .order_by(ToolRelated.rank)
+    )
+    if exclude:
+        query = query.where(Tool.id.notin_(exclude))
+    return [tuple(row) for row in (await db.execute(query.limit(limit))).all()]
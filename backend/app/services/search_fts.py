@@ -0,0 +1,219 @@
+"""工具搜索 - 数据库全文索引引擎
+
+PostgreSQL：tool_search_docs 影子表，pg_trgm GIN 索引（子串/模糊）+ tsvector GIN 索引（分词）
+SQLite：tool_search_fts FTS5 虚拟表（trigram 分词），rowid 即工具ID
+
+影子表只存启用状态的工具，由 search_service 在目录变更提交后同步。
+"""
+import re
+from typing import Optional
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# 字段权重，与内存索引一致：名称 / 标签 / 分类 / 描述
+NAME_WEIGHT, TAGS_WEIGHT, CATEGORY_WEIGHT, DESCRIPTION_WEIGHT = 3.0, 2.0, 2.0, 1.0
+
+# trigram 分词要求检索词至少 3 个字符，更短的词走 LIKE
+TRIGRAM_MIN_LENGTH = 3
+
+SQLITE_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS tool_search_fts USING fts5(
+        name, tags, category, description, tokenize = 'trigram'
+    )
+    """,
+]
+
+POSTGRES_SCHEMA = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE TABLE IF NOT EXISTS tool_search_docs (
+        tool_id INT PRIMARY KEY REFERENCES tools(id) ON DELETE CASCADE,
+        name TEXT NOT NULL DEFAULT '',
+        tags TEXT NOT NULL DEFAULT '',
+        category TEXT NOT NULL DEFAULT '',
+        description TEXT NOT NULL DEFAULT '',
+        body TEXT NOT NULL DEFAULT '',
+        tsv TSVECTOR
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_tool_search_body_trgm ON tool_search_docs USING gin (body gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_tool_search_tsv ON tool_search_docs USING gin (tsv)",
+]
+
+_schema_ready = False
+
+
+def _is_sqlite(db: AsyncSession) -> bool:
+    return db.get_bind().dialect.name == "sqlite"
+
+
+def split_terms(query: str) -> list[str]:
+    """按空白切分检索词（去重、转小写）"""
+    return list(dict.fromkeys(t for t in re.split(r"\s+", (query or "").lower()) if t))
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+async def ensure_schema(db: AsyncSession) -> bool:
+    """
+    建立影子表（幂等，每个进程执行一次）
+
+    Returns:
+        影子表是否为空（为空时调用方应全量同步）
+    """
+    global _schema_ready
+    sqlite = _is_sqlite(db)
+    table = "tool_search_fts" if sqlite else "tool_search_docs"
+
+    if not _schema_ready:
+        for sql in SQLITE_SCHEMA if sqlite else POSTGRES_SCHEMA:
+            await db.execute(text(sql))
+        await db.commit()
+        _schema_ready = True
+
+    result = await db.execute(text(f"SELECT 1 FROM {table} LIMIT 1"))
+    return result.first() is None
+
+
+async def write_documents(db: AsyncSession, docs: list, tool_ids: Optional[set[int]] = None):
+    """
+    写入影子表
+
+    Args:
+        docs: search_service.load_tool_docs 返回的文档
+        tool_ids: 本次同步的工具ID；None 表示全量替换
+    """
+    sqlite = _is_sqlite(db)
+    table = "tool_search_fts" if sqlite else "tool_search_docs"
+    key = "rowid" if sqlite else "tool_id"
+
+    if tool_ids is None:
+        await db.execute(text(f"DELETE FROM {table}"))
+    elif tool_ids:
+        placeholders = ", ".join(f":id{i}" for i in range(len(tool_ids)))
+        await db.execute(
+            text(f"DELETE FROM {table} WHERE {key} IN ({placeholders})"),
+            {f"id{i}": tool_id for i, tool_id in enumerate(tool_ids)},
+        )
+
+    rows = [
+        {
+            "tool_id": doc.id,
+            "name": doc.name,
+            "tags": " ".join(doc.tags),
+            "category": doc.category,
+            "description": doc.description,
+        }
+        for doc in docs
+    ]
+    if rows:
+        if sqlite:
+            insert = text(
+                "INSERT INTO tool_search_fts (rowid, name, tags, category, description) "
+                "VALUES (:tool_id, :name, :tags, :category, :description)"
+            )
+        else:
+            for row in rows:
+                row["body"] = " ".join(
+                    v for v in (row["name"], row["tags"], row["category"], row["description"]) if v
+                ).lower()
+            insert = text("""
+                INSERT INTO tool_search_docs (tool_id, name, tags, category, description, body, tsv)
+                VALUES (
+                    :tool_id, :name, :tags, :category, :description, :body,
+                    setweight(to_tsvector('simple', :name), 'A')
+                    || setweight(to_tsvector('simple', :tags), 'B')
+                    || setweight(to_tsvector('simple', :category), 'B')
+                    || setweight(to_tsvector('simple', :description), 'D')
+                )
+            """)
+        await db.execute(insert, rows)
+    await db.commit()
+
+
+async def search(db: AsyncSession, query: str, limit: Optional[int] = 20) -> list[dict]:
+    """
+    全文检索，按得分降序返回
+
+    Returns:
+        [{tool_id, name, description, icon_url, category, score}]
+    """
+    terms = split_terms(query)
+    if not terms:
+        return []
+    if _is_sqlite(db):
+        sql, params = _sqlite_query(terms)
+    else:
+        sql, params = _postgres_query(terms, " ".join(terms))
+    if limit is not None:
+        sql += " LIMIT :limit"
+        params["limit"] = limit
+
+    result = await db.execute(text(sql), params)
+    return [dict(row._mapping) for row in result]
+
+
+def _sqlite_query(terms: list[str]) -> tuple[str, dict]:
+    if all(len(t) >= TRIGRAM_MIN_LENGTH for t in terms):
+        # 全部走 FTS5 索引，bm25() 越小越相关
+        match = " OR ".join('"{}"'.format(t.replace('"', '""')) for t in terms)
+        sql = f"""
+            SELECT f.rowid AS tool_id, f.name, f.description, t.icon_url, f.category,
+                -bm25(tool_search_fts, {NAME_WEIGHT}, {TAGS_WEIGHT}, {CATEGORY_WEIGHT}, {DESCRIPTION_WEIGHT}) AS score
+            FROM tool_search_fts f
+            JOIN tools t ON t.id = f.rowid
+            WHERE tool_search_fts MATCH :match
+            ORDER BY score DESC, f.rowid
+        """
+        return sql, {"match": match}
+
+    # 含短词（如两个汉字）：LIKE 扫描影子表，按命中字段加权打分
+    # 带 ESCAPE 的 LIKE 不会交给 FTS5 处理（trigram 对少于3字符的模式匹配不到），由 SQLite 逐行判断
+    params, conditions, scores = {}, [], []
+    for i, term in enumerate(terms):
+        params[f"t{i}"] = _like_pattern(term)
+        fields = [
+            ("f.name", NAME_WEIGHT), ("f.tags", TAGS_WEIGHT),
+            ("f.category", CATEGORY_WEIGHT), ("f.description", DESCRIPTION_WEIGHT),
+        ]
+        conditions += [f"{col} LIKE :t{i} ESCAPE '\\'" for col, _ in fields]
+        scores += [f"CASE WHEN {col} LIKE :t{i} ESCAPE '\\' THEN {w} ELSE 0 END" for col, w in fields]
+    sql = f"""
+        SELECT f.rowid AS tool_id, f.name, f.description, t.icon_url, f.category,
+            ({" + ".join(scores)}) AS score
+        FROM tool_search_fts f
+        JOIN tools t ON t.id = f.rowid
+        WHERE {" OR ".join(conditions)}
+        ORDER BY score DESC, f.rowid
+    """
+    return sql, params
+
+
+def _postgres_query(terms: list[str], query: str) -> tuple[str, dict]:
+    params = {"q": query}
+    # 子串条件可走 trigram GIN 索引，tsvector 条件走分词索引，<% 兜底拼写相近的词
+    conditions = ["d.tsv @@ plainto_tsquery('simple', :q)", ":q <% d.body"]
+    for i, term in enumerate(terms):
+        params[f"t{i}"] = _like_pattern(term)
+        conditions.append(f"d.body LIKE :t{i}")
+    sql = f"""
+        SELECT d.tool_id, d.name, d.description, t.icon_url, d.category,
+            ts_rank(d.tsv, plainto_tsquery('simple', :q))
+            + {NAME_WEIGHT} * word_similarity(:q, lower(d.name))
+            + {TAGS_WEIGHT} * word_similarity(:q, lower(d.tags))
+            + {CATEGORY_WEIGHT} * word_similarity(:q, lower(d.category))
+            + {DESCRIPTION_WEIGHT} * word_similarity(:q, lower(d.description)) AS score
+        FROM tool_search_docs d
+        JOIN tools t ON t.id = d.tool_id
+        WHERE {" OR ".join(conditions)}
+        ORDER BY score DESC, d.tool_id
+    """
+    return sql, params
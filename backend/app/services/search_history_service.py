@@ -0,0 +1,64 @@
+"""搜索历史服务
+
+每次搜索写两处：
+- search_logs：只追加的原始事件，供热词统计，超过保留期由定时任务清理
+- search_history：每个用户每个关键词一行，写入时 ON CONFLICT 刷新时间并裁剪到最近 N 条，
+  读取即 (user_id, searched_at) 索引上的一次范围扫描
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+import logging
+
+from sqlalchemy import select, delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..models import SearchHistory, SearchLog
+from .counter_service import dialect_insert
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+async def record_search(db: AsyncSession, user_id: int, keyword: str):
+    """记录一次搜索（不提交）"""
+    now = datetime.now()
+    await db.execute(insert(SearchLog).values(user_id=user_id, keyword=keyword, searched_at=now))
+
+    stmt = dialect_insert(db, SearchHistory).values(user_id=user_id, keyword=keyword, searched_at=now)
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[SearchHistory.user_id, SearchHistory.keyword],
+        set_={"searched_at": now},
+    ))
+
+    # 只保留最近 N 个关键词
+    recent = (
+        select(SearchHistory.id)
+        .where(SearchHistory.user_id == user_id)
+        .order_by(SearchHistory.searched_at.desc(), SearchHistory.id.desc())
+        .limit(settings.search_history_size)
+    )
+    await db.execute(
+        delete(SearchHistory).where(SearchHistory.user_id == user_id, SearchHistory.id.notin_(recent))
+    )
+
+
+async def recent_searches(db: AsyncSession, user_id: int, limit: int = 20) -> list[SearchHistory]:
+    """用户最近的搜索关键词（已去重，按时间倒序）"""
+    result = await db.execute(
+        select(SearchHistory)
+        .where(SearchHistory.user_id == user_id)
+        .order_by(SearchHistory.searched_at.desc(), SearchHistory.id.desc())
+        .limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+async def purge_search_logs(db: AsyncSession, retention_days: Optional[int] = None) -> int:
+    """删除超过保留期的搜索日志，返回删除条数"""
+    retention_days = retention_days or settings.search_log_retention_days
+    cutoff = datetime.now() - timedelta(days=retention_days)
+    result = await db.execute(delete(SearchLog).where(SearchLog.searched_at < cutoff))
+    await db.commit()
+    logger.info(f"搜索日志清理完成: 删除 {result.rowcount} 条 {retention_days} 天前的记录")
+    return result.rowcount
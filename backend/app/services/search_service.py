@@ -0,0 +1,403 @@
+"""工具搜索服务 - 内存倒排索引
+
+分词：中文按二元组切分（单字串保留单字），英文/数字按单词切分并转小写。
+打分：BM25，名称/标签/分类/描述按字段加权；最后一个英文词支持前缀匹配，适配边输边搜。
+索引在首次查询时从数据库加载，之后按目录变更通知增量刷新。
+
+SEARCH_ENGINE=database 时改用数据库全文索引（见 search_fts），适合大目录与多节点部署；
+两种引擎对外统一通过 search_tools 调用，返回同样的 SearchHit。
+"""
+import asyncio
+import bisect
+import math
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Optional
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..models import Tool, Category, Tag, tool_tags
+from . import search_fts
+from .catalog_events import on_catalog_change, on_catalog_commit
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_CJK_RANGES = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+_TOKEN_RE = re.compile(rf"[{_CJK_RANGES}]+|[a-z0-9]+")
+
+# 字段权重
+FIELD_WEIGHTS = {"name": 3.0, "tags": 2.0, "category": 2.0, "description": 1.0}
+
+# BM25 参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 前缀扩展最多匹配的词数
+PREFIX_EXPAND_LIMIT = 20
+
+
+def _is_cjk(run: str) -> bool:
+    return not run[0].isascii()
+
+
+def tokenize(text: Optional[str]) -> list[str]:
+    """文档分词：中文二元组 + 单字，英文单词"""
+    if not text:
+        return []
+    tokens = []
+    for match in _TOKEN_RE.finditer(text.lower()):
+        run = match.group()
+        if _is_cjk(run):
+            tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def tokenize_query(text: str) -> list[str]:
+    """查询分词：中文串长度>=2时只用二元组，单字串用单字"""
+    tokens = []
+    for match in _TOKEN_RE.finditer(text.lower()):
+        run = match.group()
+        if _is_cjk(run) and len(run) > 1:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+@dataclass
+class _Doc:
+    """索引中的工具文档"""
+    id: int
+    name: str
+    description: str
+    icon_url: Optional[str]
+    category_id: Optional[int]
+    category: str
+    tags: list[str]
+    length: float = 0.0
+
+
+@dataclass
+class SearchHit:
+    """搜索命中"""
+    tool_id: int
+    score: float
+    name: str
+    description: str
+    icon_url: Optional[str]
+    category: str
+    highlights: dict[str, list[list[int]]] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.tool_id,
+            "name": self.name,
+            "description": self.description,
+            "icon_url": self.icon_url,
+            "category": self.category or None,
+            "score": round(self.score, 4),
+            "highlights": self.highlights,
+        }
+
+
+def find_spans(text: str, terms: list[str]) -> list[list[int]]:
+    """查找各词在文本中的位置，返回合并后的 [start, end) 区间"""
+    if not text or not terms:
+        return []
+    lowered = text.lower()
+    spans = []
+    for term in terms:
+        start = lowered.find(term)
+        while start != -1:
+            spans.append([start, start + len(term)])
+            start = lowered.find(term, start + 1)
+    if not spans:
+        return []
+
+    spans.sort()
+    merged = [spans[0]]
+    for start, end in spans[1:]:
+        if start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+async def load_tool_docs(db: AsyncSession, tool_ids: Optional[set[int]] = None) -> list[_Doc]:
+    """从数据库加载工具文档（仅启用状态），分类名含父分类"""
+    parent = Category.__table__.alias("parent")
+    query = (
+        select(
+            Tool.id, Tool.name, Tool.description, Tool.icon_url, Tool.category_id,
+            Category.name.label("category_name"), parent.c.name.label("parent_name"),
+        )
+        .outerjoin(Category, Tool.category_id == Category.id)
+        .outerjoin(parent, Category.parent_id == parent.c.id)
+        .where(Tool.is_active == True)
+    )
+    tag_query = select(tool_tags.c.tool_id, Tag.name).join(Tag, Tag.id == tool_tags.c.tag_id)
+    if tool_ids is not None:
+        query = query.where(Tool.id.in_(tool_ids))
+        tag_query = tag_query.where(tool_tags.c.tool_id.in_(tool_ids))
+
+    tags_by_tool: dict[int, list[str]] = defaultdict(list)
+    for tool_id, tag_name in (await db.execute(tag_query)).all():
+        tags_by_tool[tool_id].append(tag_name)
+
+    docs = []
+    for row in (await db.execute(query)).all():
+        category = " ".join(n for n in (row.parent_name, row.category_name) if n)
+        docs.append(_Doc(
+            id=row.id,
+            name=row.name or "",
+            description=row.description or "",
+            icon_url=row.icon_url,
+            category_id=row.category_id,
+            category=category,
+            tags=tags_by_tool.get(row.id, []),
+        ))
+    return docs
+
+
+class ToolSearchIndex:
+    """工具倒排索引（进程内单例）"""
+
+    def __init__(self):
+        self._docs: dict[int, _Doc] = {}
+        # term -> {tool_id: 加权词频}
+        self._postings: dict[str, dict[int, float]] = defaultdict(dict)
+        self._total_length = 0.0
+        self._sorted_terms: Optional[list[str]] = None
+        self._built_at = 0.0
+        self._stale = True
+        self._pending: set[int] = set()
+        self._lock = asyncio.Lock()
+
+    # ---------- 变更通知 ----------
+
+    def invalidate(self, tool_ids: Optional[set[int]] = None):
+        """标记索引过期：指定工具增量刷新，否则下次查询前全量重建"""
+        if tool_ids is None:
+            self._stale = True
+        else:
+            self._pending |= tool_ids
+
+    async def ensure_fresh(self, db: AsyncSession):
+        """查询前调用：按需全量重建或增量刷新"""
+        expired = time.time() - self._built_at > settings.search_index_ttl
+        if not (self._stale or expired or self._pending):
+            return
+
+        async with self._lock:
+            expired = time.time() - self._built_at > settings.search_index_ttl
+            if self._stale or expired:
+                await self._rebuild(db)
+            elif self._pending:
+                pending, self._pending = self._pending, set()
+                await self._refresh(db, pending)
+
+    # ---------- 构建 ----------
+
+    async def _rebuild(self, db: AsyncSession):
+        start = time.perf_counter()
+        # 先清标记，加载期间到达的变更通知留待下次处理
+        self._stale = False
+        self._pending = set()
+        docs = await load_tool_docs(db)
+
+        self._docs = {}
+        self._postings = defaultdict(dict)
+        self._total_length = 0.0
+        for doc in docs:
+            self._add(doc)
+        self._sorted_terms = None
+        self._built_at = time.time()
+        logger.info(f"搜索索引重建完成: {len(docs)} 个工具, {len(self._postings)} 个词, "
+                    f"耗时 {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    async def _refresh(self, db: AsyncSession, tool_ids: set[int]):
+        docs = {doc.id: doc for doc in await load_tool_docs(db, tool_ids)}
+        for tool_id in tool_ids:
+            self._remove(tool_id)
+            if tool_id in docs:
+                self._add(docs[tool_id])
+        self._sorted_terms = None
+        logger.debug(f"搜索索引增量刷新: {sorted(tool_ids)}")
+
+    def _field_tokens(self, doc: _Doc) -> dict[str, list[str]]:
+        return {
+            "name": tokenize(doc.name),
+            "tags": [t for tag in doc.tags for t in tokenize(tag)],
+            "category": tokenize(doc.category),
+            "description": tokenize(doc.description),
+        }
+
+    def _add(self, doc: _Doc):
+        weighted: dict[str, float] = defaultdict(float)
+        length = 0.0
+        for field_name, tokens in self._field_tokens(doc).items():
+            weight = FIELD_WEIGHTS[field_name]
+            length += weight * len(tokens)
+            for token in tokens:
+                weighted[token] += weight
+
+        doc.length = length
+        self._docs[doc.id] = doc
+        self._total_length += length
+        for token, tf in weighted.items():
+            self._postings[token][doc.id] = tf
+
+    def _remove(self, tool_id: int):
+        doc = self._docs.pop(tool_id, None)
+        if not doc:
+            return
+        self._total_length -= doc.length
+        for field_name, tokens in self._field_tokens(doc).items():
+            for token in set(tokens):
+                postings = self._postings.get(token)
+                if postings is not None:
+                    postings.pop(tool_id, None)
+                    if not postings:
+                        del self._postings[token]
+
+    # ---------- 查询 ----------
+
+    def _expand_prefix(self, prefix: str) -> list[str]:
+        """英文前缀扩展（chat -> chatgpt, chatbot ...）"""
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self._postings)
+        terms = []
+        i = bisect.bisect_left(self._sorted_terms, prefix)
+        while i < len(self._sorted_terms) and len(terms) < PREFIX_EXPAND_LIMIT:
+            term = self._sorted_terms[i]
+            if not term.startswith(prefix):
+                break
+            if term != prefix:
+                terms.append(term)
+            i += 1
+        return terms
+
+    def _query_terms(self, query: str) -> list[tuple[str, float]]:
+        """查询词及其权重（前缀扩展词降权）"""
+        tokens = tokenize_query(query)
+        terms = [(t, 1.0) for t in dict.fromkeys(tokens)]
+        if tokens and tokens[-1].isascii() and len(tokens[-1]) >= 2:
+            terms += [(t, 0.5) for t in self._expand_prefix(tokens[-1])]
+        return terms
+
+    def search(self, query: str, limit: Optional[int] = 20, exclude: frozenset[int] = frozenset()) -> list[SearchHit]:
+        """BM25 检索，按得分降序返回（exclude 中的工具不参与排名）"""
+        terms = self._query_terms(query or "")
+        if not terms or not self._docs:
+            return []
+
+        n_docs = len(self._docs)
+        avg_length = self._total_length / n_docs or 1.0
+        scores: dict[int, float] = defaultdict(float)
+        matched_terms: dict[int, list[str]] = defaultdict(list)
+
+        for term, term_weight in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for tool_id, tf in postings.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._docs[tool_id].length / avg_length)
+                scores[tool_id] += term_weight * idf * tf * (BM25_K1 + 1) / (tf + norm)
+                matched_terms[tool_id].append(term)
+
+        ranked = sorted(scores.items(), key=lambda x: (-x[1], x[0]))
+        if exclude:
+            ranked = [item for item in ranked if item[0] not in exclude]
+        if limit is not None:
+            ranked = ranked[:limit]
+
+        hits = []
+        for tool_id, score in ranked:
+            doc = self._docs[tool_id]
+            terms_hit = matched_terms[tool_id]
+            hits.append(SearchHit(
+                tool_id=tool_id,
+                score=score,
+                name=doc.name,
+                description=doc.description,
+                icon_url=doc.icon_url,
+                category=doc.category,
+                highlights={
+                    "name": find_spans(doc.name, terms_hit),
+                    "description": find_spans(doc.description, terms_hit),
+                },
+            ))
+        return hits
+
+    def stats(self) -> dict:
+        """索引统计（调试用）"""
+        return {
+            "docs": len(self._docs),
+            "terms": len(self._postings),
+            "built_at": self._built_at,
+            "pending": len(self._pending),
+        }
+
+
+tool_search_index = ToolSearchIndex()
+on_catalog_change(tool_search_index.invalidate)
+
+
+@on_catalog_commit
+async def sync_database_index(db: AsyncSession, tool_ids: Optional[set[int]] = None):
+    """目录变更提交后同步数据库全文索引（仅 database 引擎）"""
+    if settings.search_engine != "database":
+        return
+    if await search_fts.ensure_schema(db):
+        tool_ids = None
+    docs = await load_tool_docs(db, tool_ids)
+    await search_fts.write_documents(db, docs, tool_ids)
+
+
+async def _search_database(db: AsyncSession, query: str, limit: Optional[int]) -> list[SearchHit]:
+    if await search_fts.ensure_schema(db):
+        # 影子表为空（新库或刚切换引擎），先全量同步
+        await search_fts.write_documents(db, await load_tool_docs(db))
+
+    terms = search_fts.split_terms(query)
+    hits = []
+    for row in await search_fts.search(db, query, limit=limit):
+        hits.append(SearchHit(
+            tool_id=row["tool_id"],
+            score=float(row["score"] or 0),
+            name=row["name"],
+            description=row["description"],
+            icon_url=row["icon_url"],
+            category=row["category"],
+            highlights={
+                "name": find_spans(row["name"], terms),
+                "description": find_spans(row["description"], terms),
+            },
+        ))
+    return hits
+
+
+async def search_tools(
+    db: AsyncSession, query: str, limit: Optional[int] = 20, exclude: frozenset[int] = frozenset()
+) -> list[SearchHit]:
+    """搜索工具（按配置选择引擎），exclude 为当前用户不可见的工具"""
+    if settings.search_engine == "database":
+        # 多取被排除的数量，过滤后仍能凑满 limit
+        fetch = limit + len(exclude) if limit is not None and exclude else limit
+        hits = await _search_database(db, query, fetch)
+        hits = [hit for hit in hits if hit.tool_id not in exclude]
+        return hits if limit is None else hits[:limit]
+
+    await tool_search_index.ensure_fresh(db)
+    return tool_search_index.search(query, limit=limit, exclude=exclude)
@@ -2,7 +2,7 @@
 from datetime import date, datetime, timedelta
 from sqlalchemy import select, func, distinct
 from sqlalchemy.ext.asyncio import AsyncSession
-from ..models import Tool, User, ClickLog, UserFavorite, UserLike, ToolFeedback
+from ..models import Tool, User, ClickLog, UserFavorite, UserLike, ToolFeedback, ToolCounter
 import logging
 
 logger = logging.getLogger(__name__)
@@ -151,6 +151,8 @@ class StatsService:
 
     async def get_tool_stats(self, days: int = 7, limit: int = 10) -> list[dict]:
         """获取工具使用排行（含环比和提供者）"""
+        # 仍按明细统计：窗口内独立用户数计数器无法提供；click_7d 只在夜间校准扣除过期点击，
+        # 与按明细统计的上周期环比口径不一致
         now = datetime.now()
         current_start = now - timedelta(days=days)
         previous_start = current_start - timedelta(days=days)
@@ -435,40 +437,20 @@ class StatsService:
 
     async def get_tool_interactions(self, limit: int = 20) -> list[dict]:
         """获取工具点赞收藏统计"""
-        # 统计每个工具的收藏数和点赞数
-        favorites_subq = (
-            select(
-                UserFavorite.tool_id,
-                func.count(UserFavorite.id).label("favorite_count")
-            )
-            .group_by(UserFavorite.tool_id)
-            .subquery()
-        )
-
-        likes_subq = (
-            select(
-                UserLike.tool_id,
-                func.count(UserLike.id).label("like_count")
-            )
-            .group_by(UserLike.tool_id)
-            .subquery()
-        )
-
+        # 收藏数和点赞数直接读取计数器表
+        favorite_count = func.coalesce(ToolCounter.favorite_count, 0)
+        like_count = func.coalesce(ToolCounter.like_count, 0)
         query = (
             select(
                 Tool.id,
                 Tool.name,
                 Tool.provider,
-                func.coalesce(favorites_subq.c.favorite_count, 0).label("favorite_count"),
-                func.coalesce(likes_subq.c.like_count, 0).label("like_count"),
+                favorite_count.label("favorite_count"),
+                like_count.label("like_count"),
             )
-            .outerjoin(favorites_subq, Tool.id == favorites_subq.c.tool_id)
-            .outerjoin(likes_subq, Tool.id == likes_subq.c.tool_id)
+            .outerjoin(ToolCounter, Tool.id == ToolCounter.tool_id)
             .where(Tool.is_active == True)
-            .order_by(
-                (func.coalesce(favorites_subq.c.favorite_count, 0) +
-                 func.coalesce(likes_subq.c.like_count, 0)).desc()
-            )
+            .order_by((favorite_count + like_count).desc())
             .limit(limit)
         )
 
@@ -0,0 +1,269 @@
+"""搜索框自动补全 - 压缩前缀树
+
+词条来源：工具名、标签名、分类名、近期热门搜索词，按热度加权。
+每个节点在构建时预先算好子树内热度最高的 TOP_K 个词条，查询只需沿前缀走一遍树。
+目录变更时整树重建；热度与热门搜索词按 TTL 刷新。
+"""
+import asyncio
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+import logging
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..models import Tool, Category, Tag, ClickLog, SearchLog, tool_tags
+from .catalog_events import on_catalog_change
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 每个节点缓存的候选数（即接口 limit 上限）
+TOP_K = 20
+
+# 热度按近7天点击量计算（与 sort=hot 一致）
+HOT_DAYS = 7
+
+# 热门搜索词：近30天、至少被搜索2次，最多取500个
+KEYWORD_DAYS = 30
+KEYWORD_MIN_COUNT = 2
+KEYWORD_LIMIT = 500
+
+_WORD_START_RE = re.compile(r"(?<=[\s\-_/.])[a-z0-9]")
+
+
+@dataclass
+class Suggestion:
+    """补全词条"""
+    text: str
+    type: str  # tool / tag / category / keyword
+    weight: float
+    tool_id: Optional[int] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "text": self.text,
+            "type": self.type,
+            "tool_id": self.tool_id,
+            "score": self.weight,
+        }
+
+
+class _Node:
+    __slots__ = ("edges", "entries", "top")
+
+    def __init__(self):
+        # 首字符 -> (边标签, 子节点)
+        self.edges: dict[str, tuple[str, "_Node"]] = {}
+        self.entries: list[int] = []
+        self.top: tuple[int, ...] = ()
+
+
+class CompressedTrie:
+    """压缩前缀树（radix tree），节点预存子树 TOP_K 词条"""
+
+    def __init__(self):
+        self.root = _Node()
+        self.suggestions: list[Suggestion] = []
+        self._node_count = 1
+
+    def add(self, suggestion: Suggestion, keys: list[str]):
+        """添加词条，keys 为该词条可被命中的小写前缀起点（整词及各单词开头）"""
+        index = len(self.suggestions)
+        self.suggestions.append(suggestion)
+        for key in dict.fromkeys(keys):
+            if key:
+                self._insert(key, index)
+
+    def _insert(self, key: str, index: int):
+        node = self.root
+        while key:
+            edge = node.edges.get(key[0])
+            if edge is None:
+                child = _Node()
+                node.edges[key[0]] = (key, child)
+                self._node_count += 1
+                node = child
+                break
+
+            label, child = edge
+            common = 0
+            limit = min(len(label), len(key))
+            while common < limit and label[common] == key[common]:
+                common += 1
+
+            if common < len(label):
+                # 拆分边：label = label[:common] + label[common:]
+                middle = _Node()
+                middle.edges[label[common]] = (label[common:], child)
+                node.edges[key[0]] = (label[:common], middle)
+                self._node_count += 1
+                child = middle
+
+            node = child
+            key = key[common:]
+        node.entries.append(index)
+
+    def finalize(self):
+        """自底向上计算各节点的 TOP_K 词条"""
+        weights = [s.weight for s in self.suggestions]
+        texts = [s.text for s in self.suggestions]
+
+        def sort_key(i: int):
+            return (-weights[i], len(texts[i]), texts[i])
+
+        # 迭代后序遍历，避免长词条导致递归过深
+        stack = [(self.root, False)]
+        while stack:
+            node, visited = stack.pop()
+            if not visited:
+                stack.append((node, True))
+                stack.extend((child, False) for _, child in node.edges.values())
+                continue
+            candidates = set(node.entries)
+            for _, child in node.edges.values():
+                candidates.update(child.top)
+            node.top = tuple(sorted(candidates, key=sort_key)[:TOP_K])
+
+    def complete(self, prefix: str, limit: int = 10) -> list[Suggestion]:
+        node = self.root
+        key = prefix
+        while key:
+            edge = node.edges.get(key[0])
+            if edge is None:
+                return []
+            label, child = edge
+            if key.startswith(label):
+                key = key[len(label):]
+            elif label.startswith(key):
+                key = ""
+            else:
+                return []
+            node = child
+        return [self.suggestions[i] for i in node.top[:limit]]
+
+    def __len__(self) -> int:
+        return len(self.suggestions)
+
+    @property
+    def node_count(self) -> int:
+        return self._node_count
+
+
+def suggestion_keys(text: str) -> list[str]:
+    """词条的索引键：整词，以及多单词英文名中每个单词开头（如 Stable Diffusion -> diffusion）"""
+    lowered = text.strip().lower()
+    return [lowered] + [lowered[m.start():] for m in _WORD_START_RE.finditer(lowered)]
+
+
+def build_trie(suggestions: list[Suggestion]) -> CompressedTrie:
+    trie = CompressedTrie()
+    for suggestion in suggestions:
+        trie.add(suggestion, suggestion_keys(suggestion.text))
+    trie.finalize()
+    return trie
+
+
+class SuggestIndex:
+    """自动补全索引（进程内单例）"""
+
+    def __init__(self):
+        self._trie = CompressedTrie()
+        self._built_at = 0.0
+        self._stale = True
+        self._lock = asyncio.Lock()
+
+    def invalidate(self, tool_ids: Optional[set[int]] = None):
+        """目录变更后整树重建（工具名变化会影响分类/标签热度，不做增量）"""
+        self._stale = True
+
+    async def ensure_fresh(self, db: AsyncSession):
+        if not self._stale and time.time() - self._built_at <= settings.search_index_ttl:
+            return
+        async with self._lock:
+            if not self._stale and time.time() - self._built_at <= settings.search_index_ttl:
+                return
+            self._stale = False
+            start = time.perf_counter()
+            self._trie = build_trie(await self._load_suggestions(db))
+            self._built_at = time.time()
+            logger.info(f"补全前缀树重建完成: {len(self._trie)} 个词条, {self._trie.node_count} 个节点, "
+                        f"耗时 {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    async def _load_suggestions(self, db: AsyncSession) -> list[Suggestion]:
+        since = datetime.now() - timedelta(days=HOT_DAYS)
+        clicks = dict((await db.execute(
+            select(ClickLog.tool_id, func.count())
+            .where(ClickLog.clicked_at >= since)
+            .group_by(ClickLog.tool_id)
+        )).all())
+
+        tools = (await db.execute(
+            select(Tool.id, Tool.name, Tool.category_id).where(Tool.is_active == True)
+        )).all()
+
+        suggestions = []
+        category_hot: dict[int, float] = defaultdict(float)
+        hot_by_tool: dict[int, float] = {}
+        for tool_id, name, category_id in tools:
+            hot = float(clicks.get(tool_id, 0))
+            hot_by_tool[tool_id] = hot
+            if category_id:
+                category_hot[category_id] += hot
+            suggestions.append(Suggestion(text=name, type="tool", weight=hot, tool_id=tool_id))
+
+        # 标签/分类热度 = 所含启用工具的热度之和
+        tag_hot: dict[int, float] = defaultdict(float)
+        for tool_id, tag_id in (await db.execute(select(tool_tags.c.tool_id, tool_tags.c.tag_id))).all():
+            if tool_id in hot_by_tool:
+                tag_hot[tag_id] += hot_by_tool[tool_id]
+        for tag_id, name in (await db.execute(select(Tag.id, Tag.name))).all():
+            suggestions.append(Suggestion(text=name, type="tag", weight=tag_hot.get(tag_id, 0.0)))
+        for category_id, name in (await db.execute(
+            select(Category.id, Category.name).where(Category.is_active == True)
+        )).all():
+            suggestions.append(Suggestion(text=name, type="category", weight=category_hot.get(category_id, 0.0)))
+
+        # 热门搜索词（与目录词条重复的跳过）
+        known = {s.text.strip().lower() for s in suggestions}
+        keyword_since = datetime.now() - timedelta(days=KEYWORD_DAYS)
+        count = func.count().label("count")
+        keywords = (await db.execute(
+            select(SearchLog.keyword, count)
+            .where(SearchLog.searched_at >= keyword_since)
+            .group_by(SearchLog.keyword)
+            .having(count >= KEYWORD_MIN_COUNT)
+            .order_by(count.desc())
+            .limit(KEYWORD_LIMIT)
+        )).all()
+        for keyword, times in keywords:
+            text = keyword.strip()
+            if text and text.lower() not in known:
+                known.add(text.lower())
+                suggestions.append(Suggestion(text=text, type="keyword", weight=float(times)))
+
+        return suggestions
+
+    def complete(self, prefix: str, limit: int = 10) -> list[Suggestion]:
+        return self._trie.complete(prefix.strip().lower(), limit)
+
+
+suggest_index = SuggestIndex()
+on_catalog_change(suggest_index.invalidate)
+
+
+async def suggest(
+    db: AsyncSession, prefix: str, limit: int = 10, exclude: frozenset[int] = frozenset()
+) -> list[Suggestion]:
+    """前缀补全（保证前缀树为最新后查询），exclude 中的工具词条不返回"""
+    await suggest_index.ensure_fresh(db)
+    if not exclude:
+        return suggest_index.complete(prefix, limit)
+    # 节点只预存 TOP_K 个词条，过滤后可能不足 limit
+    candidates = suggest_index.complete(prefix, TOP_K)
+    return [s for s in candidates if s.tool_id not in exclude][:limit]
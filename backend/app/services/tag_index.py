@@ -0,0 +1,105 @@
+"""标签位图索引
+
+按 tool_tags 关联表为每个标签建一张工具位图：多标签 AND/OR 筛选即位图按位与/或，
+分面计数即结果集位图与各标签位图求交后数 1 的个数，均不访问数据库。
+目录变更（工具/标签写入）后整体重建。
+"""
+import asyncio
+import time
+from typing import Iterable, Literal, Optional
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..models import Tool, tool_tags
+from .bitmap import ToolPositions
+from .catalog_events import on_catalog_change
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+TagMode = Literal["all", "any"]
+
+
+def parse_tag_ids(value: Optional[str]) -> tuple[int, ...]:
+    """解析逗号分隔的标签ID（去重并保持顺序），格式错误时抛出 ValueError"""
+    if not value:
+        return ()
+    ids = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if not part.isdigit():
+            raise ValueError(part)
+        ids.append(int(part))
+    return tuple(dict.fromkeys(ids))
+
+
+class TagBitmapIndex:
+    """标签位图索引（进程内单例）"""
+
+    def __init__(self):
+        self._tools = ToolPositions([])
+        self._tags: dict[int, int] = {}
+        self._built_at = 0.0
+        self._stale = True
+        self._lock = asyncio.Lock()
+
+    def invalidate(self, tool_ids: Optional[set[int]] = None):
+        """目录变更后整体重建（只读关联表两列）"""
+        self._stale = True
+
+    async def ensure_fresh(self, db: AsyncSession):
+        if not self._stale and time.time() - self._built_at <= settings.search_index_ttl:
+            return
+        async with self._lock:
+            if not self._stale and time.time() - self._built_at <= settings.search_index_ttl:
+                return
+            self._stale = False
+            await self._rebuild(db)
+            self._built_at = time.time()
+
+    async def _rebuild(self, db: AsyncSession):
+        start = time.perf_counter()
+        tools = ToolPositions(list((await db.execute(select(Tool.id).order_by(Tool.id))).scalars().all()))
+        tags: dict[int, int] = {}
+        for tool_id, tag_id in (await db.execute(select(tool_tags.c.tool_id, tool_tags.c.tag_id))).all():
+            position = tools.positions.get(tool_id)
+            if position is not None:
+                tags[tag_id] = tags.get(tag_id, 0) | (1 << position)
+
+        self._tools = tools
+        self._tags = tags
+        logger.info(f"标签位图重建完成: {len(tools)} 个工具, {len(tags)} 个标签, "
+                    f"耗时 {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    def match(self, tag_ids: Iterable[int], mode: TagMode = "all") -> list[int]:
+        """带有全部（all）或任一（any）指定标签的工具ID"""
+        masks = [self._tags.get(tag_id, 0) for tag_id in tag_ids]
+        if not masks:
+            return []
+        mask = masks[0]
+        for other in masks[1:]:
+            mask = mask & other if mode == "all" else mask | other
+        return self._tools.to_ids(mask)
+
+    def facets(self, tool_ids: Iterable[int]) -> dict[int, int]:
+        """结果集内各标签的工具数（只返回非零项）"""
+        result = self._tools.to_mask(tool_ids)
+        counts = {}
+        for tag_id, mask in self._tags.items():
+            count = (result & mask).bit_count()
+            if count:
+                counts[tag_id] = count
+        return counts
+
+    def stats(self) -> dict:
+        """索引统计（调试用）"""
+        return {"tools": len(self._tools), "tags": len(self._tags), "built_at": self._built_at}
+
+
+tag_index = TagBitmapIndex()
+on_catalog_change(tag_index.invalidate)
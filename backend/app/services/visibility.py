@@ -0,0 +1,129 @@
+"""工具可见范围 - 按部门/角色预计算位图
+
+Tool.visible_departments / visible_roles 为空表示不限制；非空时用户的部门（角色）必须在列表中。
+用户的部门取飞书通讯录主部门名称、角色取职务，每次登录时刷新（见 auth.login）。
+目录变更后重建：每个工具占一位，为每个出现过的部门、角色预先算好"可见工具"位图
+（含未限制的工具），请求时只需取出用户所在分段的两张位图做按位与。
+结果以"不可见工具ID集合"返回（通常远小于可见集合），便于在 SQL 中 NOT IN 过滤。
+"""
+import asyncio
+import time
+from typing import Any, Optional
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..models import Tool, User
+from .bitmap import ToolPositions
+from .catalog_events import on_catalog_change
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def _segments(value: Any) -> set[str]:
+    """JSON 列取值归一化为分段名集合（兼容列表与逗号分隔字符串）"""
+    if not value:
+        return set()
+    if isinstance(value, str):
+        value = value.split(",")
+    return {str(v).strip() for v in value if v is not None and str(v).strip()}
+
+
+class VisibilityIndex:
+    """可见范围位图（进程内单例）"""
+
+    def __init__(self):
+        self._tools = ToolPositions([])
+        self._open_departments = 0  # 未限制部门的工具
+        self._open_roles = 0  # 未限制角色的工具
+        self._departments: dict[str, int] = {}
+        self._roles: dict[str, int] = {}
+        self._hidden: dict[tuple, frozenset[int]] = {}
+        self._built_at = 0.0
+        self._stale = True
+        self._lock = asyncio.Lock()
+
+    def invalidate(self, tool_ids: Optional[set[int]] = None):
+        """目录变更后整体重建（只读两列，重建成本很低）"""
+        self._stale = True
+
+    async def ensure_fresh(self, db: AsyncSession):
+        if not self._stale and time.time() - self._built_at <= settings.search_index_ttl:
+            return
+        async with self._lock:
+            if not self._stale and time.time() - self._built_at <= settings.search_index_ttl:
+                return
+            self._stale = False
+            await self._rebuild(db)
+            self._built_at = time.time()
+
+    async def _rebuild(self, db: AsyncSession):
+        start = time.perf_counter()
+        rows = (await db.execute(
+            select(Tool.id, Tool.visible_departments, Tool.visible_roles).order_by(Tool.id)
+        )).all()
+
+        open_departments = open_roles = 0
+        departments: dict[str, int] = {}
+        roles: dict[str, int] = {}
+        for position, (_, visible_departments, visible_roles) in enumerate(rows):
+            bit = 1 << position
+            segments = _segments(visible_departments)
+            if not segments:
+                open_departments |= bit
+            for name in segments:
+                departments[name] = departments.get(name, 0) | bit
+            segments = _segments(visible_roles)
+            if not segments:
+                open_roles |= bit
+            for name in segments:
+                roles[name] = roles.get(name, 0) | bit
+
+        # 分段位图预先并入未限制的工具，请求时无需再做或运算
+        self._tools = ToolPositions([row.id for row in rows])
+        self._open_departments = open_departments
+        self._open_roles = open_roles
+        self._departments = {name: mask | open_departments for name, mask in departments.items()}
+        self._roles = {name: mask | open_roles for name, mask in roles.items()}
+        self._hidden = {}
+        logger.info(f"可见范围位图重建完成: {len(self._tools)} 个工具, {len(departments)} 个部门, "
+                    f"{len(roles)} 个角色, 耗时 {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    def hidden(self, department: Optional[str], role: Optional[str]) -> frozenset[int]:
+        """指定部门/角色不可见的工具ID（未出现在任何工具配置中的分段与未登录等同）"""
+        department = department if department in self._departments else None
+        role = role if role in self._roles else None
+        key = (department, role)
+        cached = self._hidden.get(key)
+        if cached is None:
+            visible = (
+                self._departments.get(department, self._open_departments)
+                & self._roles.get(role, self._open_roles)
+            )
+            cached = frozenset(self._tools.to_ids(self._tools.all & ~visible))
+            self._hidden[key] = cached
+        return cached
+
+    def stats(self) -> dict:
+        """位图统计（调试用）"""
+        return {
+            "tools": len(self._tools),
+            "departments": len(self._departments),
+            "roles": len(self._roles),
+            "built_at": self._built_at,
+        }
+
+
+visibility_index = VisibilityIndex()
+on_catalog_change(visibility_index.invalidate)
+
+
+async def hidden_tool_ids(db: AsyncSession, user: Optional[User]) -> frozenset[int]:
+    """当前用户不可见的工具ID（未登录只能看到未设置可见范围的工具）"""
+    await visibility_index.ensure_fresh(db)
+    if user is None:
+        return visibility_index.hidden(None, None)
+    return visibility_index.hidden(user.department, user.role)
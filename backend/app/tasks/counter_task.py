@@ -0,0 +1,17 @@
+"""计数器校准任务"""
+import logging
+
+from ..database import async_session
+from ..services.counter_service import reconcile_counters
+
+logger = logging.getLogger(__name__)
+
+
+async def reconcile_counters_task():
+    """按明细表校准工具计数器（同时扣除滑出 7 天窗口的点击）"""
+    try:
+        async with async_session() as db:
+            repaired = await reconcile_counters(db)
+        logger.info(f"计数器校准完成，修正 {repaired} 个工具")
+    except Exception as e:
+        logger.error(f"计数器校准任务执行失败: {e}", exc_info=True)
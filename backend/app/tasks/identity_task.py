@@ -0,0 +1,16 @@
+"""飞书身份缓存刷新任务"""
+import logging
+
+from ..database import async_session
+from ..services.identity_service import refresh_recipient_identities
+
+logger = logging.getLogger(__name__)
+
+
+async def refresh_identities_task():
+    """提前刷新启用中接收人的 open_id 缓存，推送时无需再请求通讯录接口"""
+    try:
+        async with async_session() as db:
+            await refresh_recipient_identities(db)
+    except Exception as e:
+        logger.error(f"飞书身份缓存刷新任务执行失败: {e}", exc_info=True)
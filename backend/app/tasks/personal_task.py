@@ -0,0 +1,16 @@
+"""个性化排序计算任务"""
+import logging
+
+from ..database import async_session
+from ..services.personal_service import build_personal
+
+logger = logging.getLogger(__name__)
+
+
+async def build_personal_task():
+    """为活跃用户重算个性化首页排序"""
+    try:
+        async with async_session() as db:
+            await build_personal(db)
+    except Exception as e:
+        logger.error(f"个性化排序计算任务执行失败: {e}", exc_info=True)
@@ -0,0 +1,16 @@
+"""相关工具计算任务"""
+import logging
+
+from ..database import async_session
+from ..services.related_service import build_related
+
+logger = logging.getLogger(__name__)
+
+
+async def build_related_task():
+    """按点击共现重算相关工具表"""
+    try:
+        async with async_session() as db:
+            await build_related(db)
+    except Exception as e:
+        logger.error(f"相关工具计算任务执行失败: {e}", exc_info=True)
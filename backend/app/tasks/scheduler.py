@@ -1,11 +1,20 @@
 """定时任务调度器"""
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from datetime import datetime
 import logging
 
+from ..config import get_settings
 from .report_task import daily_report_task
+from .counter_task import reconcile_counters_task
+from .related_task import build_related_task
+from .personal_task import build_personal_task
+from .search_log_task import purge_search_logs_task
+from .identity_task import refresh_identities_task
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 scheduler = AsyncIOScheduler()
 
@@ -21,6 +30,53 @@ def init_scheduler():
         replace_existing=True,
     )
 
+    # 定期校准计数器，启动时立即执行一次以补齐历史数据
+    scheduler.add_job(
+        reconcile_counters_task,
+        trigger=IntervalTrigger(minutes=settings.counter_reconcile_minutes),
+        id="reconcile_counters",
+        name="工具计数器校准",
+        next_run_time=datetime.now(),
+        replace_existing=True,
+    )
+
+    # 每天凌晨3点重算相关工具
+    scheduler.add_job(
+        build_related_task,
+        trigger=CronTrigger(hour=3, minute=0),
+        id="build_related",
+        name="相关工具计算",
+        replace_existing=True,
+    )
+
+    # 凌晨3点半重算个性化排序（依赖当天的相关工具结果）
+    scheduler.add_job(
+        build_personal_task,
+        trigger=CronTrigger(hour=3, minute=30),
+        id="build_personal",
+        name="个性化排序计算",
+        replace_existing=True,
+    )
+
+    # 每天凌晨4点清理过期搜索日志
+    scheduler.add_job(
+        purge_search_logs_task,
+        trigger=CronTrigger(hour=4, minute=0),
+        id="purge_search_logs",
+        name="搜索日志清理",
+        replace_existing=True,
+    )
+
+    # 每小时预刷新报表接收人的 open_id 缓存（即将过期的提前刷新），启动时执行一次
+    scheduler.add_job(
+        refresh_identities_task,
+        trigger=IntervalTrigger(hours=1),
+        id="refresh_identities",
+        name="飞书身份缓存刷新",
+        next_run_time=datetime.now(),
+        replace_existing=True,
+    )
+
     scheduler.start()
     logger.info("定时任务调度器已启动")
 
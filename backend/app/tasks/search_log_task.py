@@ -0,0 +1,16 @@
+"""搜索日志清理任务"""
+import logging
+
+from ..database import async_session
+from ..services.search_history_service import purge_search_logs
+
+logger = logging.getLogger(__name__)
+
+
+async def purge_search_logs_task():
+    """删除超过保留期的原始搜索日志"""
+    try:
+        async with async_session() as db:
+            await purge_search_logs(db)
+    except Exception as e:
+        logger.error(f"搜索日志清理任务执行失败: {e}", exc_info=True)
@@ -74,6 +74,121 @@ MIGRATIONS = [
     "ALTER TABLE report_push_settings ADD COLUMN report_types VARCHAR(100) DEFAULT 'overview,tools'",
     "ALTER TABLE report_push_settings ADD COLUMN days INTEGER DEFAULT 7",
 
+    # 搜索：FTS5 全文索引影子表（SEARCH_ENGINE=database 时使用，首次查询自动全量同步）
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS tool_search_fts USING fts5(
+        name, tags, category, description, tokenize = 'trigram'
+    )
+    """,
+
+    # 工具列表游标分页索引
+    "CREATE INDEX IF NOT EXISTS idx_tools_sort_id ON tools(sort_order, id)",
+    "CREATE INDEX IF NOT EXISTS idx_tools_created_id ON tools(created_at DESC, id)",
+    "CREATE INDEX IF NOT EXISTS idx_tools_name_id ON tools(name, id)",
+
+    # 工具计数器表（后端启动后由校准任务补齐历史数据）
+    """
+    CREATE TABLE IF NOT EXISTS tool_counters (
+        tool_id INTEGER PRIMARY KEY REFERENCES tools(id) ON DELETE CASCADE,
+        like_count INTEGER NOT NULL DEFAULT 0,
+        favorite_count INTEGER NOT NULL DEFAULT 0,
+        click_total INTEGER NOT NULL DEFAULT 0,
+        click_7d INTEGER NOT NULL DEFAULT 0,
+        reconciled_at TIMESTAMP
+    )
+    """,
+
+    # 相关工具表（后端每日定时重算）
+    """
+    CREATE TABLE IF NOT EXISTS tool_related (
+        tool_id INTEGER NOT NULL REFERENCES tools(id) ON DELETE CASCADE,
+        related_tool_id INTEGER NOT NULL REFERENCES tools(id) ON DELETE CASCADE,
+        rank INTEGER NOT NULL,
+        score FLOAT NOT NULL,
+        co_users INTEGER NOT NULL,
+        computed_at TIMESTAMP,
+        PRIMARY KEY (tool_id, related_tool_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_tool_related_rank ON tool_related(tool_id, rank)",
+
+    # 用户个性化排序表（后端每日定时重算）
+    """
+    CREATE TABLE IF NOT EXISTS user_rankings (
+        user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+        tool_ids TEXT NOT NULL,
+        computed_at TIMESTAMP NOT NULL
+    )
+    """,
+
+    # 用户表新增 role 字段（工具可见范围）
+    "ALTER TABLE users ADD COLUMN role VARCHAR(100)",
+
+    # 搜索日志表（原始搜索事件；search_history 改为每个用户每个关键词一行）
+    """
+    CREATE TABLE IF NOT EXISTS search_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER REFERENCES users(id) ON DELETE SET NULL,
+        keyword VARCHAR(100) NOT NULL,
+        searched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_search_logs_time ON search_logs(searched_at)",
+    # 已有搜索历史明细转入搜索日志（仅首次迁移时）
+    """
+    INSERT INTO search_logs (user_id, keyword, searched_at)
+    SELECT user_id, keyword, searched_at FROM search_history
+    WHERE NOT EXISTS (SELECT 1 FROM search_logs)
+    """,
+    # 搜索历史去重：每个用户每个关键词保留最新一条
+    "DELETE FROM search_history WHERE id NOT IN (SELECT MAX(id) FROM search_history GROUP BY user_id, keyword)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_search_history_user_keyword ON search_history(user_id, keyword)",
+    "CREATE INDEX IF NOT EXISTS idx_search_history_user_time ON search_history(user_id, searched_at)",
+
+    # 报表推送历史新增进度字段（成功/失败人数，推送中逐步更新）
+    "ALTER TABLE report_push_history ADD COLUMN success_count INTEGER DEFAULT 0",
+    "ALTER TABLE report_push_history ADD COLUMN failed_count INTEGER DEFAULT 0",
+
+    # 飞书身份缓存表（报表接收人邮箱 -> open_id）
+    """
+    CREATE TABLE IF NOT EXISTS feishu_identity_cache (
+        email VARCHAR(100) PRIMARY KEY,
+        open_id VARCHAR(100),
+        resolved_at TIMESTAMP NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_feishu_identity_resolved ON feishu_identity_cache(resolved_at)",
+
+    # 报表推送送达记录（推送任务重新执行时跳过已送达的接收人）
+    """
+    CREATE TABLE IF NOT EXISTS report_push_deliveries (
+        history_id INTEGER NOT NULL REFERENCES report_push_history(id) ON DELETE CASCADE,
+        recipient VARCHAR(100) NOT NULL,
+        delivered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (history_id, recipient)
+    )
+    """,
+
+    # 持久化后台任务表（报表推送）
+    """
+    CREATE TABLE IF NOT EXISTS background_jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind VARCHAR(50) NOT NULL,
+        payload JSON NOT NULL,
+        status VARCHAR(20) NOT NULL DEFAULT 'queued',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL DEFAULT 3,
+        run_after TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        lease_owner VARCHAR(100),
+        lease_until TIMESTAMP,
+        error TEXT,
+        created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        started_at TIMESTAMP,
+        finished_at TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_background_jobs_claim ON background_jobs(status, run_after)",
+
     # 初始化管理员账号 (admin / krmbe4bb)
     """
     INSERT OR IGNORE INTO admin_users (username, password_hash, nickname, is_active)
@@ -100,8 +215,18 @@ async def migrate():
     print("  - user_likes (用户点赞)")
     print("  - tool_feedback (工具反馈)")
     print("  - admin_users (管理员用户)")
+    print("  - tool_search_fts (搜索全文索引)")
+    print("  - tool_counters (工具计数器)")
+    print("  - tool_related (相关工具)")
+    print("  - user_rankings (个性化排序)")
+    print("  - search_logs (搜索日志)")
+    print("  - feishu_identity_cache (飞书身份缓存)")
+    print("  - report_push_deliveries (推送送达记录)")
+    print("  - background_jobs (后台任务)")
     print("新增字段:")
     print("  - tools.provider (提供者)")
+    print("  - users.role (角色)")
+    print("  - report_push_history.success_count / failed_count (推送进度)")
     print("初始管理员:")
     print("  - 用户名: admin")
     print("  - 密码: krmbe4bb")
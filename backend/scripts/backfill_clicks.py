@@ -0,0 +1,63 @@
+"""历史点击回填脚本
+
+从旧系统导出的 CSV / NDJSON（可 gzip 压缩）流式导入 click_logs，完成后重算受影响的统计。
+字段说明见 app/services/click_backfill.py。
+
+用法:
+    python scripts/backfill_clicks.py clicks_2019_2024.csv.gz
+    python scripts/backfill_clicks.py clicks.ndjson --create-users
+    python scripts/backfill_clicks.py clicks.csv --dry-run
+"""
+import argparse
+import asyncio
+import sys
+import os
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import async_session
+from app.services.click_backfill import BATCH_SIZE, backfill_clicks, detect_format
+
+
+async def run(args) -> bool:
+    fmt = args.format or detect_format(args.file)
+    with open(args.file, "rb") as f:
+        async with async_session() as db:
+            result = await backfill_clicks(
+                db, f, fmt,
+                create_users=args.create_users, dry_run=args.dry_run, batch_size=args.batch_size,
+            )
+    stats = result.to_dict()
+
+    print(f"{'🔍 校验完成（未写入）' if args.dry_run else '✅ 回填完成'}: {args.file} ({fmt})")
+    print(f"   读取: {stats['read']} 行, 写入: {stats['inserted']} 行, 时间无效: {stats['invalid']} 行")
+    print(f"   时间范围: {stats['first_click']} ~ {stats['last_click']}, 涉及工具: {stats['tools']} 个")
+    print(f"   未匹配工具: {stats['unknown_tools']} 行, 未匹配用户（记为匿名）: {stats['unknown_users']} 行, 新建用户: {stats['created_users']}")
+    if stats["unknown_tool_names"]:
+        print(f"   未匹配工具名称: {', '.join(stats['unknown_tool_names'])}")
+    if stats["rebuilt"]:
+        print(f"   已重算: {', '.join(stats['rebuilt'])}")
+    print(f"   导入耗时: {stats['seconds']} 秒, {stats['rows_per_second']} 行/秒, 统计重算: {stats['rebuild_seconds']} 秒")
+    for error in stats["errors"]:
+        print(f"❌ {error}")
+    return not stats["errors"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回填历史点击日志")
+    parser.add_argument("file", help="CSV / NDJSON 文件路径（.gz 自动解压）")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="文件格式，默认按扩展名判断")
+    parser.add_argument("--create-users", action="store_true", help="为未知 open_id 新建用户（否则记为匿名点击）")
+    parser.add_argument("--dry-run", action="store_true", help="只校验映射，不写入")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="每批写入行数")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.file):
+        print(f"❌ 文件不存在: {args.file}")
+        sys.exit(1)
+    sys.exit(0 if asyncio.run(run(args)) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""自动补全延迟基准
+
+1. 前缀树：用合成词表构建，随机前缀查询，统计 p50/p95/p99
+2. 接口：在临时 SQLite 合成数据集上经 ASGI 调用 GET /api/tools/suggest（含路由与序列化开销），
+   与 GET /api/tools/search 对比
+
+用法:
+    python scripts/bench_suggest.py
+    python scripts/bench_suggest.py --entries 50000 --queries 20000
+    python scripts/bench_suggest.py --skip-endpoint
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+SYLLABLES = [
+    "ai", "chat", "gpt", "code", "pilot", "mid", "journey", "stable", "diffusion", "note",
+    "doc", "meet", "trans", "late", "write", "draw", "video", "gen", "data", "search",
+]
+CJK_WORDS = ["写作", "绘画", "代码", "翻译", "会议", "文档", "视频", "搜索", "数据", "助手", "智能", "办公"]
+
+
+def percentile(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def report(title: str, samples: list[float]):
+    """samples 单位为秒，按微秒输出"""
+    us = [s * 1_000_000 for s in samples]
+    print(f"{title}: n={len(us)} p50={percentile(us, 0.5):.1f}us "
+          f"p95={percentile(us, 0.95):.1f}us p99={percentile(us, 0.99):.1f}us max={max(us):.1f}us")
+
+
+def synthetic_suggestions(count: int, rng: random.Random):
+    from app.services.suggest_service import Suggestion
+
+    suggestions = []
+    for i in range(count):
+        if rng.random() < 0.6:
+            text = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3))).capitalize()
+            if rng.random() < 0.3:
+                text += " " + rng.choice(SYLLABLES).capitalize()
+        else:
+            text = "".join(rng.choice(CJK_WORDS) for _ in range(rng.randint(1, 3)))
+        kind = rng.choice(["tool", "tool", "tool", "tag", "category", "keyword"])
+        suggestions.append(Suggestion(
+            text=f"{text}{i}" if kind == "tool" else text,
+            type=kind,
+            weight=float(int(rng.paretovariate(1.2))),
+            tool_id=i if kind == "tool" else None,
+        ))
+    return suggestions
+
+
+def bench_trie(entries: int, queries: int, seed: int):
+    from app.services.suggest_service import build_trie
+
+    rng = random.Random(seed)
+    suggestions = synthetic_suggestions(entries, rng)
+
+    start = time.perf_counter()
+    trie = build_trie(suggestions)
+    print(f"前缀树构建: {len(trie)} 个词条, {trie.node_count} 个节点, "
+          f"耗时 {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    prefixes = []
+    for _ in range(queries):
+        text = rng.choice(suggestions).text.lower()
+        prefixes.append(text[:rng.randint(1, min(len(text), 6))])
+
+    samples = []
+    for prefix in prefixes:
+        t0 = time.perf_counter()
+        trie.complete(prefix, 10)
+        samples.append(time.perf_counter() - t0)
+    report("前缀树查询", samples)
+
+
+async def bench_endpoint(requests: int, clicks: int, seed: int):
+    import httpx
+    from app import models  # noqa: F401  注册模型以便建表
+    from app.database import async_session, init_db
+    from app.main import app
+    from query_plans import seed_dataset
+
+    await init_db()
+    async with async_session() as db:
+        await seed_dataset(db, clicks=clicks, seed=seed)
+
+    rng = random.Random(seed)
+    prefixes = [rng.choice(["a", "ai", "ch", "co", "to", "tool 1", "写", "写作", "代", "翻译"]) for _ in range(requests)]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # 预热：触发前缀树与搜索索引构建
+        await client.get("/api/tools/suggest", params={"prefix": "a"})
+        await client.get("/api/tools/search", params={"q": "a"})
+
+        for path, param in (("/api/tools/suggest", "prefix"), ("/api/tools/search", "q")):
+            samples = []
+            for prefix in prefixes:
+                t0 = time.perf_counter()
+                response = await client.get(path, params={param: prefix, "limit": 10})
+                samples.append(time.perf_counter() - t0)
+                response.raise_for_status()
+            report(f"GET {path}", samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="自动补全延迟基准")
+    parser.add_argument("--entries", type=int, default=10_000, help="前缀树合成词条数")
+    parser.add_argument("--queries", type=int, default=10_000, help="前缀树查询次数")
+    parser.add_argument("--requests", type=int, default=500, help="接口请求次数")
+    parser.add_argument("--clicks", type=int, default=20_000, help="接口基准的合成点击日志条数")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-endpoint", action="store_true", help="只测前缀树")
+    args = parser.parse_args()
+
+    # 接口基准使用独立的临时库，必须在导入 app 之前设置
+    db_path = Path(tempfile.gettempdir()) / "ai_nav_bench_suggest.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["DEBUG"] = "false"
+
+    bench_trie(args.entries, args.queries, args.seed)
+    if not args.skip_endpoint:
+        asyncio.run(bench_endpoint(args.requests, args.clicks, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+"""测试环境：临时 SQLite 数据库（须在导入 app 之前设置）"""
+import os
+import tempfile
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+os.environ.setdefault("FEISHU_APP_SECRET", "test-secret")
+os.environ["DEBUG"] = "false"
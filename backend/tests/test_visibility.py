@@ -0,0 +1,66 @@
+"""工具可见范围：登录写入部门/职务后，受限工具只对允许的部门可见"""
+import asyncio
+
+import httpx
+
+from app.database import engine, async_session, init_db
+from app.main import app
+from app.models import Tool
+from app.services.feishu_service import feishu_service
+from app.services.visibility import visibility_index
+
+
+def _fake_feishu(monkeypatch, orgs: dict):
+    async def get_user_access_token(code):
+        return {"access_token": code}
+
+    async def get_user_info(token):
+        return {"open_id": token, "name": token}
+
+    async def get_user_org(open_id):
+        return orgs[open_id]
+
+    monkeypatch.setattr(feishu_service, "get_user_access_token", get_user_access_token)
+    monkeypatch.setattr(feishu_service, "get_user_info", get_user_info)
+    monkeypatch.setattr(feishu_service, "get_user_org", get_user_org)
+
+
+async def _visible_names(client: httpx.AsyncClient, open_id: str) -> set[str]:
+    login = await client.post("/api/auth/login", json={"code": open_id})
+    assert login.status_code == 200, login.text
+    token = login.json()["token"]
+    response = await client.get("/api/tools", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, response.text
+    # 可见范围只在管理后台返回，公开接口不暴露
+    assert all("visible_departments" not in tool and "visible_roles" not in tool for tool in response.json())
+    return {tool["name"] for tool in response.json()}
+
+
+def test_restricted_tool_visible_to_allowed_department(monkeypatch):
+    orgs = {
+        "ou_dev": {"department": "研发部", "role": "工程师"},
+        "ou_sales": {"department": "销售部", "role": "销售"},
+    }
+    _fake_feishu(monkeypatch, orgs)
+
+    async def run():
+        await init_db()
+        async with async_session() as db:
+            db.add_all([
+                Tool(name="公开工具", target_url="https://a.example.com"),
+                Tool(name="研发工具", target_url="https://b.example.com", visible_departments=["研发部"]),
+                Tool(name="工程师工具", target_url="https://c.example.com", visible_roles=["工程师"]),
+            ])
+            await db.commit()
+        visibility_index.invalidate()
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            assert await _visible_names(client, "ou_dev") == {"公开工具", "研发工具", "工程师工具"}
+            assert await _visible_names(client, "ou_sales") == {"公开工具"}
+
+            # 再次登录时刷新部门
+            orgs["ou_sales"] = {"department": "研发部", "role": "销售"}
+            assert await _visible_names(client, "ou_sales") == {"公开工具", "研发工具"}
+        await engine.dispose()
+
+    asyncio.run(run())
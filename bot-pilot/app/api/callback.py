@@ -14,6 +14,7 @@ from loguru import logger
 
 from app.config import settings
 from app.core.event_handler import EventHandler
+from app.utils.executor import run_in_thread
 
 router = APIRouter()
 
@@ -86,7 +87,7 @@ async def feishu_callback(
             logger.error("❌ 收到加密数据但未配置 FEISHU_ENCRYPT_KEY")
             return {"code": 400, "msg": "encrypt key not configured"}
         try:
-            decrypted = decrypt_data(settings.feishu_encrypt_key, data["encrypt"])
+            decrypted = await run_in_thread(decrypt_data, settings.feishu_encrypt_key, data["encrypt"])
             data = json.loads(decrypted)
             logger.info(f"🔓 解密后数据: {json.dumps(data, ensure_ascii=False)[:500]}")
         except Exception as e:
@@ -2,13 +2,15 @@
 
 from fastapi import APIRouter
 
+from app.utils.executor import executor_stats
+
 router = APIRouter()
 
 
 @router.get("/health")
 async def health_check():
     """健康检查"""
-    return {"status": "healthy", "service": "bot-pilot"}
+    return {"status": "healthy", "service": "bot-pilot", "executor": executor_stats()}
 
 
 @router.get("/")
@@ -44,6 +44,16 @@ class Settings(BaseSettings):
     max_context_messages: int = 10  # 上下文记忆消息数
     thinking_message: str = "🤔 思考中..."  # 思考中提示
 
+    # 搜索配置
+    search_engine: str = "memory"  # memory: 进程内倒排索引; database: 查询后端维护的全文索引影子表
+    search_index_ttl: int = 60  # 搜索索引指纹检查间隔（秒）
+    scenario_popularity_weight: float = 0.2  # 场景推荐中点击热度先验的混合权重（0~1）
+
+    # CPU 密集任务执行器（回调解密、大结果序列化）
+    executor_threads: int = 4  # 线程池大小
+    executor_queue_size: int = 32  # 在途任务超出 worker 数的排队上限，超出时调用方等待
+    executor_timeout: int = 30  # 默认超时秒数
+
     @property
     def is_sqlite(self) -> bool:
         """判断是否使用 SQLite"""
@@ -14,6 +14,7 @@ from app.config import settings
 from app.llm.mcp_tools import get_tools
 from app.llm.prompt_manager import get_system_prompt
 from app.llm.tool_executor import ToolExecutor
+from app.utils.executor import run_in_thread
 
 
 class ChatService:
@@ -65,7 +66,7 @@ class ChatService:
 
         try:
             # 调用 OpenAI API
-            response = await self._call_openai(messages)
+            response = await self._call_openai(messages, user_id)
 
             # 保存助手回复
             history.append({"role": "assistant", "content": response})
@@ -78,9 +79,9 @@ class ChatService:
             logger.error(f"堆栈: {traceback.format_exc()}")
             raise
 
-    async def _call_openai(self, messages: list[dict]) -> str:
+    async def _call_openai(self, messages: list[dict], user_id: str = "") -> str:
         """
-        调用 OpenAI API，支持 Function Calling
+        调用 OpenAI API，支持 Function Calling（user_id 透传给工具调用做可见范围过滤）
         """
         logger.info(f"📤 调用 OpenAI, base_url={settings.openai_base_url}, model={settings.openai_model}, 消息数={len(messages)}")
 
@@ -131,7 +132,7 @@ class ChatService:
                 logger.info(f"🔧 工具: {tc.function.name}, 参数: {tc.function.arguments}")
 
             # 执行工具调用
-            tool_results = await self._execute_tools(assistant_message.tool_calls)
+            tool_results = await self._execute_tools(assistant_message.tool_calls, user_id)
 
             # 构建带工具结果的消息
             messages.append(assistant_message.model_dump())
@@ -160,9 +161,9 @@ class ChatService:
         # 无工具调用，直接返回
         return assistant_message.content or ""
 
-    async def _execute_tools(self, tool_calls: list) -> list[dict]:
+    async def _execute_tools(self, tool_calls: list, user_id: str = "") -> list[dict]:
         """
-        执行工具调用并返回结果
+        执行工具调用并返回结果（user_id 用于工具可见范围过滤）
         """
         results = []
 
@@ -173,8 +174,9 @@ class ChatService:
             logger.info(f"🔧 执行工具: {function_name}, 参数: {function_args}")
 
             try:
-                result = await self.tool_executor.execute(function_name, function_args)
-                result_str = json.dumps(result, ensure_ascii=False, default=str)
+                result = await self.tool_executor.execute(function_name, function_args, user_id)
+                # 工具结果可能很大（排行、列表），序列化放到线程池
+                result_str = await run_in_thread(json.dumps, result, ensure_ascii=False, default=str)
             except Exception as e:
                 logger.error(f"❌ 工具执行失败: {e}")
                 result_str = json.dumps({"error": str(e)}, ensure_ascii=False)
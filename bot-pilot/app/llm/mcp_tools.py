@@ -332,6 +332,28 @@ MCP_TOOLS = [
             },
         },
     },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_related_tools",
+            "description": "获取与某个工具相关的工具（用过该工具的人也常用的工具，基于点击共现）",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "tool_name": {
+                        "type": "string",
+                        "description": "工具名称（模糊匹配）",
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "返回数量，默认5",
+                        "default": 5,
+                    },
+                },
+                "required": ["tool_name"],
+            },
+        },
+    },
 ]
 
 
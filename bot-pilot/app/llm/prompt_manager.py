@@ -69,6 +69,7 @@ SYSTEM_PROMPT = """## 角色定义
 - 工具详情：调用 get_tool_detail
 - 热门新工具：调用 get_hot_tools（最近新上架且热门的）
 - 场景推荐：调用 recommend_by_scenario（根据使用场景推荐）
+- 相关工具：调用 get_related_tools（用过某工具的人也在用）
 
 ### 需求洞察
 - 分类统计：调用 get_category_stats
@@ -3,7 +3,6 @@ MCP 工具执行器
 将工具调用桥接到实际的服务
 """
 
-import json
 import traceback
 from typing import Any
 
@@ -15,6 +14,9 @@ from app.services.stats_bridge import StatsBridge
 class ToolExecutor:
     """工具执行器"""
 
+    # 结果受工具可见范围限制的工具，执行时注入提问人的 open_id
+    USER_SCOPED = {"get_tool_detail", "search_tools", "recommend_by_scenario", "get_related_tools"}
+
     def __init__(self):
         self.stats = StatsBridge()
         # 工具映射
@@ -37,15 +39,19 @@ class ToolExecutor:
             "get_want_list": self._get_want_list,
             "get_search_keywords": self._get_search_keywords,
             "recommend_by_scenario": self._recommend_by_scenario,
+            "get_related_tools": self._get_related_tools,
         }
 
-    async def execute(self, function_name: str, arguments: dict[str, Any]) -> Any:
+    async def execute(
+        self, function_name: str, arguments: dict[str, Any], open_id: str = ""
+    ) -> Any:
         """
         执行工具
 
         Args:
             function_name: 工具名称
             arguments: 工具参数
+            open_id: 提问人 open_id（不接受模型传入）
 
         Returns:
             工具执行结果
@@ -55,15 +61,13 @@ class ToolExecutor:
             logger.warning(f"⚠️ 未知工具: {function_name}")
             return {"error": f"Unknown tool: {function_name}"}
 
+        arguments = {k: v for k, v in arguments.items() if k != "open_id"}
+        if function_name in self.USER_SCOPED:
+            arguments["open_id"] = open_id
+
         try:
             result = await handler(**arguments)
-            # 打印返回结果（截断过长内容）
-            result_str = json.dumps(result, ensure_ascii=False, default=str)
-            if len(result_str) > 500:
-                result_preview = result_str[:500] + f"... (共{len(result_str)}字符)"
-            else:
-                result_preview = result_str
-            logger.info(f"✅ 工具执行成功: {function_name}, 返回: {result_preview}")
+            logger.info(f"✅ 工具执行成功: {function_name}, 返回: {str(result)[:500]}")
             return result
         except Exception as e:
             logger.error(f"❌ 工具执行失败 {function_name}: {e}")
@@ -86,17 +90,17 @@ class ToolExecutor:
         """获取访问趋势"""
         return await self.stats.get_trend(days=days)
 
-    async def _get_tool_detail(self, tool_name: str) -> dict:
+    async def _get_tool_detail(self, tool_name: str, open_id: str = "") -> dict:
         """获取工具详情"""
-        return await self.stats.get_tool_detail(tool_name=tool_name)
+        return await self.stats.get_tool_detail(tool_name=tool_name, open_id=open_id)
 
     async def _get_feedback_summary(self, days: int = 30, limit: int = 20) -> dict:
         """获取反馈汇总"""
         return await self.stats.get_feedback_summary(days=days, limit=limit)
 
-    async def _search_tools(self, keyword: str, category: str = None) -> dict:
+    async def _search_tools(self, keyword: str, category: str = None, open_id: str = "") -> dict:
         """搜索工具"""
-        return await self.stats.search_tools(keyword=keyword, category=category)
+        return await self.stats.search_tools(keyword=keyword, category=category, open_id=open_id)
 
     async def _get_category_stats(self, days: int = 7) -> dict:
         """获取分类统计"""
@@ -132,6 +136,10 @@ class ToolExecutor:
         """获取搜索热词"""
         return await self.stats.get_search_keywords(days=days, limit=limit)
 
-    async def _recommend_by_scenario(self, scenario: str, limit: int = 5) -> dict:
+    async def _recommend_by_scenario(self, scenario: str, limit: int = 5, open_id: str = "") -> dict:
         """根据场景推荐工具"""
-        return await self.stats.recommend_by_scenario(scenario=scenario, limit=limit)
+        return await self.stats.recommend_by_scenario(scenario=scenario, limit=limit, open_id=open_id)
+
+    async def _get_related_tools(self, tool_name: str, limit: int = 5, open_id: str = "") -> dict:
+        """获取相关工具（用过该工具的人也在用）"""
+        return await self.stats.get_related_tools(tool_name=tool_name, limit=limit, open_id=open_id)
@@ -10,6 +10,7 @@ from loguru import logger
 from app.api import callback, health
 from app.config import settings
 from app.services.database import init_db
+from app.utils.executor import shutdown_executor
 
 
 @asynccontextmanager
@@ -28,6 +29,7 @@ async def lifespan(app: FastAPI):
 
     # 关闭时
     logger.info("👋 Bot-Pilot 关闭中...")
+    shutdown_executor()
 
 
 app = FastAPI(
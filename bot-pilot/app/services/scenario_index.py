@@ -0,0 +1,171 @@
+"""
+场景推荐索引
+工具文本（名称/标签/分类/描述，按字段加权）构建 TF-IDF 稀疏向量并做 L2 归一化，
+场景描述同样向量化后按倒排表累加得到余弦相似度，再与近7天点击热度先验线性混合：
+
+    score = (1 - w) * cosine + w * log(1 + click_7d) / log(1 + max_click_7d)
+
+向量在目录指纹变化时重建（与搜索索引共用指纹），热度先验每个 TTL 周期从 tool_counters 刷新
+"""
+
+import asyncio
+import math
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.services.search_index import (
+    FIELD_WEIGHTS,
+    catalog_fingerprint,
+    load_tool_fields,
+    tokenize_query,
+)
+
+
+@dataclass
+class ScenarioMatch:
+    """场景推荐结果"""
+    id: int
+    name: str
+    description: str
+    icon_url: Optional[str]
+    category: str
+    similarity: float
+    popularity: float
+    click_7d: int
+    score: float
+
+
+class ScenarioIndex:
+    """TF-IDF 场景索引（进程内单例）"""
+
+    def __init__(self):
+        self._docs: dict[int, Any] = {}
+        self._idf: dict[str, float] = {}
+        self._postings: dict[str, list[tuple[int, float]]] = {}
+        self._clicks: dict[int, int] = {}
+        self._max_log_clicks = 0.0
+        self._fingerprint: Optional[tuple] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def ensure_fresh(self, session: AsyncSession):
+        """TTL 到期后刷新热度先验，目录指纹变化时重建向量"""
+        if self._fingerprint is not None and time.time() - self._checked_at < settings.search_index_ttl:
+            return
+
+        async with self._lock:
+            if self._fingerprint is not None and time.time() - self._checked_at < settings.search_index_ttl:
+                return
+            fingerprint = await catalog_fingerprint(session)
+            if fingerprint != self._fingerprint:
+                await self._rebuild(session)
+                self._fingerprint = fingerprint
+            await self._load_popularity(session)
+            self._checked_at = time.time()
+
+    async def _rebuild(self, session: AsyncSession):
+        start = time.perf_counter()
+        documents = await load_tool_fields(session)
+
+        # 字段加权词频
+        weighted_tf: dict[int, dict[str, float]] = {}
+        df: Counter = Counter()
+        for doc, fields in documents:
+            tf: dict[str, float] = defaultdict(float)
+            for field_name, tokens in fields.items():
+                for token in tokens:
+                    tf[token] += FIELD_WEIGHTS[field_name]
+            weighted_tf[doc.id] = tf
+            df.update(tf.keys())
+
+        n_docs = len(documents)
+        idf = {term: math.log((n_docs + 1) / (count + 1)) + 1.0 for term, count in df.items()}
+
+        # 次线性词频 * IDF，L2 归一化后写入倒排表
+        postings: dict[str, list[tuple[int, float]]] = defaultdict(list)
+        for tool_id, tf in weighted_tf.items():
+            vector = {term: (1.0 + math.log(value)) * idf[term] for term, value in tf.items() if value > 0}
+            norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+            for term, weight in vector.items():
+                postings[term].append((tool_id, weight / norm))
+
+        self._docs = {doc.id: doc for doc, _ in documents}
+        self._idf = idf
+        self._postings = dict(postings)
+        logger.info(
+            f"🧭 场景索引重建完成: {n_docs} 个工具, {len(idf)} 个词, "
+            f"耗时 {(time.perf_counter() - start) * 1000:.1f}ms"
+        )
+
+    async def _load_popularity(self, session: AsyncSession):
+        """近7天点击量（后端维护的计数器表，表不存在时热度先验为 0）"""
+        try:
+            result = await session.execute(text("SELECT tool_id, click_7d FROM tool_counters"))
+            self._clicks = {row[0]: row[1] or 0 for row in result.fetchall()}
+        except Exception as e:
+            await session.rollback()
+            logger.warning(f"读取点击计数失败，热度先验置零: {e}")
+            self._clicks = {}
+        self._max_log_clicks = math.log1p(max(self._clicks.values(), default=0))
+
+    def _query_vector(self, scenario: str) -> dict[str, float]:
+        counts = Counter(t for t in tokenize_query(scenario or "") if t in self._idf)
+        vector = {term: (1.0 + math.log(count)) * self._idf[term] for term, count in counts.items()}
+        norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+        return {term: weight / norm for term, weight in vector.items()}
+
+    def recommend(
+        self,
+        scenario: str,
+        limit: Optional[int] = 5,
+        exclude: frozenset[int] = frozenset(),
+        popularity_weight: Optional[float] = None,
+    ) -> list[ScenarioMatch]:
+        """按 相似度 + 热度先验 排序，只返回与场景有词重叠的工具"""
+        if popularity_weight is None:
+            popularity_weight = settings.scenario_popularity_weight
+
+        similarities: dict[int, float] = defaultdict(float)
+        for term, q_weight in self._query_vector(scenario).items():
+            for tool_id, d_weight in self._postings[term]:
+                similarities[tool_id] += q_weight * d_weight
+
+        matches = []
+        for tool_id, similarity in similarities.items():
+            if tool_id in exclude:
+                continue
+            clicks = self._clicks.get(tool_id, 0)
+            popularity = math.log1p(clicks) / self._max_log_clicks if self._max_log_clicks else 0.0
+            doc = self._docs[tool_id]
+            matches.append(ScenarioMatch(
+                id=tool_id,
+                name=doc.name,
+                description=doc.description,
+                icon_url=doc.icon_url,
+                category=doc.category,
+                similarity=similarity,
+                popularity=popularity,
+                click_7d=clicks,
+                score=(1 - popularity_weight) * similarity + popularity_weight * popularity,
+            ))
+
+        matches.sort(key=lambda m: (-m.score, m.id))
+        return matches if limit is None else matches[:limit]
+
+
+scenario_index = ScenarioIndex()
+
+
+async def recommend(
+    session: AsyncSession, scenario: str, limit: Optional[int] = 5, exclude: frozenset[int] = frozenset()
+) -> list[ScenarioMatch]:
+    """场景推荐（保证索引为最新后查询）"""
+    await scenario_index.ensure_fresh(session)
+    return scenario_index.recommend(scenario, limit=limit, exclude=exclude)
@@ -0,0 +1,354 @@
+"""
+工具搜索索引
+与后端 app/services/search_service.py 相同的分词与 BM25 打分（两个服务独立部署，无法直接复用），
+机器人侧收不到后台写入通知，按 TTL + 工具表指纹（数量、最大更新时间）判断是否需要重建
+
+SEARCH_ENGINE=database 时直接查询后端维护的全文索引影子表
+（PostgreSQL tool_search_docs / SQLite tool_search_fts），影子表不可用时回退到内存索引
+"""
+
+import asyncio
+import bisect
+import math
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+
+_CJK_RANGES = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+_TOKEN_RE = re.compile(rf"[{_CJK_RANGES}]+|[a-z0-9]+")
+
+# 字段权重
+FIELD_WEIGHTS = {"name": 3.0, "tags": 2.0, "category": 2.0, "description": 1.0}
+
+# BM25 参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 前缀扩展最多匹配的词数
+PREFIX_EXPAND_LIMIT = 20
+
+
+def tokenize(value: Optional[str]) -> list[str]:
+    """文档分词：中文二元组 + 单字，英文单词"""
+    if not value:
+        return []
+    tokens = []
+    for match in _TOKEN_RE.finditer(value.lower()):
+        run = match.group()
+        if not run[0].isascii():
+            tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def tokenize_query(value: str) -> list[str]:
+    """查询分词：中文串长度>=2时只用二元组，单字串用单字"""
+    tokens = []
+    for match in _TOKEN_RE.finditer(value.lower()):
+        run = match.group()
+        if not run[0].isascii() and len(run) > 1:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+@dataclass
+class _Doc:
+    """索引中的工具文档"""
+    id: int
+    name: str
+    description: str
+    icon_url: Optional[str]
+    category: str
+    length: float = 0.0
+
+
+async def catalog_fingerprint(session: AsyncSession) -> tuple:
+    """工具/分类/标签的变更指纹"""
+    result = await session.execute(text("""
+        SELECT
+            (SELECT COUNT(*) FROM tools),
+            (SELECT MAX(updated_at) FROM tools),
+            (SELECT COUNT(*) FROM categories),
+            (SELECT COUNT(*) FROM tags),
+            (SELECT COUNT(*) FROM tool_tags)
+    """))
+    return tuple(str(v) for v in result.fetchone())
+
+
+async def load_tool_fields(session: AsyncSession) -> list[tuple[_Doc, dict[str, list[str]]]]:
+    """读取启用的工具并按字段分词（name / tags / category / description）"""
+    active_val = "1" if settings.is_sqlite else "true"
+
+    result = await session.execute(text(f"""
+        SELECT t.id, t.name, t.description, t.icon_url, c.name, p.name
+        FROM tools t
+        LEFT JOIN categories c ON t.category_id = c.id
+        LEFT JOIN categories p ON c.parent_id = p.id
+        WHERE t.is_active = {active_val}
+    """))
+    rows = result.fetchall()
+
+    tag_result = await session.execute(text("""
+        SELECT tt.tool_id, tg.name
+        FROM tool_tags tt
+        JOIN tags tg ON tg.id = tt.tag_id
+    """))
+    tags_by_tool: dict[int, list[str]] = defaultdict(list)
+    for tool_id, tag_name in tag_result.fetchall():
+        tags_by_tool[tool_id].append(tag_name)
+
+    documents = []
+    for row in rows:
+        doc = _Doc(
+            id=row[0],
+            name=row[1] or "",
+            description=row[2] or "",
+            icon_url=row[3],
+            category=" ".join(n for n in (row[5], row[4]) if n),
+        )
+        fields = {
+            "name": tokenize(doc.name),
+            "tags": [t for tag in tags_by_tool.get(doc.id, []) for t in tokenize(tag)],
+            "category": tokenize(doc.category),
+            "description": tokenize(doc.description),
+        }
+        documents.append((doc, fields))
+    return documents
+
+
+class ToolSearchIndex:
+    """工具倒排索引（进程内单例）"""
+
+    def __init__(self):
+        self._docs: dict[int, _Doc] = {}
+        self._postings: dict[str, dict[int, float]] = {}
+        self._avg_length = 1.0
+        self._sorted_terms: list[str] = []
+        self._fingerprint: Optional[tuple] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def ensure_fresh(self, session: AsyncSession):
+        """TTL 到期后检查指纹，有变化才重建"""
+        if self._fingerprint is not None and time.time() - self._checked_at < settings.search_index_ttl:
+            return
+
+        async with self._lock:
+            if self._fingerprint is not None and time.time() - self._checked_at < settings.search_index_ttl:
+                return
+            fingerprint = await catalog_fingerprint(session)
+            if fingerprint != self._fingerprint:
+                await self._rebuild(session)
+                self._fingerprint = fingerprint
+            self._checked_at = time.time()
+
+    async def _rebuild(self, session: AsyncSession):
+        start = time.perf_counter()
+        docs: dict[int, _Doc] = {}
+        postings: dict[str, dict[int, float]] = defaultdict(dict)
+        total_length = 0.0
+        for doc, fields in await load_tool_fields(session):
+            weighted: dict[str, float] = defaultdict(float)
+            for field_name, tokens in fields.items():
+                weight = FIELD_WEIGHTS[field_name]
+                doc.length += weight * len(tokens)
+                for token in tokens:
+                    weighted[token] += weight
+            for token, tf in weighted.items():
+                postings[token][doc.id] = tf
+            total_length += doc.length
+            docs[doc.id] = doc
+
+        self._docs = docs
+        self._postings = dict(postings)
+        self._avg_length = (total_length / len(docs)) if docs else 1.0
+        self._sorted_terms = sorted(self._postings)
+        logger.info(
+            f"搜索索引重建完成: {len(docs)} 个工具, {len(self._postings)} 个词, "
+            f"耗时 {(time.perf_counter() - start) * 1000:.1f}ms"
+        )
+
+    def _query_terms(self, query: str) -> list[tuple[str, float]]:
+        """查询词及其权重（最后一个英文词做前缀扩展并降权）"""
+        tokens = tokenize_query(query)
+        terms = [(t, 1.0) for t in dict.fromkeys(tokens)]
+        if tokens and tokens[-1].isascii() and len(tokens[-1]) >= 2:
+            prefix = tokens[-1]
+            i = bisect.bisect_left(self._sorted_terms, prefix)
+            expanded = 0
+            while i < len(self._sorted_terms) and expanded < PREFIX_EXPAND_LIMIT:
+                term = self._sorted_terms[i]
+                if not term.startswith(prefix):
+                    break
+                if term != prefix:
+                    terms.append((term, 0.5))
+                    expanded += 1
+                i += 1
+        return terms
+
+    def search(self, query: str) -> list[tuple[_Doc, float]]:
+        """BM25 检索，按得分降序返回全部命中"""
+        terms = self._query_terms(query or "")
+        if not terms or not self._docs:
+            return []
+
+        n_docs = len(self._docs)
+        scores: dict[int, float] = defaultdict(float)
+        for term, term_weight in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for tool_id, tf in postings.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._docs[tool_id].length / self._avg_length)
+                scores[tool_id] += term_weight * idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda x: (-x[1], x[0]))
+        return [(self._docs[tool_id], score) for tool_id, score in ranked]
+
+
+tool_search_index = ToolSearchIndex()
+
+
+async def _search_database(
+    session: AsyncSession, keyword: str, category: Optional[str], limit: Optional[int]
+) -> list[dict[str, Any]]:
+    """查询后端维护的全文索引影子表（与后端 search_fts 相同的 SQL）"""
+    terms = list(dict.fromkeys(t for t in re.split(r"\s+", keyword.lower()) if t))
+    if not terms:
+        return []
+
+    def like_pattern(value: str) -> str:
+        escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return f"%{escaped}%"
+
+    params: dict[str, Any] = {}
+    patterns = []
+    for i, term in enumerate(terms):
+        params[f"t{i}"] = like_pattern(term)
+        patterns.append(f":t{i}")
+
+    if settings.is_sqlite:
+        # 带 ESCAPE 的 LIKE 不交给 FTS5 处理（trigram 对少于3字符的模式无法匹配），由 SQLite 逐行判断
+        category_filter = "AND f.category LIKE :category ESCAPE '\\'" if category else ""
+        if all(len(t) >= 3 for t in terms):
+            params["match"] = " OR ".join('"{}"'.format(t.replace('"', '""')) for t in terms)
+            sql = f"""
+                SELECT f.rowid, f.name, f.description, t.icon_url, f.category,
+                    -bm25(tool_search_fts, 3.0, 2.0, 2.0, 1.0) AS score
+                FROM tool_search_fts f
+                JOIN tools t ON t.id = f.rowid
+                WHERE tool_search_fts MATCH :match {category_filter}
+                ORDER BY score DESC, f.rowid
+            """
+        else:
+            fields = [("f.name", 3.0), ("f.tags", 2.0), ("f.category", 2.0), ("f.description", 1.0)]
+            conditions = [f"{col} LIKE {p} ESCAPE '\\'" for p in patterns for col, _ in fields]
+            scores = [
+                f"CASE WHEN {col} LIKE {p} ESCAPE '\\' THEN {w} ELSE 0 END"
+                for p in patterns for col, w in fields
+            ]
+            sql = f"""
+                SELECT f.rowid, f.name, f.description, t.icon_url, f.category,
+                    ({" + ".join(scores)}) AS score
+                FROM tool_search_fts f
+                JOIN tools t ON t.id = f.rowid
+                WHERE ({" OR ".join(conditions)}) {category_filter}
+                ORDER BY score DESC, f.rowid
+            """
+    else:
+        params["q"] = " ".join(terms)
+        category_filter = "AND d.category ILIKE :category" if category else ""
+        conditions = ["d.tsv @@ plainto_tsquery('simple', :q)", ":q <% d.body"]
+        conditions += [f"d.body LIKE {p}" for p in patterns]
+        sql = f"""
+            SELECT d.tool_id, d.name, d.description, t.icon_url, d.category,
+                ts_rank(d.tsv, plainto_tsquery('simple', :q))
+                + 3.0 * word_similarity(:q, lower(d.name))
+                + 2.0 * word_similarity(:q, lower(d.tags))
+                + 2.0 * word_similarity(:q, lower(d.category))
+                + 1.0 * word_similarity(:q, lower(d.description)) AS score
+            FROM tool_search_docs d
+            JOIN tools t ON t.id = d.tool_id
+            WHERE ({" OR ".join(conditions)}) {category_filter}
+            ORDER BY score DESC, d.tool_id
+        """
+
+    if category:
+        params["category"] = like_pattern(category)
+    if limit is not None:
+        sql += " LIMIT :limit"
+        params["limit"] = limit
+
+    result = await session.execute(text(sql), params)
+    return [
+        {
+            "id": row[0],
+            "name": row[1],
+            "description": row[2],
+            "icon_url": row[3],
+            "category": row[4] or None,
+            "score": round(float(row[5] or 0), 4),
+        }
+        for row in result.fetchall()
+    ]
+
+
+async def _search_memory(
+    session: AsyncSession, keyword: str, category: Optional[str], limit: Optional[int],
+    exclude: frozenset[int] = frozenset(),
+) -> list[dict[str, Any]]:
+    await tool_search_index.ensure_fresh(session)
+
+    tools = []
+    category_kw = category.lower() if category else None
+    for doc, score in tool_search_index.search(keyword):
+        if doc.id in exclude:
+            continue
+        if category_kw and category_kw not in doc.category.lower():
+            continue
+        tools.append({
+            "id": doc.id,
+            "name": doc.name,
+            "description": doc.description,
+            "icon_url": doc.icon_url,
+            "category": doc.category or None,
+            "score": round(score, 4),
+        })
+        if limit is not None and len(tools) >= limit:
+            break
+    return tools
+
+
+async def search_tools(
+    session: AsyncSession, keyword: str, category: Optional[str] = None, limit: Optional[int] = 20,
+    exclude: frozenset[int] = frozenset(),
+) -> list[dict[str, Any]]:
+    """
+    搜索工具（按配置选择引擎），可按分类名称过滤（大小写不敏感子串匹配）
+
+    exclude 为提问人不可见的工具（见 visibility.hidden_tool_ids）
+    """
+    if settings.search_engine == "database":
+        try:
+            fetch = limit + len(exclude) if limit is not None and exclude else limit
+            tools = await _search_database(session, keyword, category, fetch)
+            tools = [tool for tool in tools if tool["id"] not in exclude]
+            return tools if limit is None else tools[:limit]
+        except Exception as e:
+            await session.rollback()
+            logger.warning(f"全文索引查询失败，回退内存索引: {e}")
+
+    return await _search_memory(session, keyword, category, limit, exclude)
@@ -10,7 +10,9 @@ from loguru import logger
 from sqlalchemy import func, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.services import scenario_index, search_index
 from app.services.database import async_session
+from app.services.visibility import hidden_tool_ids
 
 
 class StatsBridge:
@@ -184,26 +186,39 @@ class StatsBridge:
                 "data": data,
             }
 
-    async def get_tool_detail(self, tool_name: str) -> dict[str, Any]:
-        """
-        获取工具详情
-        """
-        async with async_session() as session:
-            # 模糊搜索工具（大小写不敏感）
-            from app.config import settings
+    async def _find_tool(
+        self, session: AsyncSession, tool_name: str, hidden: frozenset[int] = frozenset()
+    ):
+        """按名称模糊匹配一个启用且可见的工具（大小写不敏感）"""
+        from app.config import settings
 
-            like_op = "LIKE" if settings.is_sqlite else "ILIKE"
-            active_val = "1" if settings.is_sqlite else "true"
+        like_op = "LIKE" if settings.is_sqlite else "ILIKE"
+        active_val = "1" if settings.is_sqlite else "true"
 
-            query = text(f"""
-                SELECT id, name, description, icon_url, target_url, provider
-                FROM tools
-                WHERE name {like_op} :name AND is_active = {active_val}
-                LIMIT 1
-            """)
+        params: dict[str, Any] = {"name": f"%{tool_name}%"}
+        hidden_filter = ""
+        if hidden:
+            placeholders = ", ".join(f":h{i}" for i in range(len(hidden)))
+            hidden_filter = f"AND id NOT IN ({placeholders})"
+            params.update({f"h{i}": tool_id for i, tool_id in enumerate(hidden)})
+
+        query = text(f"""
+            SELECT id, name, description, icon_url, target_url, provider
+            FROM tools
+            WHERE name {like_op} :name AND is_active = {active_val} {hidden_filter}
+            LIMIT 1
+        """)
+
+        result = await session.execute(query, params)
+        return result.fetchone()
 
-            result = await session.execute(query, {"name": f"%{tool_name}%"})
-            tool = result.fetchone()
+    async def get_tool_detail(self, tool_name: str, open_id: Optional[str] = None) -> dict[str, Any]:
+        """
+        获取工具详情（只匹配提问人可见的工具）
+        """
+        async with async_session() as session:
+            hidden = await hidden_tool_ids(session, open_id)
+            tool = await self._find_tool(session, tool_name, hidden)
 
             if not tool:
                 return {"error": f"未找到工具: {tool_name}"}
@@ -222,11 +237,11 @@ class StatsBridge:
             stats_result = await session.execute(stats_query, {"tool_id": tool_id})
             stats = stats_result.fetchone()
 
-            # 获取收藏和点赞数
+            # 获取收藏和点赞数（后端维护的计数器表）
             interaction_query = text("""
                 SELECT
-                    (SELECT COUNT(*) FROM user_favorites WHERE tool_id = :tool_id) as favorites,
-                    (SELECT COUNT(*) FROM user_likes WHERE tool_id = :tool_id) as likes
+                    COALESCE((SELECT favorite_count FROM tool_counters WHERE tool_id = :tool_id), 0) as favorites,
+                    COALESCE((SELECT like_count FROM tool_counters WHERE tool_id = :tool_id), 0) as likes
             """)
 
             interaction_result = await session.execute(
@@ -306,53 +321,15 @@ class StatsBridge:
             }
 
     async def search_tools(
-        self, keyword: str, category: Optional[str] = None
+        self, keyword: str, category: Optional[str] = None, open_id: Optional[str] = None
     ) -> dict[str, Any]:
         """
-        搜索工具
+        搜索工具（按提问人的部门/角色过滤可见范围）
         """
         async with async_session() as session:
-            from app.config import settings
-
-            # 根据数据库类型选择 LIKE/ILIKE 和 boolean 值
-            like_op = "LIKE" if settings.is_sqlite else "ILIKE"
-            active_val = "1" if settings.is_sqlite else "true"
-
-            if category:
-                query = text(f"""
-                    SELECT t.id, t.name, t.description, t.icon_url, c.name as category
-                    FROM tools t
-                    LEFT JOIN categories c ON t.category_id = c.id
-                    WHERE t.is_active = {active_val}
-                        AND (t.name {like_op} :keyword OR t.description {like_op} :keyword)
-                        AND c.name {like_op} :category
-                    LIMIT 20
-                """)
-                params = {"keyword": f"%{keyword}%", "category": f"%{category}%"}
-            else:
-                query = text(f"""
-                    SELECT t.id, t.name, t.description, t.icon_url, c.name as category
-                    FROM tools t
-                    LEFT JOIN categories c ON t.category_id = c.id
-                    WHERE t.is_active = {active_val}
-                        AND (t.name {like_op} :keyword OR t.description {like_op} :keyword)
-                    LIMIT 20
-                """)
-                params = {"keyword": f"%{keyword}%"}
-
-            result = await session.execute(query, params)
-            rows = result.fetchall()
-
-            tools = [
-                {
-                    "id": row[0],
-                    "name": row[1],
-                    "description": row[2],
-                    "icon_url": row[3],
-                    "category": row[4],
-                }
-                for row in rows
-            ]
+            # 倒排索引检索（BM25 排序，支持中文分词与英文前缀）
+            hidden = await hidden_tool_ids(session, open_id)
+            tools = await search_index.search_tools(session, keyword, category, limit=20, exclude=hidden)
 
             return {
                 "keyword": keyword,
@@ -706,20 +683,11 @@ class StatsBridge:
                     t.id,
                     t.name,
                     t.icon_url,
-                    COALESCE(f.fav_count, 0) as favorites,
-                    COALESCE(l.like_count, 0) as likes,
-                    COALESCE(f.fav_count, 0) + COALESCE(l.like_count, 0) as score
+                    COALESCE(c.favorite_count, 0) as favorites,
+                    COALESCE(c.like_count, 0) as likes,
+                    COALESCE(c.favorite_count, 0) + COALESCE(c.like_count, 0) as score
                 FROM tools t
-                LEFT JOIN (
-                    SELECT tool_id, COUNT(*) as fav_count
-                    FROM user_favorites
-                    GROUP BY tool_id
-                ) f ON t.id = f.tool_id
-                LEFT JOIN (
-                    SELECT tool_id, COUNT(*) as like_count
-                    FROM user_likes
-                    GROUP BY tool_id
-                ) l ON t.id = l.tool_id
+                LEFT JOIN tool_counters c ON t.id = c.tool_id
                 WHERE t.is_active = {active_val}
                 ORDER BY score DESC
                 LIMIT :limit
@@ -851,7 +819,7 @@ class StatsBridge:
                 SELECT
                     keyword,
                     COUNT(*) as count
-                FROM search_history
+                FROM search_logs
                 WHERE DATE(searched_at) >= :start_date
                     AND keyword IS NOT NULL AND keyword != ''
                 GROUP BY keyword
@@ -897,58 +865,84 @@ class StatsBridge:
             }
 
     async def recommend_by_scenario(
-        self, scenario: str, limit: int = 5
+        self, scenario: str, limit: int = 5, open_id: Optional[str] = None
     ) -> dict[str, Any]:
         """
-        根据场景推荐工具
+        根据场景推荐工具（按提问人的部门/角色过滤可见范围）
+        """
+        async with async_session() as session:
+            # TF-IDF 余弦相似度 + 近7天点击热度先验
+            hidden = await hidden_tool_ids(session, open_id)
+            matches = await scenario_index.recommend(session, scenario, limit=limit, exclude=hidden)
+
+            recommended = [
+                {
+                    "id": match.id,
+                    "name": match.name,
+                    "description": match.description[:100] if match.description else None,
+                    "icon_url": match.icon_url,
+                    "category": match.category or None,
+                    "click_count": match.click_7d,
+                    "similarity": round(match.similarity, 4),
+                    "reason": (
+                        f"属于「{match.category or '未分类'}」分类，与场景相似度 {match.similarity:.2f}，"
+                        f"近7天点击量 {match.click_7d}"
+                    ),
+                }
+                for match in matches
+            ]
+
+            return {
+                "scenario": scenario,
+                "recommended": recommended,
+                "total": len(recommended),
+            }
+
+    async def get_related_tools(
+        self, tool_name: str, limit: int = 5, open_id: Optional[str] = None
+    ) -> dict[str, Any]:
+        """
+        用过该工具的人也在用（读取后端每日预计算的点击共现结果）
         """
         async with async_session() as session:
             from app.config import settings
-            like_op = "LIKE" if settings.is_sqlite else "ILIKE"
+
             active_val = "1" if settings.is_sqlite else "true"
+            hidden = await hidden_tool_ids(session, open_id)
+            tool = await self._find_tool(session, tool_name, hidden)
+            if not tool:
+                return {"error": f"未找到工具: {tool_name}"}
 
-            # 先从分类名称匹配（大小写不敏感）
-            category_query = text(f"""
-                SELECT
-                    t.id,
-                    t.name,
-                    t.description,
-                    t.icon_url,
-                    c.name as category,
-                    COUNT(cl.id) as click_count
-                FROM tools t
-                JOIN categories c ON t.category_id = c.id
-                LEFT JOIN click_logs cl ON t.id = cl.tool_id
-                WHERE t.is_active = {active_val}
-                    AND (c.name {like_op} :scenario
-                         OR t.name {like_op} :scenario
-                         OR t.description {like_op} :scenario)
-                GROUP BY t.id, t.name, t.description, t.icon_url, c.name
-                ORDER BY click_count DESC
+            params: dict[str, Any] = {"tool_id": tool[0], "limit": limit}
+            hidden_filter = ""
+            if hidden:
+                placeholders = ", ".join(f":h{i}" for i in range(len(hidden)))
+                hidden_filter = f"AND t.id NOT IN ({placeholders})"
+                params.update({f"h{i}": tool_id for i, tool_id in enumerate(hidden)})
+
+            result = await session.execute(text(f"""
+                SELECT t.id, t.name, t.description, t.icon_url, r.score, r.co_users
+                FROM tool_related r
+                JOIN tools t ON t.id = r.related_tool_id
+                WHERE r.tool_id = :tool_id AND t.is_active = {active_val} {hidden_filter}
+                ORDER BY r.rank
                 LIMIT :limit
-            """)
-
-            result = await session.execute(
-                category_query,
-                {"scenario": f"%{scenario}%", "limit": limit}
-            )
-            rows = result.fetchall()
+            """), params)
 
-            recommended = [
+            related = [
                 {
                     "id": row[0],
                     "name": row[1],
                     "description": row[2][:100] if row[2] else None,
                     "icon_url": row[3],
-                    "category": row[4],
-                    "click_count": row[5],
-                    "reason": f"属于「{row[4]}」分类，点击量 {row[5]}",
+                    "score": round(float(row[4]), 4),
+                    "co_users": row[5],
                 }
-                for row in rows
+                for row in result.fetchall()
             ]
 
             return {
-                "scenario": scenario,
-                "recommended": recommended,
-                "total": len(recommended),
+                "tool": {"id": tool[0], "name": tool[1]},
+                "related": related,
+                "total": len(related),
             }
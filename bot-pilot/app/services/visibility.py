@@ -0,0 +1,136 @@
+"""
+工具可见范围
+与后端 app/services/visibility.py 相同的部门/角色位图（两个服务独立部署，无法直接复用），
+机器人侧收不到后台写入通知，按 TTL + 工具表指纹（数量、最大更新时间）判断是否需要重建
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Iterable, Optional
+
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+
+EMPTY: frozenset[int] = frozenset()
+
+
+def _segments(value: Any) -> set[str]:
+    """JSON 列取值归一化为分段名集合（驱动可能返回 JSON 字符串）"""
+    if not value:
+        return set()
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            value = value.split(",")
+        if isinstance(value, str):
+            value = [value]
+    if not isinstance(value, (list, tuple, set)):
+        return set()
+    return {str(v).strip() for v in value if v is not None and str(v).strip()}
+
+
+def _bit_positions(mask: int) -> Iterable[int]:
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class VisibilityIndex:
+    """可见范围位图（进程内单例）"""
+
+    def __init__(self):
+        self._tool_ids: list[int] = []
+        self._all = 0
+        self._open_departments = 0
+        self._open_roles = 0
+        self._departments: dict[str, int] = {}
+        self._roles: dict[str, int] = {}
+        self._hidden: dict[tuple, frozenset[int]] = {}
+        self._fingerprint: Optional[tuple] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def ensure_fresh(self, session: AsyncSession):
+        """TTL 到期后检查指纹，有变化才重建"""
+        if self._fingerprint is not None and time.time() - self._checked_at < settings.search_index_ttl:
+            return
+
+        async with self._lock:
+            if self._fingerprint is not None and time.time() - self._checked_at < settings.search_index_ttl:
+                return
+            result = await session.execute(text("SELECT COUNT(*), MAX(updated_at) FROM tools"))
+            fingerprint = tuple(str(v) for v in result.fetchone())
+            if fingerprint != self._fingerprint:
+                await self._rebuild(session)
+                self._fingerprint = fingerprint
+            self._checked_at = time.time()
+
+    async def _rebuild(self, session: AsyncSession):
+        result = await session.execute(text(
+            "SELECT id, visible_departments, visible_roles FROM tools ORDER BY id"
+        ))
+
+        tool_ids = []
+        open_departments = open_roles = 0
+        departments: dict[str, int] = {}
+        roles: dict[str, int] = {}
+        for position, (tool_id, visible_departments, visible_roles) in enumerate(result.fetchall()):
+            bit = 1 << position
+            tool_ids.append(tool_id)
+            segments = _segments(visible_departments)
+            if not segments:
+                open_departments |= bit
+            for name in segments:
+                departments[name] = departments.get(name, 0) | bit
+            segments = _segments(visible_roles)
+            if not segments:
+                open_roles |= bit
+            for name in segments:
+                roles[name] = roles.get(name, 0) | bit
+
+        self._tool_ids = tool_ids
+        self._all = (1 << len(tool_ids)) - 1
+        self._open_departments = open_departments
+        self._open_roles = open_roles
+        self._departments = {name: mask | open_departments for name, mask in departments.items()}
+        self._roles = {name: mask | open_roles for name, mask in roles.items()}
+        self._hidden = {}
+        logger.info(f"🔒 可见范围位图重建: {len(tool_ids)} 个工具, {len(departments)} 个部门, {len(roles)} 个角色")
+
+    def hidden(self, department: Optional[str], role: Optional[str]) -> frozenset[int]:
+        department = department if department in self._departments else None
+        role = role if role in self._roles else None
+        key = (department, role)
+        cached = self._hidden.get(key)
+        if cached is None:
+            visible = (
+                self._departments.get(department, self._open_departments)
+                & self._roles.get(role, self._open_roles)
+            )
+            cached = frozenset(self._tool_ids[i] for i in _bit_positions(self._all & ~visible))
+            self._hidden[key] = cached
+        return cached
+
+
+visibility_index = VisibilityIndex()
+
+
+async def hidden_tool_ids(session: AsyncSession, open_id: Optional[str]) -> frozenset[int]:
+    """提问人不可见的工具ID（未在导航站登录过的用户只能看到未设置可见范围的工具）"""
+    await visibility_index.ensure_fresh(session)
+    department = role = None
+    if open_id:
+        result = await session.execute(
+            text("SELECT department, role FROM users WHERE open_id = :open_id"),
+            {"open_id": open_id},
+        )
+        row = result.fetchone()
+        if row:
+            department, role = row
+    return visibility_index.hidden(department, role)
@@ -0,0 +1,86 @@
+"""
+CPU 密集任务执行器
+把回调解密、大结果 JSON 序列化等从事件循环挪到有界线程池，带超时与排队统计
+"""
+
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from loguru import logger
+
+from app.config import settings
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_slots: Optional[asyncio.Semaphore] = None
+_stats = {"in_flight": 0, "max_in_flight": 0, "completed": 0, "failed": 0, "timeouts": 0}
+
+
+def _ensure():
+    global _executor, _slots
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.executor_threads, thread_name_prefix="cpu")
+        # 在途任务上限：worker 数 + 排队上限，超出时调用方等待
+        _slots = asyncio.Semaphore(settings.executor_threads + settings.executor_queue_size)
+
+
+def _release(_):
+    _stats["in_flight"] -= 1
+    _slots.release()
+
+
+async def run_in_thread(fn: Callable[..., T], *args, timeout: Optional[float] = None, **kwargs) -> T:
+    """
+    在线程池中执行 fn
+
+    超时只停止等待并抛出 TimeoutError，已开始执行的任务会继续运行至结束
+    """
+    _ensure()
+    timeout = timeout or settings.executor_timeout
+    deadline = time.monotonic() + timeout
+    name = getattr(fn, "__name__", str(fn))
+
+    try:
+        await asyncio.wait_for(_slots.acquire(), timeout)
+    except asyncio.TimeoutError:
+        _stats["timeouts"] += 1
+        logger.warning(f"⏳ 执行器排队超时: {name}, 在途 {_stats['in_flight']}")
+        raise TimeoutError(f"执行器排队超时: {name}")
+
+    _stats["in_flight"] += 1
+    _stats["max_in_flight"] = max(_stats["max_in_flight"], _stats["in_flight"])
+    future = asyncio.get_running_loop().run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
+    future.add_done_callback(_release)
+    try:
+        result = await asyncio.wait_for(asyncio.shield(future), max(deadline - time.monotonic(), 0))
+    except asyncio.TimeoutError:
+        _stats["timeouts"] += 1
+        logger.warning(f"⏳ 执行器任务超时: {name}（{timeout} 秒）")
+        raise TimeoutError(f"执行器任务超时: {name}")
+    except Exception:
+        _stats["failed"] += 1
+        raise
+    _stats["completed"] += 1
+    return result
+
+
+def executor_stats() -> dict[str, Any]:
+    """在途任务、排队深度与累计统计"""
+    workers = settings.executor_threads
+    return {
+        "workers": workers,
+        "queue_depth": max(_stats["in_flight"] - workers, 0),
+        **_stats,
+    }
+
+
+def shutdown_executor():
+    """关闭线程池（不等待未完成的任务）"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
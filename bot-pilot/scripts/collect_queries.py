@@ -0,0 +1,85 @@
+"""
+StatsBridge 查询收集脚本
+依次调用 StatsBridge 的查询方法，把发出的 SELECT 语句按 JSON 行输出到 stdout，
+供 backend/scripts/query_plans.py 执行 EXPLAIN 与 golden 比对
+"""
+
+import asyncio
+import json
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import event  # noqa: E402
+
+from app.services.database import engine  # noqa: E402
+from app.services.stats_bridge import StatsBridge  # noqa: E402
+
+SCENARIOS = [
+    ("get_overview", {}),
+    ("get_tool_ranking", {"days": 7, "limit": 10}),
+    ("get_user_ranking", {"days": 7, "limit": 10}),
+    ("get_trend", {"days": 30}),
+    ("get_tool_detail", {"tool_name": "Tool 1"}),
+    ("get_feedback_summary", {"days": 30, "limit": 20}),
+    ("search_tools", {"keyword": "AI"}),
+    ("get_category_stats", {"days": 7}),
+    ("get_retention_stats", {"period": "day"}),
+    ("get_retention_stats", {"period": "week"}),
+    ("get_retention_stats", {"period": "month"}),
+    ("get_hourly_distribution", {"days": 7}),
+    ("get_provider_stats", {"days": 7, "limit": 10}),
+    ("get_tool_interactions", {"limit": 10}),
+    ("get_hot_tools", {"days": 7, "limit": 10}),
+    ("get_want_list", {"days": 30, "limit": 20}),
+    ("get_search_keywords", {"days": 7, "limit": 20}),
+    ("recommend_by_scenario", {"scenario": "写作", "limit": 5}),
+    ("get_related_tools", {"tool_name": "Tool 1", "limit": 5}),
+]
+
+
+def encode_param(value):
+    """日期参数带类型标记，便于另一端还原后再绑定"""
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    return value
+
+
+def encode_params(params):
+    if isinstance(params, dict):
+        return {k: encode_param(v) for k, v in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [encode_param(v) for v in params]
+    return params
+
+
+async def main():
+    bridge = StatsBridge()
+    state = {"scenario": None}
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if state["scenario"] is None or executemany:
+            return
+        head = statement.lstrip()[:10].upper()
+        if head.startswith("SELECT") or head.startswith("WITH"):
+            print(json.dumps({
+                "scenario": state["scenario"],
+                "sql": statement,
+                "params": encode_params(parameters),
+            }, ensure_ascii=False))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    for name, kwargs in SCENARIOS:
+        suffix = f"[{kwargs['period']}]" if "period" in kwargs else ""
+        state["scenario"] = f"StatsBridge.{name}{suffix}"
+        await getattr(bridge, name)(**kwargs)
+        state["scenario"] = None
+    event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,146 @@
+"""
+场景推荐离线评估
+对比 TF-IDF 相似度 + 热度先验（当前实现）与 BM25 检索后按点击量排序（原实现）的推荐质量与延迟
+
+评估用例:
+    --cases 指定 JSON 文件: [{"scenario": "写周报", "expected": ["工具名或ID", ...]}, ...]
+    不指定时由目录自动生成：每个标签/分类名作为场景，其下的工具为期望结果
+    （场景词直接出现在文档中，只能作为回归基线，业务效果请以人工标注用例为准）
+
+用法:
+    python scripts/eval_scenario.py
+    python scripts/eval_scenario.py --cases cases.json --k 5 --weights 0,0.2,0.5
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import statistics
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text  # noqa: E402
+
+from app.services import search_index  # noqa: E402
+from app.services.database import async_session  # noqa: E402
+from app.services.scenario_index import scenario_index  # noqa: E402
+
+
+async def load_cases(session, path: str | None) -> list[dict]:
+    """读取或生成评估用例，期望结果统一为工具ID集合"""
+    rows = (await session.execute(text("SELECT id, name FROM tools"))).fetchall()
+    ids_by_name = {name.lower(): tool_id for tool_id, name in rows if name}
+
+    if path:
+        cases = []
+        for case in json.loads(Path(path).read_text(encoding="utf-8")):
+            expected = set()
+            for item in case["expected"]:
+                if isinstance(item, int) or str(item).isdigit():
+                    expected.add(int(item))
+                elif str(item).lower() in ids_by_name:
+                    expected.add(ids_by_name[str(item).lower()])
+                else:
+                    print(f"⚠️ 用例「{case['scenario']}」中的工具不存在: {item}")
+            if expected:
+                cases.append({"scenario": case["scenario"], "expected": expected})
+        return cases
+
+    groups: dict[str, set[int]] = defaultdict(set)
+    result = await session.execute(text("""
+        SELECT tg.name, tt.tool_id FROM tool_tags tt JOIN tags tg ON tg.id = tt.tag_id
+    """))
+    for name, tool_id in result.fetchall():
+        groups[name].add(tool_id)
+    result = await session.execute(text("""
+        SELECT c.name, t.id FROM tools t JOIN categories c ON c.id = t.category_id
+    """))
+    for name, tool_id in result.fetchall():
+        groups[name].add(tool_id)
+    return [{"scenario": name, "expected": ids} for name, ids in sorted(groups.items()) if name]
+
+
+async def legacy_recommend(session, scenario: str, k: int) -> list[int]:
+    """原实现：BM25 检索前 50 条，按全部历史点击量排序"""
+    candidates = await search_index.search_tools(session, scenario, limit=50)
+    if not candidates:
+        return []
+    result = await session.execute(text("SELECT tool_id, COUNT(*) FROM click_logs GROUP BY tool_id"))
+    clicks = {row[0]: row[1] for row in result.fetchall()}
+    ranked = sorted(candidates, key=lambda t: (-clicks.get(t["id"], 0), -t["score"]))
+    return [t["id"] for t in ranked[:k]]
+
+
+def score_ranking(ranked: list[int], expected: set[int], k: int) -> dict[str, float]:
+    """hit@k、precision@k、MRR、nDCG@k"""
+    top = ranked[:k]
+    hits = [1 if tool_id in expected else 0 for tool_id in top]
+    first = next((i for i, hit in enumerate(hits) if hit), None)
+    dcg = sum(hit / math.log2(i + 2) for i, hit in enumerate(hits))
+    ideal = sum(1 / math.log2(i + 2) for i in range(min(k, len(expected))))
+    return {
+        "hit": 1.0 if first is not None else 0.0,
+        "precision": sum(hits) / k,
+        "mrr": 1 / (first + 1) if first is not None else 0.0,
+        "ndcg": dcg / ideal if ideal else 0.0,
+    }
+
+
+def report(name: str, metrics: list[dict], latencies: list[float], k: int):
+    mean = {key: statistics.mean(m[key] for m in metrics) for key in metrics[0]}
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(
+        f"{name:<28} hit@{k} {mean['hit']:.3f}  P@{k} {mean['precision']:.3f}  "
+        f"MRR {mean['mrr']:.3f}  nDCG@{k} {mean['ndcg']:.3f}  "
+        f"延迟 p50 {statistics.median(latencies):.2f}ms / p95 {p95:.2f}ms"
+    )
+
+
+async def main(args):
+    async with async_session() as session:
+        start = time.perf_counter()
+        await scenario_index.ensure_fresh(session)
+        print(f"场景索引构建: {(time.perf_counter() - start) * 1000:.1f}ms")
+        await search_index.tool_search_index.ensure_fresh(session)
+
+        cases = await load_cases(session, args.cases)
+        if not cases:
+            print("没有可评估的用例")
+            return 1
+        print(f"评估用例: {len(cases)} 个, k={args.k}\n")
+
+        metrics, latencies = [], []
+        for case in cases:
+            t0 = time.perf_counter()
+            ranked = await legacy_recommend(session, case["scenario"], args.k)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            metrics.append(score_ranking(ranked, case["expected"], args.k))
+        report("BM25 + 点击排序（原实现）", metrics, latencies, args.k)
+
+        for weight in args.weights:
+            metrics, latencies = [], []
+            for case in cases:
+                t0 = time.perf_counter()
+                matches = scenario_index.recommend(case["scenario"], limit=args.k, popularity_weight=weight)
+                latencies.append((time.perf_counter() - t0) * 1000)
+                metrics.append(score_ranking([m.id for m in matches], case["expected"], args.k))
+            report(f"TF-IDF 热度权重 {weight:g}", metrics, latencies, args.k)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="场景推荐离线评估")
+    parser.add_argument("--cases", help="人工标注用例 JSON 文件")
+    parser.add_argument("--k", type=int, default=5, help="评估的推荐条数")
+    parser.add_argument(
+        "--weights", default="0,0.2,0.5",
+        type=lambda v: [float(x) for x in v.split(",")],
+        help="待比较的热度先验权重，逗号分隔",
+    )
+    sys.exit(asyncio.run(main(parser.parse_args())))
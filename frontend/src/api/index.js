@@ -88,6 +88,39 @@ api.interceptors.response.use(
   }
 )
 
+// ============ 工具统计批量加载 ============
+// 同一轮渲染中各卡片的 getStats 调用合并为一次 stats:batch 请求
+const STATS_BATCH_DELAY = 10
+const STATS_BATCH_MAX = 200
+let pendingStats = new Map()
+let statsTimer = null
+
+function flushStatsBatch() {
+  const batch = pendingStats
+  pendingStats = new Map()
+  statsTimer = null
+
+  const ids = [...batch.keys()]
+  for (let i = 0; i < ids.length; i += STATS_BATCH_MAX) {
+    const chunk = ids.slice(i, i + STATS_BATCH_MAX)
+    api.post('/tools/stats:batch', { tool_ids: chunk })
+      .then((result) => {
+        chunk.forEach((id) => batch.get(id).forEach(({ resolve }) => resolve(result[id])))
+      })
+      .catch((error) => {
+        chunk.forEach((id) => batch.get(id).forEach(({ reject }) => reject(error)))
+      })
+  }
+}
+
+function loadStatsBatched(toolId) {
+  return new Promise((resolve, reject) => {
+    if (!pendingStats.has(toolId)) pendingStats.set(toolId, [])
+    pendingStats.get(toolId).push({ resolve, reject })
+    if (!statsTimer) statsTimer = setTimeout(flushStatsBatch, STATS_BATCH_DELAY)
+  })
+}
+
 // ============ 认证API ============
 export const authApi = {
   login: (code) => api.post('/auth/login', { code }),
@@ -102,14 +135,19 @@ export const categoriesApi = {
 export const toolsApi = {
   getList: (params = {}) => api.get('/tools', { params }),
   search: (q, limit = 20) => api.get('/tools/search', { params: { q, limit } }),
+  suggest: (prefix, limit = 10) => api.get('/tools/suggest', { params: { prefix, limit } }),
   recordClick: (toolId) => api.post(`/tools/${toolId}/click`),
   getTags: () => api.get('/tools/tags'),
+  getRelated: (toolId, limit = 10) => api.get(`/tools/${toolId}/related`, { params: { limit } }),
   // 交互
-  getStats: (toolId) => api.get(`/tools/${toolId}/stats`),
+  getStats: (toolId) => loadStatsBatched(toolId),
+  getStatsBatch: (toolIds) => api.post('/tools/stats:batch', { tool_ids: toolIds }),
   like: (toolId) => api.post(`/tools/${toolId}/like`),
   unlike: (toolId) => api.delete(`/tools/${toolId}/like`),
   favorite: (toolId) => api.post(`/tools/${toolId}/favorite`),
   unfavorite: (toolId) => api.delete(`/tools/${toolId}/favorite`),
+  // 批量设置/取消：ops = [{ tool_id, type: 'like' | 'favorite', value: true | false }]
+  batchInteractions: (ops) => api.post('/user/interactions:batch', { ops }),
 }
 
 // ============ 用户API ============
@@ -197,6 +235,17 @@ export const adminApi = {
   exportWantsStats: () => api.get('/admin/export/wants', {
     responseType: 'blob'
   }),
+  // 后台导出任务：提交后轮询状态，status 为 done 时下载
+  createExportJob: (type, days = 30) => api.post('/admin/export-jobs', null, { params: { type, days } }),
+  getExportJob: (jobId) => api.get(`/admin/export-jobs/${jobId}`),
+  downloadExportJob: (jobId) => api.get(`/admin/export-jobs/${jobId}/download`, {
+    responseType: 'blob'
+  }),
+  // 原始点击明细：format = 'csv' | 'ndjson'，start/end 为 YYYY-MM-DD
+  exportClicks: (params = {}) => api.get('/admin/export/clicks', {
+    params: { format: 'csv', gzip: 1, ...params },
+    responseType: 'blob'
+  }),
 
   // 标签管理
   getTags: () => api.get('/admin/tags'),
@@ -207,14 +256,23 @@ export const adminApi = {
   setToolTags: (toolId, tagIds) => api.put(`/admin/tools/${toolId}/tags`, tagIds),
 
   // 导入导出
-  importTools: (file, updateExisting = true) => {
+  importTools: (file, updateExisting = true, dryRun = false) => {
     const formData = new FormData()
     formData.append('file', file)
-    return api.post(`/admin/tools/import?update_existing=${updateExisting}`, formData, {
+    return api.post(`/admin/tools/import?update_existing=${updateExisting}&dry_run=${dryRun}`, formData, {
       headers: { 'Content-Type': 'multipart/form-data' }
     })
   },
   downloadTemplate: () => api.get('/admin/tools/import/template', { responseType: 'blob' }),
+  // 历史点击回填（CSV / NDJSON，可 gzip），大文件请用 backend/scripts/backfill_clicks.py
+  backfillClicks: (file, { createUsers = false, dryRun = false } = {}) => {
+    const formData = new FormData()
+    formData.append('file', file)
+    return api.post('/admin/clicks/backfill', formData, {
+      params: { create_users: createUsers, dry_run: dryRun },
+      headers: { 'Content-Type': 'multipart/form-data' }
+    })
+  },
 
   // 报表推送
   getReportPushSettings: () => api.get('/admin/report-push/settings'),
@@ -34,7 +34,7 @@ export function useNavMode() {
   }
 
   function setSortBy(sort) {
-    if (['default', 'hot', 'recent', 'name'].includes(sort)) {
+    if (['default', 'hot', 'personal', 'recent', 'name'].includes(sort)) {
       sortBy.value = sort
     }
   }
@@ -38,6 +38,10 @@ CREATE TABLE IF NOT EXISTS tools (
 CREATE INDEX IF NOT EXISTS idx_tools_active ON tools(is_active);
 CREATE INDEX IF NOT EXISTS idx_tools_sort ON tools(sort_order);
 CREATE INDEX IF NOT EXISTS idx_tools_category ON tools(category_id);
+-- 列表游标分页 (排序键, id)
+CREATE INDEX IF NOT EXISTS idx_tools_sort_id ON tools(sort_order, id);
+CREATE INDEX IF NOT EXISTS idx_tools_created_id ON tools(created_at DESC, id);
+CREATE INDEX IF NOT EXISTS idx_tools_name_id ON tools(name, id);
 
 -- 用户表
 CREATE TABLE IF NOT EXISTS users (
@@ -48,6 +52,7 @@ CREATE TABLE IF NOT EXISTS users (
     name VARCHAR(100),
     avatar_url VARCHAR(500),
     department VARCHAR(200),
+    role VARCHAR(100),
     first_visit_at TIMESTAMP DEFAULT NOW(),
     last_visit_at TIMESTAMP DEFAULT NOW(),
     visit_count INT DEFAULT 1
@@ -179,6 +184,29 @@ CREATE TABLE IF NOT EXISTS search_history (
 
 CREATE INDEX IF NOT EXISTS idx_search_history_user ON search_history(user_id);
 CREATE INDEX IF NOT EXISTS idx_search_history_time ON search_history(searched_at);
+CREATE INDEX IF NOT EXISTS idx_search_history_user_time ON search_history(user_id, searched_at);
+
+-- 搜索日志表（只追加的原始搜索事件，用于热词统计，定时清理过期记录）
+CREATE TABLE IF NOT EXISTS search_logs (
+    id SERIAL PRIMARY KEY,
+    user_id INT REFERENCES users(id) ON DELETE SET NULL,
+    keyword VARCHAR(100) NOT NULL,
+    searched_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_search_logs_time ON search_logs(searched_at);
+
+-- 搜索历史改为每个用户每个关键词一行：已有明细先转入搜索日志，再去重并建唯一索引
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_indexes WHERE indexname = 'uq_search_history_user_keyword') THEN
+        INSERT INTO search_logs (user_id, keyword, searched_at)
+            SELECT user_id, keyword, searched_at FROM search_history;
+        DELETE FROM search_history
+            WHERE id NOT IN (SELECT MAX(id) FROM search_history GROUP BY user_id, keyword);
+        CREATE UNIQUE INDEX uq_search_history_user_keyword ON search_history(user_id, keyword);
+    END IF;
+END $$;
 
 -- 标签表
 CREATE TABLE IF NOT EXISTS tags (
@@ -198,6 +226,52 @@ CREATE TABLE IF NOT EXISTS tool_tags (
 CREATE INDEX IF NOT EXISTS idx_tool_tags_tool ON tool_tags(tool_id);
 CREATE INDEX IF NOT EXISTS idx_tool_tags_tag ON tool_tags(tag_id);
 
+-- 搜索全文索引影子表（SEARCH_ENGINE=database 时使用，由后端在目录变更后同步）
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE TABLE IF NOT EXISTS tool_search_docs (
+    tool_id INT PRIMARY KEY REFERENCES tools(id) ON DELETE CASCADE,
+    name TEXT NOT NULL DEFAULT '',
+    tags TEXT NOT NULL DEFAULT '',
+    category TEXT NOT NULL DEFAULT '',
+    description TEXT NOT NULL DEFAULT '',
+    body TEXT NOT NULL DEFAULT '',
+    tsv TSVECTOR
+);
+
+CREATE INDEX IF NOT EXISTS idx_tool_search_body_trgm ON tool_search_docs USING gin (body gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_tool_search_tsv ON tool_search_docs USING gin (tsv);
+
+-- 工具计数器（点赞/收藏/点击，由写入路径增量维护，后端定时校准）
+CREATE TABLE IF NOT EXISTS tool_counters (
+    tool_id INT PRIMARY KEY REFERENCES tools(id) ON DELETE CASCADE,
+    like_count INT NOT NULL DEFAULT 0,
+    favorite_count INT NOT NULL DEFAULT 0,
+    click_total INT NOT NULL DEFAULT 0,
+    click_7d INT NOT NULL DEFAULT 0,
+    reconciled_at TIMESTAMP
+);
+
+-- 相关工具（点击共现，后端每日定时重算）
+CREATE TABLE IF NOT EXISTS tool_related (
+    tool_id INT NOT NULL REFERENCES tools(id) ON DELETE CASCADE,
+    related_tool_id INT NOT NULL REFERENCES tools(id) ON DELETE CASCADE,
+    rank INT NOT NULL,
+    score DOUBLE PRECISION NOT NULL,
+    co_users INT NOT NULL,
+    computed_at TIMESTAMP,
+    PRIMARY KEY (tool_id, related_tool_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_tool_related_rank ON tool_related(tool_id, rank);
+
+-- 用户个性化排序（每天凌晨重算，每个用户一行）
+CREATE TABLE IF NOT EXISTS user_rankings (
+    user_id INT PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    tool_ids TEXT NOT NULL,
+    computed_at TIMESTAMP NOT NULL
+);
+
 -- 插入示例标签
 INSERT INTO tags (name, color) VALUES
 ('免费', '#67c23a'),
@@ -227,6 +301,9 @@ BEGIN
     IF NOT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name = 'report_push_settings' AND column_name = 'days') THEN
         ALTER TABLE report_push_settings ADD COLUMN days INT DEFAULT 7;
     END IF;
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name = 'users' AND column_name = 'role') THEN
+        ALTER TABLE users ADD COLUMN role VARCHAR(100);
+    END IF;
 END $$;
 
 -- 报表推送接收人表
@@ -249,9 +326,51 @@ CREATE TABLE IF NOT EXISTS report_push_history (
     push_method VARCHAR(20) NOT NULL,
     recipient_count INT DEFAULT 0,
     status VARCHAR(20) DEFAULT 'pending',
+    success_count INT DEFAULT 0,
+    failed_count INT DEFAULT 0,
     error_msg TEXT,
     pushed_at TIMESTAMP DEFAULT NOW()
 );
 
+-- 报表推送送达记录（推送任务重新执行时跳过已送达的接收人）
+CREATE TABLE IF NOT EXISTS report_push_deliveries (
+    history_id INT NOT NULL REFERENCES report_push_history(id) ON DELETE CASCADE,
+    recipient VARCHAR(100) NOT NULL,
+    delivered_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (history_id, recipient)
+);
+
+-- 持久化后台任务（worker 以租约认领，FOR UPDATE SKIP LOCKED）
+CREATE TABLE IF NOT EXISTS background_jobs (
+    id SERIAL PRIMARY KEY,
+    kind VARCHAR(50) NOT NULL,
+    payload JSON NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    attempts INT NOT NULL DEFAULT 0,
+    max_attempts INT NOT NULL DEFAULT 3,
+    run_after TIMESTAMP NOT NULL DEFAULT NOW(),
+    lease_owner VARCHAR(100),
+    lease_until TIMESTAMP,
+    error TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_background_jobs_claim ON background_jobs(status, run_after);
+
+-- 飞书身份缓存（报表接收人邮箱 -> open_id，未找到的邮箱 open_id 为空）
+CREATE TABLE IF NOT EXISTS feishu_identity_cache (
+    email VARCHAR(100) PRIMARY KEY,
+    open_id VARCHAR(100),
+    resolved_at TIMESTAMP NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_feishu_identity_resolved ON feishu_identity_cache(resolved_at);
+
+-- 已有数据库升级：推送进度字段
+ALTER TABLE report_push_history ADD COLUMN IF NOT EXISTS success_count INT DEFAULT 0;
+ALTER TABLE report_push_history ADD COLUMN IF NOT EXISTS failed_count INT DEFAULT 0;
+
 CREATE INDEX IF NOT EXISTS idx_push_history_status ON report_push_history(status);
 CREATE INDEX IF NOT EXISTS idx_push_history_time ON report_push_history(pushed_at);